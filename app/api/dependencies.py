@@ -0,0 +1,25 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from fastapi import Request
+
+if TYPE_CHECKING:
+    from app.services.gpt_service import GptService
+    from app.services.hugginface_tr import WhisperService as TranslationService
+    from app.services.job_queue import JobQueue
+    from app.services.whisper_service import WhisperService
+
+
+def get_whisper_service(request: Request) -> WhisperService:
+    return request.app.state.services.whisper_service
+
+
+def get_translation_service(request: Request) -> TranslationService:
+    return request.app.state.services.translation_service
+
+
+def get_gpt_service(request: Request) -> GptService:
+    return request.app.state.services.gpt_service
+
+
+def get_job_queue(request: Request) -> JobQueue:
+    return request.app.state.services.job_queue
@@ -0,0 +1,534 @@
+import math
+import time
+import uuid
+import asyncio
+import hashlib
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.deadline import Deadline, reset_deadline, set_deadline
+from app.utils.logger import logger, request_id_var
+from app.utils.startup_profile import mark_first_success
+from app.utils.metrics import (
+    ABANDONED_WORK, ADMISSION_IN_FLIGHT_BYTES, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, ADMISSION_WAIT_SECONDS,
+    IN_FLIGHT, REQUEST_SECONDS, format_server_timing, size_bucket, start_server_timing
+)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized request bodies before they are buffered.
+
+    Requests whose Content-Length exceeds the limit are refused without reading
+    the body. Bodies without a usable Content-Length are counted as chunks
+    arrive and aborted as soon as they cross the limit.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_bytes: int):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            response = JSONResponse(
+                status_code=413,
+                content={"detail": f"Request body too large. Max size is {self.max_body_bytes // (1024 * 1024)}MB."}
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Request body too large. Max size is {self.max_body_bytes // (1024 * 1024)}MB."
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _route_template(scope: Scope) -> str:
+    """
+    Rebuilds the matched route's template (e.g. /v1/jobs/{job_id}) from the
+    request path and its path parameters.
+    """
+    if "route" not in scope:
+        return "unmatched"
+    path = scope["path"]
+    for name, value in scope.get("path_params", {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}")
+    return path
+
+
+class RequestIdMiddleware:
+    """
+    Tags every log record written while handling a request with its id.
+
+    The id is taken from the client's X-Request-ID header when it looks sane,
+    generated otherwise, and echoed back in the response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = supplied if 0 < len(supplied) <= 64 and supplied.isprintable() else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records request latency and in-flight requests, and optionally reports
+    per-stage durations to the client in a Server-Timing header.
+
+    Requests are labelled by their route template rather than the raw path so
+    job ids and unmatched paths do not create new series.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        bucket = size_bucket(int(content_length)) if content_length is not None and content_length.isdigit() else "unknown"
+        timings = start_server_timing()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    timings["total"] = time.perf_counter() - start
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", format_server_timing(timings).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        IN_FLIGHT.labels(stage="request").inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            IN_FLIGHT.labels(stage="request").dec()
+            deadline = scope.get("deadline")
+            if scope.get("client_disconnected") or (deadline is not None and deadline.disconnected):
+                # Client closed the connection before a response was sent
+                status = 499
+            route = _route_template(scope)
+            REQUEST_SECONDS.labels(
+                method=scope["method"],
+                route=route,
+                status=str(status),
+                size_bucket=bucket
+            ).observe(time.perf_counter() - start)
+            # Health checks and scrapes succeed before any service is built, so only API routes count
+            if status < 400 and route.startswith("/v1/"):
+                mark_first_success()
+
+
+class RequestDeadlineMiddleware:
+    """
+    Gives every request a deadline and stops its work when the client leaves.
+
+    The deadline is split across stages (see app.services.deadline) and bounds
+    every upstream call made for the request. Once the request body has been
+    read, a watcher waits for the client to disconnect and cancels the handler,
+    which cancels the upstream calls still in flight. Handlers that listen
+    for the disconnect themselves, such as streaming responses, still get it.
+    """
+
+    def __init__(self, app: ASGIApp, timeout_seconds: float = 900, transcription_share: float = 0.75):
+        self.app = app
+        self.timeout_seconds = timeout_seconds
+        self.transcription_share = transcription_share
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Translation has no share of its own: it may use whatever transcription left over
+        deadline = Deadline(self.timeout_seconds, {"transcription": self.transcription_share})
+        scope["deadline"] = deadline
+        body_read = asyncio.Event()
+        response_done = False
+        disconnect: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        async def watched_receive() -> Message:
+            if body_read.is_set():
+                # From here on only the watcher reads from the client
+                return await asyncio.shield(disconnect)
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                deadline.disconnected = not response_done
+                if not disconnect.done():
+                    disconnect.set_result(message)
+            elif not message.get("more_body", False):
+                body_read.set()
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_done
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_done = True
+            await send(message)
+
+        async def watch_for_disconnect() -> None:
+            await body_read.wait()
+            message = await receive()
+            while message["type"] != "http.disconnect":
+                message = await receive()
+            if not disconnect.done():
+                disconnect.set_result(message)
+            if not response_done:
+                deadline.disconnected = True
+                handler.cancel()
+
+        token = set_deadline(deadline)
+        try:
+            handler = asyncio.create_task(self.app(scope, watched_receive, tracked_send))
+        finally:
+            reset_deadline(token)
+        watcher = asyncio.create_task(watch_for_disconnect())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not deadline.disconnected:
+                raise
+            logger.info(f"Client disconnected from {scope['method']} {scope['path']}, work cancelled")
+            ABANDONED_WORK.labels(stage="request", reason="disconnected").inc()
+        finally:
+            watcher.cancel()
+            if not handler.done():
+                handler.cancel()
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Takes a token if one is available.
+
+        Returns:
+            float: 0 if the request may proceed, otherwise seconds until a token is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    One token bucket per client, keeping at most max_clients buckets.
+    """
+
+    def __init__(self, rate: float, capacity: float, max_clients: int = 10_000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def take(self, client: str) -> float:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.capacity)
+            if len(self._buckets) > self.max_clients:
+                # Idle clients are refilled anyway, so dropping the stalest bucket loses nothing
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(client)
+        return bucket.take()
+
+
+class AdmissionController:
+    """
+    Caps concurrently admitted requests and their declared bytes.
+
+    Requests that do not fit wait in a bounded FIFO queue for up to
+    queue_timeout seconds. A request is always admitted when nothing else is
+    in flight, so a single body larger than the byte cap cannot stall forever.
+    """
+
+    def __init__(self, max_in_flight: int, max_in_flight_bytes: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_bytes = max_in_flight_bytes
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.in_flight_bytes = 0
+        self._waiters: Deque[Tuple[asyncio.Future, int]] = deque()
+
+    def _fits(self, weight: int) -> bool:
+        return self.in_flight == 0 or (
+            self.in_flight < self.max_in_flight and self.in_flight_bytes + weight <= self.max_in_flight_bytes
+        )
+
+    def _take(self, weight: int) -> None:
+        self.in_flight += 1
+        self.in_flight_bytes += weight
+        IN_FLIGHT.labels(stage="admitted").set(self.in_flight)
+        ADMISSION_IN_FLIGHT_BYTES.set(self.in_flight_bytes)
+
+    def try_acquire(self, weight: int) -> bool:
+        """
+        Takes a slot without queueing.
+
+        Returns:
+            bool: True if the request was admitted
+        """
+        if not self._waiters and self._fits(weight):
+            self._take(weight)
+            return True
+        return False
+
+    async def acquire(self, weight: int) -> None:
+        if self.try_acquire(weight):
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected("queue_full", self.queue_timeout)
+
+        entry = (asyncio.get_running_loop().create_future(), weight)
+        self._waiters.append(entry)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait({entry[0]}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # The client went away while queued; hand back a slot granted in the meantime
+            if entry[0].done():
+                self.release(weight)
+            else:
+                self._remove(entry)
+            raise
+        if not entry[0].done():
+            self._remove(entry)
+            raise AdmissionRejected("queue_timeout", self.queue_timeout)
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+    def release(self, weight: int) -> None:
+        self.in_flight -= 1
+        self.in_flight_bytes -= weight
+        while self._waiters and self._fits(self._waiters[0][1]):
+            future, waiter_weight = self._waiters.popleft()
+            self._take(waiter_weight)
+            future.set_result(None)
+        IN_FLIGHT.labels(stage="admitted").set(self.in_flight)
+        ADMISSION_IN_FLIGHT_BYTES.set(self.in_flight_bytes)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+    def _remove(self, entry: Tuple[asyncio.Future, int]) -> None:
+        self._waiters.remove(entry)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+
+class AdmissionMiddleware:
+    """
+    Admission control and per-client rate limiting for upload endpoints.
+
+    Body-carrying requests under the given path prefixes first take a token
+    from their client's bucket (keyed by API key, else client IP), then wait
+    for a global in-flight slot. Requests refused at either step get a 429
+    with a Retry-After header instead of slowing down everyone else.
+
+    While a request is queued the middleware reads its body ahead, up to
+    max_read_ahead_bytes, and replays it to the app once admitted. A client
+    that disconnects in that time leaves the queue straight away; one that
+    sent more than that is back-pressured and noticed once admitted.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_in_flight: int = 16,
+        max_in_flight_bytes: int = 512 * 1024 * 1024,
+        max_queue: int = 64,
+        queue_timeout: float = 10,
+        rate_per_minute: float = 60,
+        burst: int = 10,
+        default_request_bytes: int = 25 * 1024 * 1024,
+        paths: Sequence[str] = ("/v1/",),
+        trust_forwarded_for: bool = False,
+        max_read_ahead_bytes: int = 1024 * 1024
+    ):
+        self.app = app
+        self.controller = AdmissionController(max_in_flight, max_in_flight_bytes, max_queue, queue_timeout)
+        self.rate_limiter = RateLimiter(rate_per_minute / 60, burst) if rate_per_minute > 0 else None
+        self.default_request_bytes = default_request_bytes
+        self.paths = tuple(paths)
+        self.trust_forwarded_for = trust_forwarded_for
+        self.max_read_ahead_bytes = max_read_ahead_bytes
+
+    def client_key(self, scope: Scope) -> str:
+        headers = dict(scope["headers"])
+        api_key = headers.get(b"x-api-key") or headers.get(b"authorization")
+        if api_key:
+            # Keep a digest rather than the credential itself
+            return "key:" + hashlib.sha256(api_key).hexdigest()[:16]
+        if self.trust_forwarded_for and headers.get(b"x-forwarded-for"):
+            return "ip:" + headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("POST", "PUT", "PATCH")
+            or not scope["path"].startswith(self.paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        weight = int(content_length) if content_length is not None and content_length.isdigit() else self.default_request_bytes
+
+        try:
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.take(self.client_key(scope))
+                if wait > 0:
+                    raise AdmissionRejected("rate_limited", wait)
+            if not self.controller.try_acquire(weight):
+                receive = await self._wait_in_queue(weight, receive)
+                if receive is None:
+                    logger.info(f"Client disconnected from {scope['method']} {scope['path']} while queued")
+                    ABANDONED_WORK.labels(stage="admission", reason="disconnected").inc()
+                    scope["client_disconnected"] = True
+                    return
+        except AdmissionRejected as e:
+            await self._reject(e, scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(weight)
+
+    async def _wait_in_queue(self, weight: int, receive: Receive) -> Optional[Receive]:
+        """
+        Waits for a slot while watching the client for a disconnect.
+
+        Args:
+            weight (int): Declared size of the request body
+            receive (Receive): The request's receive channel
+
+        Returns:
+            Optional[Receive]: A receive channel that replays what was read ahead,
+            or None if the client disconnected before it was admitted
+        """
+        admission = asyncio.ensure_future(self.controller.acquire(weight))
+        read_ahead: Deque[Message] = deque()
+        read_ahead_bytes = 0
+        reading: Optional[asyncio.Future] = None
+        disconnected = False
+        try:
+            while not admission.done() and not disconnected:
+                if reading is None and read_ahead_bytes < self.max_read_ahead_bytes:
+                    reading = asyncio.ensure_future(receive())
+                await asyncio.wait({admission} if reading is None else {admission, reading}, return_when=asyncio.FIRST_COMPLETED)
+                if reading is not None and reading.done():
+                    message = reading.result()
+                    reading = None
+                    read_ahead.append(message)
+                    read_ahead_bytes += len(message.get("body", b""))
+                    disconnected = message["type"] == "http.disconnect"
+        except asyncio.CancelledError:
+            admission.cancel()
+            if reading is not None:
+                reading.cancel()
+            raise
+
+        if disconnected:
+            admission.cancel()
+            try:
+                await admission
+            except (asyncio.CancelledError, AdmissionRejected):
+                pass
+            else:
+                # Admitted just before the cancellation took effect
+                self.controller.release(weight)
+            return None
+        if admission.exception() is not None and reading is not None:
+            reading.cancel()
+        admission.result()
+
+        async def replaying_receive() -> Message:
+            nonlocal reading
+            if read_ahead:
+                return read_ahead.popleft()
+            if reading is not None:
+                # The read still pending from the queue keeps its place in the stream
+                pending, reading = reading, None
+                return await pending
+            return await receive()
+
+        return replaying_receive
+
+    @staticmethod
+    async def _reject(rejection: AdmissionRejected, scope: Scope, receive: Receive, send: Send) -> None:
+        ADMISSION_REJECTIONS.labels(reason=rejection.reason).inc()
+        detail = (
+            "Too many requests from this client. Please slow down."
+            if rejection.reason == "rate_limited"
+            else "The server is busy. Please try again shortly."
+        )
+        response = JSONResponse(
+            status_code=429,
+            content={"detail": detail},
+            headers={"Retry-After": str(max(math.ceil(rejection.retry_after), 1))}
+        )
+        await response(scope, receive, send)
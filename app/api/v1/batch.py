@@ -0,0 +1,20 @@
+from __future__ import annotations
+from typing import List, TYPE_CHECKING
+from fastapi import APIRouter, Depends, UploadFile, File, Form
+from app.api.dependencies import get_whisper_service
+from app.schema import ApiResponse, BatchItem
+
+if TYPE_CHECKING:
+    from app.services.whisper_service import WhisperService
+
+router = APIRouter()
+
+@router.post("", response_model=ApiResponse[List[BatchItem]])
+async def batch_transcribe_and_translate(
+    files: List[UploadFile] = File(...),
+    target_languages: List[str] = Form(...),
+    whisper: WhisperService = Depends(get_whisper_service)
+):
+    """Transcribe several audio files once each and translate them into several languages"""
+    result = await whisper.batch_transcribe_and_translate(files, target_languages)
+    return ApiResponse(data=result)
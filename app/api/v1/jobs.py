@@ -0,0 +1,70 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from app.api.dependencies import get_job_queue, get_whisper_service
+from app.schema import ApiResponse, JobStatusResponse, TranscribeAndTranslate
+from app.services.job_queue import JobQueue, JobStatus, job_result
+
+if TYPE_CHECKING:
+    from app.services.whisper_service import WhisperService
+
+router = APIRouter()
+
+
+def _job_status(job: dict) -> JobStatusResponse:
+    return JobStatusResponse(
+        job_id=job["id"],
+        status=job["status"],
+        priority=job["priority"],
+        target_language=job["target_language"],
+        filename=job["filename"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        error=job["error"]
+    )
+
+
+async def _get_job(job_queue: JobQueue, job_id: str) -> dict:
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@router.post("", status_code=202, response_model=ApiResponse[JobStatusResponse])
+async def submit_job(
+    file: UploadFile = File(...),
+    target_language: str = Form(...),
+    priority: int = Form(0),
+    whisper: WhisperService = Depends(get_whisper_service),
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    """Queue an audio file for transcription and translation"""
+    audio = await whisper.ingest(file)
+    job = await job_queue.submit(audio, target_language, priority)
+    return ApiResponse(data=_job_status(job))
+
+
+@router.get("/{job_id}", response_model=ApiResponse[JobStatusResponse])
+async def get_job(job_id: str, job_queue: JobQueue = Depends(get_job_queue)):
+    """Get the status of a job"""
+    return ApiResponse(data=_job_status(await _get_job(job_queue, job_id)))
+
+
+@router.get("/{job_id}/result", response_model=ApiResponse[TranscribeAndTranslate])
+async def get_job_result(job_id: str, job_queue: JobQueue = Depends(get_job_queue)):
+    """Get the result of a finished job"""
+    job = await _get_job(job_queue, job_id)
+    if job["status"] != JobStatus.SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}, no result available.")
+    return ApiResponse(data=job_result(job))
+
+
+@router.delete("/{job_id}", response_model=ApiResponse[JobStatusResponse])
+async def cancel_job(job_id: str, job_queue: JobQueue = Depends(get_job_queue)):
+    """Cancel a queued or running job"""
+    job = await job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return ApiResponse(data=_job_status(job))
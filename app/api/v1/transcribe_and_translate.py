@@ -1,15 +1,48 @@
-from fastapi import APIRouter, UploadFile, File, Form
+from __future__ import annotations
+import json
+from typing import AsyncIterator, TYPE_CHECKING
+from fastapi import APIRouter, Depends, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from app.api.dependencies import get_whisper_service
 from app.schema import ApiResponse, TranscribeAndTranslate
-from app.services.whisper_service import WhisperService
+
+if TYPE_CHECKING:
+    from app.services.whisper_service import WhisperService
 
 router = APIRouter()
-whisper = WhisperService()
 
 @router.post("", response_model=ApiResponse[TranscribeAndTranslate])
 async def transcribe_and_translate(
     file: UploadFile = File(...),
-    target_language: str = Form(...)
+    target_language: str = Form(...),
+    whisper: WhisperService = Depends(get_whisper_service)
 ):
     """Transcribe audio and translate the result"""
     result = await whisper.transcribe_and_translate(file, target_language)
     return ApiResponse(data=result)
+
+
+async def _server_sent_events(events: AsyncIterator) -> AsyncIterator[str]:
+    async for event, payload in events:
+        yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@router.post("/stream")
+async def stream_transcribe_and_translate(
+    file: UploadFile = File(...),
+    target_language: str = Form(...),
+    whisper: WhisperService = Depends(get_whisper_service)
+):
+    """
+    Transcribe audio and translate the result, streaming progress as server-sent events.
+
+    Emits `transcript` events for each transcript segment, `translation` events
+    with translated tokens as they arrive, and a final `result` event carrying
+    the TranscribeAndTranslate payload (or an `error` event).
+    """
+    audio = await whisper.ingest(file)
+    return StreamingResponse(
+        _server_sent_events(whisper.stream_transcribe_and_translate(audio, target_language)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, UploadFile, File
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from fastapi import APIRouter, Depends, UploadFile, File
 from fastapi.responses import JSONResponse
+from app.api.dependencies import get_whisper_service
 from app.schema import TranscriptionResponse
-from app.services.whisper_service import WhisperService
+
+if TYPE_CHECKING:
+    from app.services.whisper_service import WhisperService
 
 router = APIRouter()
-whisper = WhisperService()
 
 @router.post("", response_model=TranscriptionResponse)
-async def transcribe_audio(file: UploadFile = File(...)):
+async def transcribe_audio(
+    file: UploadFile = File(...),
+    whisper: WhisperService = Depends(get_whisper_service)
+):
     """
     Transcribe an uploaded audio file into English text using Whisper API.
     """
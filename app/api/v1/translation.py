@@ -1,14 +1,21 @@
-from fastapi import APIRouter
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from fastapi import APIRouter, Depends
+from app.api.dependencies import get_gpt_service, get_translation_service
 from app.schema import TranslationRequest, TranslationResponse
-from app.services.gpt_service import GptService
-from app.services.hugginface_tr import WhisperService
+
+if TYPE_CHECKING:
+    from app.services.gpt_service import GptService
+    from app.services.hugginface_tr import WhisperService
 
 router = APIRouter()
-translator = GptService()
-hugging_face = WhisperService()
 
 @router.post("", response_model=TranslationResponse)
-async def translate_text(req: TranslationRequest):
+async def translate_text(
+    req: TranslationRequest,
+    translator: GptService = Depends(get_gpt_service),
+    hugging_face: WhisperService = Depends(get_translation_service)
+):
     """
     Translate transcript English text into the specified target language using GPT.
     """
@@ -1,10 +1,43 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from app.utils import startup_profile  # First, so the import phase covers everything below
+from dotenv import load_dotenv
+load_dotenv(override=True)  # Before any module reads its settings from the environment
+
+from fastapi import FastAPI, Response
 # from app.api.v1.translation import router as translation_router
 # from app.api.v1.transcription import router as transcription_router
 from app.api.v1.transcribe_and_translate import router as transcribe_and_translate_router
+from app.api.v1.batch import router as batch_router
+from app.api.v1.jobs import router as jobs_router
 from fastapi.middleware.cors import CORSMiddleware
+from app.api.middleware import (
+    AdmissionMiddleware, RequestDeadlineMiddleware, RequestIdMiddleware, RequestMetricsMiddleware, UploadSizeLimitMiddleware
+)
+from app.services.audio_ingest import MAX_LONG_AUDIO_MB
+from app.services.container import ServiceContainer
+from app.utils.logger import setup_logging, shutdown_logging
+from app.utils.metrics import render_metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    # One set of pooled clients and one instance of each service per process, built on first use
+    services = ServiceContainer()
+    app.state.services = services
+    with startup_profile.timed_phase("lifespan"):
+        # e.g. SERVICE_WARMUP=all to pay the build cost before the first request instead of during it
+        services.warm_up(os.getenv("SERVICE_WARMUP", "").split(","))
+        # Workers resolve the whisper service when they pick up their first job
+        services.job_queue.start(
+            lambda audio, target_language: services.whisper_service.transcribe_and_translate_audio(audio, target_language)
+        )
+    yield
+    await services.aclose()
+    shutdown_logging()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Multilingual Transcription & Translation API",
     description="Transcribe audio and translate text using OpenAI's Whisper and GPT models.",
     version="1.0.0"
@@ -15,21 +48,51 @@ ALLOWED_ORIGINS = [
     "http://localhost:5173"
 ]
 
+# Largest accepted request body: the long-audio limit plus multipart overhead
+MAX_UPLOAD_BYTES = (MAX_LONG_AUDIO_MB + 1) * 1024 * 1024
+
 # Middleware
+app.add_middleware(
+    RequestDeadlineMiddleware,
+    timeout_seconds=float(os.getenv("REQUEST_DEADLINE_SECONDS", "900")),
+    transcription_share=float(os.getenv("REQUEST_TRANSCRIPTION_SHARE", "0.75")),
+)
+app.add_middleware(UploadSizeLimitMiddleware, max_body_bytes=MAX_UPLOAD_BYTES)
+app.add_middleware(
+    AdmissionMiddleware,
+    max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "16")),
+    max_in_flight_bytes=int(os.getenv("ADMISSION_MAX_IN_FLIGHT_MB", "512")) * 1024 * 1024,
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "64")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10")),
+    rate_per_minute=float(os.getenv("RATE_LIMIT_PER_MINUTE", "60")),
+    burst=int(os.getenv("RATE_LIMIT_BURST", "10")),
+    trust_forwarded_for=os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true",
+    max_read_ahead_bytes=int(os.getenv("ADMISSION_READ_AHEAD_KB", "1024")) * 1024,
+)
+app.add_middleware(RequestMetricsMiddleware, server_timing=os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true")
+app.add_middleware(RequestIdMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS, # I need to adjust this when in production
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Retry-After", "X-Request-ID"],
 )
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 # app.include_router(transcription_router, prefix="/transcribe", tags=["Transcription"])
 # app.include_router(translation_router, prefix="/translate", tags=["Translation"])
 app.include_router(transcribe_and_translate_router, prefix="/v1/transcribe-and-translate", tags=["Translate-and-Transcribe"])
+app.include_router(batch_router, prefix="/v1/batch", tags=["Batch"])
+app.include_router(jobs_router, prefix="/v1/jobs", tags=["Jobs"])
 
-
+startup_profile.record_phase("import", startup_profile.since_start())
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Generic, TypeVar
+from typing import Generic, List, Optional, TypeVar
 
 T = TypeVar("T")
 
@@ -20,3 +20,25 @@ class TranscribeAndTranslate(BaseModel):
     transcription: str
     translation: str
     target_language: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    priority: int
+    target_language: str
+    filename: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+class BatchTranslation(BaseModel):
+    target_language: str
+    translation: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchItem(BaseModel):
+    filename: str
+    transcription: Optional[str] = None
+    translations: List[BatchTranslation] = []
+    error: Optional[str] = None
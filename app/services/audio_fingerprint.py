@@ -0,0 +1,470 @@
+import os
+import math
+import time
+import wave
+import sqlite3
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from app.utils.logger import logger
+from app.utils.paths import data_path
+from .audio_preprocess import StreamingResampler
+from .audio_segmenter import UnsupportedAudioError, decode_to_wav, pcm_to_float
+
+
+FINGERPRINT_RATE = 8000
+WINDOW = 1024  # 128 ms at 8 kHz, 7.8 Hz per bin
+HOP = 256  # 32 ms per frame
+BLOCK_SECONDS = 10
+# Spectrum bin edges of the bands a peak is picked from, 62 Hz to 4 kHz
+BAND_EDGES = (8, 16, 32, 64, 128, 256, 512)
+# A peak must be the loudest point of its band within this many frames either side
+PEAK_RADIUS = 10
+# Roughly -70 dBFS for a sine; quieter peaks are noise floor or silence
+MIN_PEAK_DB = -20.0
+# Peaks this far below the loudest band of their frame are leakage or background noise
+MAX_PEAK_RANGE_DB = 30.0
+# Each peak is paired with this many following peaks no more than MAX_DELTA frames later
+FAN_OUT = 3
+MAX_DELTA = 63
+# Hash layout: 9 bits per peak frequency bin and 6 bits of frames between the peaks
+FREQUENCY_BITS = 9
+DELTA_BITS = 6
+# Bumped whenever hashes are computed differently; older indexes are rebuilt from scratch
+SCHEMA_VERSION = 2
+# Relative duration difference tolerated between an upload and its match, on top of
+# FingerprintIndex.max_duration_difference; codecs pad or trim a few frames at either end
+MAX_DURATION_RATIO = 0.02
+# Largest number of parameters bound into one SQLite statement
+_SQL_CHUNK = 500
+
+
+@dataclass
+class Fingerprint:
+    """
+    Landmark hashes of an audio file: each hash encodes two spectral peaks
+    and the time between them, each offset is the frame of the first peak.
+    """
+    hashes: np.ndarray
+    offsets: np.ndarray
+    duration: float
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+
+def _mono_blocks(file: BinaryIO, container: str) -> Iterator[Tuple[np.ndarray, int]]:
+    """
+    Yields (mono samples, sample rate) blocks of the decoded audio.
+    """
+    file.seek(0)
+    decoded = decode_to_wav(file, container) if container != "wav" else None
+    try:
+        with wave.open(decoded or file, "rb") as reader:
+            channels, sample_width, rate = reader.getnchannels(), reader.getsampwidth(), reader.getframerate()
+            block = rate * BLOCK_SECONDS
+            while True:
+                raw = reader.readframes(block)
+                if not raw:
+                    break
+                yield pcm_to_float(raw, sample_width, channels).mean(axis=1), rate
+    except (wave.Error, EOFError) as e:
+        raise UnsupportedAudioError(f"Could not read WAV audio: {e}") from e
+    finally:
+        if decoded is not None:
+            decoded.close()
+        file.seek(0)
+
+
+def _band_peaks(file: BinaryIO, container: str) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Streams the audio through a short-time spectrum and keeps, per frame and
+    band, the loudest bin and its level.
+
+    Returns:
+        tuple: (frames, bands) arrays of bin indices and levels in dB, and the duration in seconds
+    """
+    window = np.hanning(WINDOW).astype(np.float32)
+    resampler: Optional[StreamingResampler] = None
+    carry = np.zeros(0, dtype=np.float32)
+    bins: List[np.ndarray] = []
+    levels: List[np.ndarray] = []
+    samples = 0
+    rate = FINGERPRINT_RATE
+
+    for block, rate in _mono_blocks(file, container):
+        samples += len(block)
+        if rate != FINGERPRINT_RATE:
+            resampler = resampler or StreamingResampler(rate, FINGERPRINT_RATE)
+            block = resampler.process(block)
+        buffer = np.concatenate([carry, block])
+        count = (len(buffer) - WINDOW) // HOP + 1 if len(buffer) >= WINDOW else 0
+        carry = buffer[count * HOP:]
+        if count == 0:
+            continue
+
+        frames = sliding_window_view(buffer, WINDOW)[::HOP][:count] * window
+        spectrum = np.abs(np.fft.rfft(frames, axis=1))
+        block_bins = np.empty((count, len(BAND_EDGES) - 1), dtype=np.int32)
+        block_levels = np.empty((count, len(BAND_EDGES) - 1), dtype=np.float32)
+        rows = np.arange(count)
+        for band, (low, high) in enumerate(zip(BAND_EDGES, BAND_EDGES[1:])):
+            peak = low + np.argmax(spectrum[:, low:high], axis=1)
+            level = spectrum[rows, peak]
+            # A maximum on the band edge is the skirt of a peak in the next band, not a peak
+            is_peak = (level >= spectrum[rows, peak - 1]) & (level >= spectrum[rows, np.minimum(peak + 1, WINDOW // 2)])
+            block_bins[:, band] = peak
+            block_levels[:, band] = np.where(is_peak, level, 0)
+        bins.append(block_bins)
+        levels.append(20 * np.log10(block_levels + 1e-9))
+
+    if not bins:
+        empty = np.zeros((0, len(BAND_EDGES) - 1))
+        return empty.astype(np.int32), empty.astype(np.float32), samples / rate
+    return np.concatenate(bins), np.concatenate(levels), samples / rate
+
+
+def compute_fingerprint(file: BinaryIO, container: str) -> Fingerprint:
+    """
+    Computes landmark hashes that survive re-encoding: the same recording sent
+    as WAV, MP3 or M4A yields largely the same hashes at the same offsets.
+
+    Args:
+        file (BinaryIO): Audio file, rewound again afterwards
+        container (str): Container name, e.g. "wav" or "mp3"; anything other than
+            WAV needs pydub and ffmpeg to decode
+
+    Returns:
+        Fingerprint: The hashes, their offsets in frames and the duration
+    """
+    bins, levels, duration = _band_peaks(file, container)
+    if len(bins) == 0:
+        return Fingerprint(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), duration)
+
+    # Peaks are the loudest point of their band over a neighbourhood in time
+    padded = np.pad(levels, ((PEAK_RADIUS, PEAK_RADIUS), (0, 0)), constant_values=-np.inf)
+    neighbourhood = sliding_window_view(padded, 2 * PEAK_RADIUS + 1, axis=0).max(axis=2)
+    loud = (levels > MIN_PEAK_DB) & (levels > levels.max(axis=1, keepdims=True) - MAX_PEAK_RANGE_DB)
+    frame_index, band_index = np.nonzero((levels >= neighbourhood) & loud)
+    peak_times = frame_index.astype(np.int64)
+    peak_bins = bins[frame_index, band_index].astype(np.int64)
+
+    hashes: List[np.ndarray] = []
+    offsets: List[np.ndarray] = []
+    for step in range(1, FAN_OUT + 1):
+        anchor_times, target_times = peak_times[:-step], peak_times[step:]
+        delta = target_times - anchor_times
+        paired = delta <= MAX_DELTA
+        hashes.append(
+            (peak_bins[:-step][paired] << (FREQUENCY_BITS + DELTA_BITS))
+            | (peak_bins[step:][paired] << DELTA_BITS)
+            | delta[paired]
+        )
+        offsets.append(anchor_times[paired])
+    return Fingerprint(np.concatenate(hashes), np.concatenate(offsets), duration)
+
+
+@dataclass
+class FingerprintMatch:
+    cache_key: str
+    transcript: str
+    similarity: float
+    # Hashes that line up at the best offset
+    matches: int
+    duration: float
+
+
+class FingerprintIndex:
+    """
+    Persistent inverted index from landmark hashes to the uploads they occur in.
+
+    Postings live in an SQLite table clustered on the hash, so each hash of a
+    query is one B-tree seek. What a lookup costs is the postings it reads,
+    so it reads few: hashes found in more than max_hash_uploads uploads are
+    too common to tell uploads apart and are skipped, and a long query is
+    sampled down to its max_query_hashes lowest hash values (a bottom-k
+    sample, so a re-encoded copy samples the same hashes as its original).
+    Postings are keyed on the hash and then the upload's duration, so those
+    of uploads of another length are never read.
+
+    Candidates are scored by the number of sampled hashes that agree on a
+    single time offset, which rejects uploads that merely share some common
+    sounds. Only uploads whose duration is within max_duration_difference
+    seconds (or 2%) of the query are candidates, and one matches when its
+    count, scaled back up to the whole query, covers at least threshold of
+    the larger fingerprint and is at least min_matches, so that a handful of
+    chance coincidences cannot reuse the transcript of a short clip. The
+    transcript of every indexed upload is stored alongside, so a match can
+    be answered without the transcript cache.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        threshold: float = 0.2,
+        max_entries: int = 100_000,
+        min_matches: int = 10,
+        max_duration_difference: float = 0.5,
+        max_query_hashes: int = 256,
+        max_hash_uploads: int = 1000
+    ):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.min_matches = min_matches
+        self.max_duration_difference = max_duration_difference
+        self.max_query_hashes = max_query_hashes
+        self.max_hash_uploads = max_hash_uploads
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        # Hashes in more than max_hash_uploads uploads, kept in memory so lookups need not ask
+        self._common: Set[int] = set()
+
+    async def lookup(self, scope: str, fingerprint: Fingerprint) -> Optional[FingerprintMatch]:
+        """
+        Finds a previously indexed upload that sounds the same.
+
+        Args:
+            scope (str): Model and language the transcript must have been made with
+            fingerprint (Fingerprint): Fingerprint of the new upload
+
+        Returns:
+            FingerprintMatch: The best match above the threshold, or None
+        """
+        match = await asyncio.to_thread(self._lookup, scope, fingerprint)
+        if match is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return match
+
+    async def add(self, scope: str, cache_key: str, fingerprint: Fingerprint, transcript: str) -> None:
+        if len(fingerprint):
+            await asyncio.to_thread(self._add, scope, cache_key, fingerprint, transcript)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": self._entries,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # Hashes of an older layout can never match new ones
+                db.executescript(
+                    "DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS hash_counts; DROP TABLE IF EXISTS audio;"
+                )
+                db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS audio ("
+                "id INTEGER PRIMARY KEY, cache_key TEXT NOT NULL UNIQUE, scope TEXT NOT NULL, "
+                "transcript TEXT NOT NULL, duration REAL NOT NULL, hash_count INTEGER NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            # The upload's duration in milliseconds is part of the key, so that each
+            # hash of a query reads only the postings of uploads of about its length
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "hash INTEGER NOT NULL, duration_ms INTEGER NOT NULL, audio_id INTEGER NOT NULL, "
+                "offset INTEGER NOT NULL, PRIMARY KEY (hash, duration_ms, audio_id, offset)) WITHOUT ROWID"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_postings_audio ON postings(audio_id)")
+            # Number of uploads each hash occurs in, to skip the common ones
+            db.execute("CREATE TABLE IF NOT EXISTS hash_counts (hash INTEGER PRIMARY KEY, uploads INTEGER NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS idx_hash_counts_uploads ON hash_counts(uploads)")
+            db.commit()
+            self._entries = db.execute("SELECT COUNT(*) FROM audio").fetchone()[0]
+            self._common = {
+                row[0] for row in db.execute("SELECT hash FROM hash_counts WHERE uploads > ?", (self.max_hash_uploads,))
+            }
+            self._db = db
+        return self._db
+
+    def _sample(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Returns at most max_query_hashes of the unique hashes, the same ones for
+        any fingerprint that contains them.
+        """
+        unique_hashes = np.unique(hashes)
+        if len(unique_hashes) <= self.max_query_hashes:
+            return unique_hashes
+        # Hash values cluster in the speech band, so rank them by a scrambled value instead
+        scrambled = (unique_hashes.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(40)
+        return unique_hashes[np.argsort(scrambled, kind="stable")[:self.max_query_hashes]]
+
+    def _lookup(self, scope: str, fingerprint: Fingerprint) -> Optional[FingerprintMatch]:
+        if not len(fingerprint):
+            return None
+        sampled = self._sample(fingerprint.hashes).tolist()
+        # A recording of a different length is different audio, however many hashes it shares
+        tolerance = max(self.max_duration_difference, MAX_DURATION_RATIO * fingerprint.duration)
+        shortest = math.floor((fingerprint.duration - tolerance) * 1000)
+        longest = math.ceil((fingerprint.duration + tolerance) * 1000)
+        try:
+            with self._db_lock:
+                db = self._connect()
+                used = [hash_value for hash_value in sampled if hash_value not in self._common]
+                rows = []
+                for start in range(0, len(used), _SQL_CHUNK):
+                    chunk = used[start:start + _SQL_CHUNK]
+                    rows.extend(db.execute(
+                        f"SELECT hash, audio_id, offset FROM postings "
+                        f"WHERE hash IN ({','.join('?' * len(chunk))}) AND duration_ms BETWEEN ? AND ?",
+                        [*chunk, shortest, longest]
+                    ).fetchall())
+                candidates = self._score(fingerprint, np.array(rows, dtype=np.int64).reshape(-1, 3))
+                ids = [audio_id for audio_id, matches in candidates.items() if matches >= self.min_matches]
+                if not ids:
+                    return None
+                audio_rows = db.execute(
+                    f"SELECT id, cache_key, transcript, duration, hash_count FROM audio "
+                    f"WHERE scope = ? AND id IN ({','.join('?' * len(ids))})",
+                    [scope, *ids]
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Fingerprint index read failed: {e}")
+            return None
+
+        # Matches were only counted over the hashes looked up; scale them back to the whole query
+        scale = 1.0
+        if len(used) < len(sampled) or len(sampled) == self.max_query_hashes:
+            looked_up = np.isin(fingerprint.hashes, np.array(used, dtype=np.int64)).sum()
+            scale = len(fingerprint) / looked_up if looked_up else 0.0
+        best: Optional[FingerprintMatch] = None
+        for audio_id, cache_key, transcript, duration, hash_count in audio_rows:
+            similarity = min(candidates[audio_id] * scale / max(hash_count, len(fingerprint)), 1.0)
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = FingerprintMatch(cache_key, transcript, similarity, candidates[audio_id], duration)
+        return best
+
+    @staticmethod
+    def _score(fingerprint: Fingerprint, rows: np.ndarray) -> Dict[int, int]:
+        """
+        Counts, per indexed upload, the most query hashes that line up at one
+        time offset, allowing one frame of jitter.
+        """
+        if len(rows) == 0:
+            return {}
+        order = np.argsort(fingerprint.hashes, kind="stable")
+        query_hashes, query_offsets = fingerprint.hashes[order], fingerprint.offsets[order]
+
+        # Pair every posting with every occurrence of its hash in the query
+        low = np.searchsorted(query_hashes, rows[:, 0], side="left")
+        high = np.searchsorted(query_hashes, rows[:, 0], side="right")
+        repeats = high - low
+        posting = np.repeat(np.arange(len(rows)), repeats)
+        if len(posting) == 0:
+            return {}
+        within = np.arange(len(posting)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        audio_ids = rows[posting, 1]
+        deltas = rows[posting, 2] - query_offsets[np.repeat(low, repeats) + within]
+
+        # One key per (upload, offset difference); neighbouring differences are summed
+        shift = deltas.min()
+        span = deltas.max() - shift + 2
+        keys, counts = np.unique(audio_ids * span + (deltas - shift), return_counts=True)
+        following = np.searchsorted(keys, keys + 1)
+        following_counts = np.where(
+            (following < len(keys)) & (keys[np.minimum(following, len(keys) - 1)] == keys + 1),
+            counts[np.minimum(following, len(keys) - 1)],
+            0
+        )
+        scores = counts + following_counts
+        # Keys are sorted, so each upload's keys are contiguous
+        owners = keys // span
+        starts = np.flatnonzero(np.concatenate([[True], owners[1:] != owners[:-1]]))
+        return dict(zip(owners[starts].tolist(), np.maximum.reduceat(scores, starts).tolist()))
+
+    def _over_limit(self, db: sqlite3.Connection, hashes: List[int]) -> List[int]:
+        """
+        Returns those of the hashes found in more than max_hash_uploads uploads.
+        """
+        common = []
+        for start in range(0, len(hashes), _SQL_CHUNK):
+            chunk = hashes[start:start + _SQL_CHUNK]
+            common.extend(row[0] for row in db.execute(
+                f"SELECT hash FROM hash_counts WHERE uploads > ? AND hash IN ({','.join('?' * len(chunk))})",
+                [self.max_hash_uploads, *chunk]
+            ))
+        return common
+
+    def _add(self, scope: str, cache_key: str, fingerprint: Fingerprint, transcript: str) -> None:
+        try:
+            with self._db_lock:
+                db = self._connect()
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO audio (cache_key, scope, transcript, duration, hash_count, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (cache_key, scope, transcript, fingerprint.duration, len(fingerprint), time.time())
+                )
+                if cursor.rowcount == 0:
+                    return
+                audio_id = cursor.lastrowid
+                duration_ms = round(fingerprint.duration * 1000)
+                db.executemany(
+                    "INSERT OR IGNORE INTO postings (hash, duration_ms, audio_id, offset) VALUES (?, ?, ?, ?)",
+                    ((hash_value, duration_ms, audio_id, offset) for hash_value, offset in
+                     zip(fingerprint.hashes.tolist(), fingerprint.offsets.tolist()))
+                )
+                unique_hashes = np.unique(fingerprint.hashes).tolist()
+                db.executemany(
+                    "INSERT INTO hash_counts (hash, uploads) VALUES (?, 1) "
+                    "ON CONFLICT (hash) DO UPDATE SET uploads = uploads + 1",
+                    ((hash_value,) for hash_value in unique_hashes)
+                )
+                self._common.update(self._over_limit(db, unique_hashes))
+                self._entries += 1
+                overflow = self._entries - self.max_entries
+                if overflow > 0:
+                    oldest = [row[0] for row in db.execute("SELECT id FROM audio ORDER BY id LIMIT ?", (overflow,))]
+                    placeholders = ",".join("?" * len(oldest))
+                    evicted = db.execute(
+                        f"SELECT COUNT(DISTINCT audio_id), hash FROM postings WHERE audio_id IN ({placeholders}) GROUP BY hash",
+                        oldest
+                    ).fetchall()
+                    db.executemany("UPDATE hash_counts SET uploads = uploads - ? WHERE hash = ?", evicted)
+                    db.executemany("DELETE FROM hash_counts WHERE hash = ? AND uploads <= 0", ((row[1],) for row in evicted))
+                    was_common = [row[1] for row in evicted if row[1] in self._common]
+                    self._common.difference_update(was_common)
+                    self._common.update(self._over_limit(db, was_common))
+                    db.execute(f"DELETE FROM postings WHERE audio_id IN ({placeholders})", oldest)
+                    db.execute(f"DELETE FROM audio WHERE id IN ({placeholders})", oldest)
+                    self._entries -= len(oldest)
+                    self.evictions += len(oldest)
+                db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Fingerprint index write failed: {e}")
+
+
+_fingerprint_index: Optional[FingerprintIndex] = None
+
+
+def get_fingerprint_index() -> FingerprintIndex:
+    """
+    Returns the process-wide fingerprint index, configured from the environment.
+    """
+    global _fingerprint_index
+    if _fingerprint_index is None:
+        _fingerprint_index = FingerprintIndex(
+            db_path=os.getenv("FINGERPRINT_INDEX_PATH", data_path("fingerprints.db")),
+            threshold=float(os.getenv("FINGERPRINT_MATCH_THRESHOLD", "0.2")),
+            max_entries=int(os.getenv("FINGERPRINT_INDEX_SIZE", "100000")),
+            min_matches=int(os.getenv("FINGERPRINT_MIN_MATCHES", "10")),
+            max_duration_difference=float(os.getenv("FINGERPRINT_MAX_DURATION_DIFFERENCE_SECONDS", "0.5")),
+            max_query_hashes=int(os.getenv("FINGERPRINT_MAX_QUERY_HASHES", "256")),
+            max_hash_uploads=int(os.getenv("FINGERPRINT_MAX_HASH_UPLOADS", "1000")),
+        )
+    return _fingerprint_index
@@ -0,0 +1,154 @@
+import io
+import os
+import shutil
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Optional
+from fastapi import UploadFile, HTTPException
+from app.utils.logger import logger
+from app.utils.metrics import ERRORS, UPLOAD_READ_SECONDS, observe, size_bucket
+
+
+CHUNK_SIZE = 1024 * 1024
+MB = 1024 * 1024
+# Largest upload accepted when long-audio mode can split it into segments
+MAX_LONG_AUDIO_MB = int(os.getenv("MAX_LONG_AUDIO_MB", "500"))
+
+
+@dataclass
+class IngestedAudio:
+    """
+    An upload that has been validated and hashed in a single streaming pass.
+
+    `file` is the spooled upload itself, rewound to the start, so it can be
+    handed to the upstream client without another copy.
+    """
+    file: BinaryIO
+    filename: str
+    container: str
+    size: int
+    digest: str
+
+
+def sniff_container(head: bytes) -> Optional[str]:
+    """
+    Detects the audio container from its magic bytes.
+
+    Returns:
+        str: File extension matching the container, or None if unrecognised.
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return ".wav"
+    if head[4:8] == b"ftyp":
+        return ".m4a" if head[8:12] in (b"M4A ", b"M4B ") else ".mp4"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return ".webm"
+    if head[:4] == b"\x00\x00\x01\xba":
+        return ".mpeg"
+    if head[:4] == b"OggS":
+        return ".ogg"
+    if head[:4] == b"fLaC":
+        return ".flac"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return ".mp3"
+    return None
+
+
+async def ingest_upload(
+    file: UploadFile,
+    allowed_extensions: Iterable[str],
+    max_bytes: int,
+    max_compressed_bytes: Optional[int] = None
+) -> IngestedAudio:
+    """
+    Streams an upload in chunks, enforcing the size limit as chunks are read,
+    sniffing the container and hashing the content.
+
+    Args:
+        file (UploadFile): The uploaded audio file
+        allowed_extensions: Extensions of the containers that are accepted
+        max_bytes (int): Maximum accepted size in bytes
+        max_compressed_bytes (int, optional): Lower limit for containers other than WAV
+
+    Returns:
+        IngestedAudio: The validated upload, rewound and ready to send upstream
+    """
+    if file.size is not None and file.size > max_bytes:
+        ERRORS.labels(stage="ingest", reason="too_large").inc()
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Max size is {max_bytes // MB}MB."
+        )
+
+    with observe(UPLOAD_READ_SECONDS, "upload_read", size_bucket=size_bucket(file.size)) as labels:
+        await file.seek(0)
+        head = await file.read(CHUNK_SIZE)
+        extension = sniff_container(head)
+        if extension is None or extension not in allowed_extensions:
+            logger.error("Unsupported file type. Bad request.")
+            ERRORS.labels(stage="ingest", reason="unsupported_type").inc()
+            raise HTTPException(
+                status_code=400,
+                detail="Unsupported file type. Please upload MP3, WAV, MP4, or M4A."
+            )
+        if extension != ".wav" and max_compressed_bytes is not None:
+            max_bytes = min(max_bytes, max_compressed_bytes)
+
+        digest = hashlib.sha256()
+        size = 0
+        chunk = head
+        while chunk:
+            size += len(chunk)
+            if size > max_bytes:
+                ERRORS.labels(stage="ingest", reason="too_large").inc()
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"File too large. Max size is {max_bytes // MB}MB."
+                )
+            digest.update(chunk)
+            chunk = await file.read(CHUNK_SIZE)
+
+        await file.seek(0)
+        labels["size_bucket"] = size_bucket(size)
+
+    stem = (file.filename or "audio").rsplit(".", 1)[0]
+    return IngestedAudio(
+        file=file.file,
+        filename=f"{stem}{extension}",
+        container=extension.lstrip("."),
+        size=size,
+        digest=digest.hexdigest()
+    )
+
+
+def reopen_upload(file: BinaryIO) -> BinaryIO:
+    """
+    Returns a handle on an upload with its own file offset, which stays
+    readable after the original is closed, e.g. by the request that received
+    it finishing first.
+
+    An upload already on disk is opened again through /proc/self/fd, which
+    shares the data but not the offset; anything else, such as a spool still
+    in memory, is copied into a fresh spool rather than forced to disk.
+
+    Raises:
+        ValueError: If the upload has already been closed
+    """
+    if file.closed:
+        raise ValueError("The upload has already been closed")
+    # SpooledTemporaryFile.fileno() would roll an in-memory spool over to disk
+    if getattr(file, "_rolled", True):
+        try:
+            return open(f"/proc/self/fd/{file.fileno()}", "rb")
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            pass
+    position = file.tell()
+    file.seek(0)
+    copy = tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE)
+    try:
+        shutil.copyfileobj(file, copy, CHUNK_SIZE)
+    finally:
+        file.seek(position)
+    copy.seek(0)
+    return copy
@@ -0,0 +1,182 @@
+import os
+import time
+import wave
+import tempfile
+from collections import deque
+from dataclasses import dataclass
+from typing import BinaryIO, Deque, List, Tuple
+import numpy as np
+from app.services.audio_segmenter import SPOOL_SIZE, UnsupportedAudioError, pcm_to_float
+
+
+TARGET_RATE = 16000
+BLOCK_SECONDS = 10
+
+
+@dataclass
+class PreprocessStats:
+    original_bytes: int
+    processed_bytes: int
+    input_seconds: float
+    output_seconds: float
+    processing_seconds: float
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+
+class StreamingResampler:
+    """
+    Streaming linear-interpolation resampler with a boxcar low-pass in front
+    when downsampling. State carries across blocks so the output matches
+    resampling the whole signal at once.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int):
+        self.step = source_rate / target_rate
+        taps = max(int(round(self.step)), 1)
+        self.kernel = np.full(taps, 1.0 / taps, dtype=np.float32) if taps > 1 else None
+        self.history = np.zeros(taps - 1, dtype=np.float32)
+        self.carry = np.zeros(0, dtype=np.float32)
+        self.consumed = 0
+        self.next_output = 0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if self.kernel is not None:
+            padded = np.concatenate([self.history, block])
+            self.history = padded[len(padded) - len(self.history):]
+            block = np.convolve(padded, self.kernel, mode="valid").astype(np.float32)
+
+        samples = np.concatenate([self.carry, block])
+        base = self.consumed - len(self.carry)
+        self.consumed += len(block)
+        last_output = int(np.floor((base + len(samples) - 1) / self.step))
+        if last_output < self.next_output:
+            self.carry = samples[-1:]
+            return np.zeros(0, dtype=np.float32)
+
+        positions = np.arange(self.next_output, last_output + 1) * self.step - base
+        self.next_output = last_output + 1
+        self.carry = samples[-1:]
+        return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+class _SilenceCompressor:
+    """
+    Energy-based voice activity detection over fixed frames.
+
+    Frames whose RMS level is below threshold_db (dBFS) are silent. Any run of
+    silence longer than keep_seconds is shortened to keep_seconds, keeping
+    half of it after the preceding speech and half before the next speech, so
+    pauses still separate words and sentences.
+    """
+
+    def __init__(self, rate: int, threshold_db: float, keep_seconds: float, frame_seconds: float = 0.03):
+        self.frame = max(int(rate * frame_seconds), 1)
+        self.threshold = 10 ** (threshold_db / 20)
+        keep_frames = max(int(keep_seconds / frame_seconds), 2)
+        self.head_frames = keep_frames // 2
+        self.tail_frames = keep_frames - self.head_frames
+        self.remainder = np.zeros(0, dtype=np.float32)
+        self.silent_run = 0
+        self.tail: Deque[np.ndarray] = deque(maxlen=self.tail_frames)
+
+    def process(self, samples: np.ndarray, final: bool = False) -> np.ndarray:
+        samples = np.concatenate([self.remainder, samples])
+        usable = (len(samples) // self.frame) * self.frame
+        if final and usable < len(samples):
+            # Pad the last partial frame so it is classified like the others
+            samples = np.concatenate([samples, np.zeros(self.frame - (len(samples) - usable), dtype=np.float32)])
+            usable = len(samples)
+        frames = samples[:usable].reshape(-1, self.frame)
+        self.remainder = samples[usable:]
+        if len(frames) == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        silent = np.sqrt(np.mean(np.square(frames), axis=1)) < self.threshold
+        # Boundaries of runs of equal classification, vectorized
+        edges = np.flatnonzero(np.diff(silent.astype(np.int8))) + 1
+        starts = np.concatenate([[0], edges])
+        ends = np.concatenate([edges, [len(frames)]])
+
+        kept: List[np.ndarray] = []
+        for start, end in zip(starts, ends):
+            if not silent[start]:
+                kept.extend(self.tail)
+                self.tail.clear()
+                self.silent_run = 0
+                kept.append(frames[start:end].ravel())
+                continue
+            head = max(min(self.head_frames - self.silent_run, end - start), 0)
+            if head:
+                kept.append(frames[start:start + head].ravel())
+            self.tail.extend(frames[start + head:end])
+            self.silent_run += end - start
+        return np.concatenate(kept) if kept else np.zeros(0, dtype=np.float32)
+
+
+def preprocess_wav(
+    file: BinaryIO,
+    threshold_db: float = -45,
+    keep_silence_seconds: float = 0.6,
+    target_rate: int = TARGET_RATE
+) -> Tuple[BinaryIO, PreprocessStats]:
+    """
+    Downmixes a PCM WAV to mono, resamples it to target_rate and compresses
+    long silences, streaming over the input in blocks so memory stays bounded.
+
+    Args:
+        file (BinaryIO): PCM WAV input
+        threshold_db (float): Frames quieter than this RMS level (dBFS) count as silence
+        keep_silence_seconds (float): Longest silence kept in the output
+        target_rate (int): Output sample rate
+
+    Returns:
+        tuple: A spooled 16-bit mono WAV, rewound, and statistics about the conversion
+    """
+    start = time.perf_counter()
+    file.seek(0, os.SEEK_END)
+    original_bytes = file.tell()
+    file.seek(0)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    try:
+        with wave.open(file, "rb") as reader, wave.open(spool, "wb") as writer:
+            channels, sample_width, rate = reader.getnchannels(), reader.getsampwidth(), reader.getframerate()
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(target_rate)
+
+            resampler = StreamingResampler(rate, target_rate) if rate != target_rate else None
+            compressor = _SilenceCompressor(target_rate, threshold_db, keep_silence_seconds)
+            output_frames = 0
+            block = rate * BLOCK_SECONDS
+            while True:
+                raw = reader.readframes(block)
+                final = len(raw) < block * channels * sample_width
+                mono = pcm_to_float(raw, sample_width, channels).mean(axis=1)
+                if resampler is not None:
+                    mono = resampler.process(mono)
+                kept = compressor.process(mono, final=final)
+                writer.writeframes((np.clip(kept, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+                output_frames += len(kept)
+                if final:
+                    break
+            input_seconds = reader.getnframes() / rate
+    except (wave.Error, EOFError) as e:
+        spool.close()
+        raise UnsupportedAudioError(f"Could not read WAV audio: {e}") from e
+    finally:
+        file.seek(0)
+
+    processed_bytes = spool.tell()
+    spool.seek(0)
+    return spool, PreprocessStats(
+        original_bytes=original_bytes,
+        processed_bytes=processed_bytes,
+        input_seconds=input_seconds,
+        output_seconds=output_frames / target_rate,
+        processing_seconds=time.perf_counter() - start,
+    )
+
@@ -0,0 +1,205 @@
+import re
+import wave
+import shutil
+import tempfile
+import importlib.util
+from difflib import SequenceMatcher
+from typing import BinaryIO, List, Tuple
+import numpy as np
+
+
+SPOOL_SIZE = 1024 * 1024
+COPY_BLOCK_SECONDS = 10
+ENERGY_FRAME_SECONDS = 0.05
+
+
+class UnsupportedAudioError(Exception):
+    """Raised when a container cannot be decoded for segmentation."""
+
+
+def pcm_to_float(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """
+    Converts interleaved little-endian PCM into a (frames, channels) float32
+    array scaled to [-1, 1].
+    """
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        # Keep the two most significant bytes of each 24-bit sample
+        triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        samples = triplets[:, 1:].copy().view("<i2").ravel().astype(np.float32) / 32768.0
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise UnsupportedAudioError(f"Unsupported sample width: {sample_width}")
+    return samples.reshape(-1, channels)
+
+
+def can_decode_compressed() -> bool:
+    """
+    Tells whether compressed containers can be decoded for splitting, which
+    needs both pydub and an ffmpeg binary on the PATH.
+    """
+    return importlib.util.find_spec("pydub") is not None and shutil.which("ffmpeg") is not None
+
+
+def decode_to_wav(file: BinaryIO, container: str) -> BinaryIO:
+    """
+    Decodes a compressed container into a 16 kHz mono WAV spool using pydub.
+
+    pydub (and ffmpeg) are optional; without them only WAV input can be split.
+    """
+    try:
+        from pydub import AudioSegment
+    except ImportError as e:
+        raise UnsupportedAudioError("pydub is not installed") from e
+
+    audio = AudioSegment.from_file(file, format=container)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    audio.set_channels(1).set_frame_rate(16000).export(spool, format="wav")
+    spool.seek(0)
+    return spool
+
+
+def _quietest_frame(reader: wave.Wave_read, start: int, end: int) -> int:
+    """
+    Returns the frame index at the centre of the lowest-energy window in [start, end).
+    """
+    reader.setpos(start)
+    samples = pcm_to_float(reader.readframes(end - start), reader.getsampwidth(), reader.getnchannels())
+    window = max(int(reader.getframerate() * ENERGY_FRAME_SECONDS), 1)
+    usable = (len(samples) // window) * window
+    if usable == 0:
+        return end
+    energy = np.square(samples[:usable].mean(axis=1)).reshape(-1, window).mean(axis=1)
+    return start + int(np.argmin(energy)) * window + window // 2
+
+
+def plan_segments(
+    reader: wave.Wave_read,
+    segment_seconds: float,
+    overlap_seconds: float,
+    search_seconds: float
+) -> List[Tuple[int, int]]:
+    """
+    Plans overlapping (start, end) frame ranges, moving each cut to the
+    quietest point in the search window before its nominal position.
+    """
+    rate = reader.getframerate()
+    total = reader.getnframes()
+    segment = int(segment_seconds * rate)
+    overlap = int(overlap_seconds * rate)
+    search = int(search_seconds * rate)
+
+    ranges = []
+    start = 0
+    while start < total:
+        end = start + segment
+        if end >= total:
+            ranges.append((start, total))
+            break
+        search_start = max(end - search, start + overlap + 1)
+        end = _quietest_frame(reader, search_start, end)
+        ranges.append((start, end))
+        start = max(end - overlap, start + 1)
+    return ranges
+
+
+def split_wav(
+    file: BinaryIO,
+    max_segment_bytes: int,
+    segment_seconds: float = 600,
+    overlap_seconds: float = 3,
+    search_seconds: float = 15
+) -> List[BinaryIO]:
+    """
+    Splits a WAV file into overlapping WAV segments that each fit under
+    max_segment_bytes, preferring silence as the cut point.
+
+    Audio is copied in blocks so memory stays bounded by the block size.
+
+    Returns:
+        list: Spooled WAV files, rewound and ready to upload
+    """
+    file.seek(0)
+    with wave.open(file, "rb") as reader:
+        params = reader.getparams()
+        bytes_per_second = params.framerate * params.nchannels * params.sampwidth
+        # Leave headroom for the WAV header
+        segment_seconds = min(segment_seconds, (max_segment_bytes * 0.95) / bytes_per_second)
+        if segment_seconds <= overlap_seconds:
+            raise UnsupportedAudioError("Segment length must exceed the overlap")
+        search_seconds = min(search_seconds, (segment_seconds - overlap_seconds) / 2)
+
+        segments = []
+        block = params.framerate * COPY_BLOCK_SECONDS
+        for start, end in plan_segments(reader, segment_seconds, overlap_seconds, search_seconds):
+            spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+            with wave.open(spool, "wb") as writer:
+                writer.setparams(params)
+                reader.setpos(start)
+                position = start
+                while position < end:
+                    count = min(block, end - position)
+                    writer.writeframes(reader.readframes(count))
+                    position += count
+            spool.seek(0)
+            segments.append(spool)
+    file.seek(0)
+    return segments
+
+
+def split_audio(file: BinaryIO, container: str, max_segment_bytes: int, **kwargs) -> List[BinaryIO]:
+    """
+    Splits any supported container into overlapping WAV segments.
+    """
+    if container != "wav":
+        file = decode_to_wav(file, container)
+    try:
+        return split_wav(file, max_segment_bytes, **kwargs)
+    except (wave.Error, EOFError) as e:
+        raise UnsupportedAudioError(f"Could not read WAV audio: {e}") from e
+
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+class TranscriptStitcher:
+    """
+    Joins segment transcripts in order, dropping words the next segment
+    repeats from the overlap with the previous one.
+    """
+
+    def __init__(self, max_overlap_words: int = 20, min_match_words: int = 2, max_trailing_words: int = 2):
+        self.max_overlap_words = max_overlap_words
+        self.min_match_words = min_match_words
+        self.max_trailing_words = max_trailing_words
+        self._tail: List[str] = []
+
+    def add(self, text: str) -> str:
+        """
+        Adds the next segment transcript and returns the part of it that is new.
+        """
+        words = text.split()
+        new_words = words[self._overlap_length(words):]
+        self._tail = (self._tail + new_words)[-self.max_overlap_words:]
+        return " ".join(new_words)
+
+    def _overlap_length(self, words: List[str]) -> int:
+        if not self._tail or not words:
+            return 0
+        tail = [_normalize_word(word) for word in self._tail]
+        head = [_normalize_word(word) for word in words[:self.max_overlap_words]]
+        match = SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(0, len(tail), 0, len(head))
+        if match.size == 0 or match.size < min(self.min_match_words, len(head)):
+            return 0
+        # The overlap has to sit at the very end of the previous segment
+        unmatched_tail = len(tail) - (match.a + match.size)
+        if unmatched_tail > self.max_trailing_words:
+            return 0
+        # Skip the matched words plus the words the previous tail already covered after the match
+        return min(match.b + match.size + unmatched_tail, len(words))
+
@@ -0,0 +1,68 @@
+import os
+from typing import Optional
+import aiohttp
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+
+class ClientRegistry:
+    """
+    Process-wide upstream clients with pooled, keep-alive connections.
+
+    Holds one AsyncOpenAI client and one aiohttp session so that every request
+    reuses warm TCP/TLS connections. Created and closed by the application
+    lifespan.
+    """
+
+    def __init__(
+        self,
+        openai_api_key: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_seconds: float = 30
+    ):
+        self.openai_api_key = openai_api_key
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_seconds = keepalive_seconds
+        # Retries are handled by app.services.resilience so they share backoff and circuit state
+        self.openai = AsyncOpenAI(
+            api_key=openai_api_key,
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=keepalive_seconds
+                )
+            )
+        )
+        self._http_session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_env(cls) -> "ClientRegistry":
+        return cls(
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_seconds=float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30")),
+        )
+
+    @property
+    def http_session(self) -> aiohttp.ClientSession:
+        """
+        The shared aiohttp session, created on first use inside the running loop.
+        """
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    keepalive_timeout=self.keepalive_seconds
+                )
+            )
+        return self._http_session
+
+    async def aclose(self) -> None:
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        await self.openai.close()
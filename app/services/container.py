@@ -0,0 +1,99 @@
+from typing import TYPE_CHECKING, Iterable, Optional
+from app.utils.logger import logger
+from app.utils.metrics import register_cache_stats
+from app.utils.startup_profile import timed_phase
+
+if TYPE_CHECKING:
+    from app.services.clients import ClientRegistry
+    from app.services.gpt_service import GptService
+    from app.services.hugginface_tr import WhisperService as TranslationService
+    from app.services.job_queue import JobQueue
+    from app.services.whisper_service import WhisperService
+
+
+class ServiceContainer:
+    """
+    Builds the process-wide services on first use.
+
+    Service modules are imported when their service is first needed, so
+    importing the app does not load the OpenAI SDK, NumPy or the caches, and
+    a process only pays for the services it actually uses. warm_up() builds
+    services ahead of time, e.g. during the application lifespan.
+    """
+
+    SERVICES = ("clients", "whisper_service", "translation_service", "gpt_service", "job_queue")
+
+    def __init__(self):
+        self._clients: Optional["ClientRegistry"] = None
+        self._whisper_service: Optional["WhisperService"] = None
+        self._translation_service: Optional["TranslationService"] = None
+        self._gpt_service: Optional["GptService"] = None
+        self._job_queue: Optional["JobQueue"] = None
+
+    @property
+    def clients(self) -> "ClientRegistry":
+        if self._clients is None:
+            with timed_phase("build:clients"):
+                from app.services.clients import ClientRegistry
+                self._clients = ClientRegistry.from_env()
+        return self._clients
+
+    @property
+    def whisper_service(self) -> "WhisperService":
+        if self._whisper_service is None:
+            clients = self.clients
+            with timed_phase("build:whisper_service"):
+                from app.services.whisper_service import WhisperService
+                self._whisper_service = WhisperService(clients)
+            register_cache_stats({
+                "transcript": self._whisper_service.transcript_cache.stats,
+                "translation_memory": self._whisper_service.translation_memory.stats,
+                "fingerprint": self._whisper_service.fingerprint_index.stats,
+            })
+        return self._whisper_service
+
+    @property
+    def translation_service(self) -> "TranslationService":
+        if self._translation_service is None:
+            clients = self.clients
+            with timed_phase("build:translation_service"):
+                from app.services.hugginface_tr import WhisperService as TranslationService
+                self._translation_service = TranslationService(clients)
+        return self._translation_service
+
+    @property
+    def gpt_service(self) -> "GptService":
+        if self._gpt_service is None:
+            clients = self.clients
+            with timed_phase("build:gpt_service"):
+                from app.services.gpt_service import GptService
+                self._gpt_service = GptService(clients)
+        return self._gpt_service
+
+    @property
+    def job_queue(self) -> "JobQueue":
+        if self._job_queue is None:
+            with timed_phase("build:job_queue"):
+                from app.services.job_queue import JobQueue
+                self._job_queue = JobQueue.from_env()
+        return self._job_queue
+
+    def warm_up(self, names: Iterable[str]) -> None:
+        """
+        Builds the named services now instead of on their first request.
+
+        Args:
+            names: Service names from SERVICES, or "all"
+        """
+        names = [name.strip() for name in names if name.strip()]
+        for name in (self.SERVICES if "all" in names else names):
+            if name not in self.SERVICES:
+                logger.error(f"Unknown service in warm-up list: {name}")
+                continue
+            getattr(self, name)
+
+    async def aclose(self) -> None:
+        if self._job_queue is not None:
+            await self._job_queue.stop()
+        if self._clients is not None:
+            await self._clients.aclose()
@@ -0,0 +1,66 @@
+import time
+from contextvars import ContextVar, Token
+from typing import Dict, Iterable, Optional, Union
+
+
+class Deadline:
+    """
+    Time budget of one request, shared by every upstream call made for it.
+
+    Stages may be capped at a share of the total, so that transcription
+    cannot use up the time translation needs. A stage without a share may
+    use whatever is left of the whole budget.
+    """
+
+    def __init__(self, seconds: float, stage_shares: Optional[Dict[str, float]] = None):
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+        self.stage_shares = stage_shares or {}
+        # Set when the client went away, so cancelled work can be told apart from other cancellations
+        self.disconnected = False
+
+    def for_stage(self, stage: str) -> float:
+        """
+        Returns the monotonic time by which the stage has to be done.
+        """
+        share = self.stage_shares.get(stage)
+        if share is None:
+            return self.expires_at
+        return min(self.expires_at, self.started_at + (self.expires_at - self.started_at) * share)
+
+
+class SharedDeadline:
+    """
+    Deadline of work done for several requests at once, such as a batched
+    upstream call.
+
+    Each stage ends with the earliest of the requests' deadlines, and the work
+    counts as disconnected only once every one of their clients has gone.
+    """
+
+    def __init__(self, deadlines: Iterable[Deadline]):
+        self.deadlines = list(deadlines)
+
+    def for_stage(self, stage: str) -> float:
+        return min(deadline.for_stage(stage) for deadline in self.deadlines)
+
+    @property
+    def disconnected(self) -> bool:
+        return all(deadline.disconnected for deadline in self.deadlines)
+
+
+AnyDeadline = Union[Deadline, SharedDeadline]
+
+_deadline: ContextVar[Optional[AnyDeadline]] = ContextVar("deadline", default=None)
+
+
+def set_deadline(deadline: Optional[AnyDeadline]) -> Token:
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token: Token) -> None:
+    _deadline.reset(token)
+
+
+def current_deadline() -> Optional[AnyDeadline]:
+    return _deadline.get()
@@ -1,12 +1,21 @@
 import os
+import asyncio
+from typing import Optional
 from app.utils.logger import logger
 from fastapi import HTTPException
-from openai import AsyncOpenAI, OpenAIError
+from openai import OpenAIError
+from app.services.clients import ClientRegistry
+from app.services.resilience import CircuitOpenError, get_resilience
 
 
 class GptService:
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(self, clients: Optional[ClientRegistry] = None):
+        self.client = (clients or ClientRegistry.from_env()).openai
+        self.resilience = get_resilience(
+            "openai:gpt-3.5-turbo",
+            stage="translation",
+            attempt_timeout=float(os.getenv("TRANSLATION_TIMEOUT_SECONDS", "60"))
+        )
 
     async def translate(self, text: str, language: str) -> str:
         try:
@@ -14,16 +23,30 @@ class GptService:
                 f"Translate the following English text into {language}: \n\n{text}"
             )
 
-            response = await self.client.chat.completions.create(
+            response = await self.resilience.call(lambda timeout: self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a professional translator."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
-            )
+                temperature=0.3,
+                timeout=timeout
+            ))
 
             return response.choices[0].message.content.strip()
+        except CircuitOpenError as e:
+            logger.error(f"Translation skipped, {e}")
+            raise HTTPException(
+                status_code=503,
+                detail="The translation service is temporarily unavailable. Please try again later.",
+                headers={"Retry-After": str(int(e.retry_after) + 1)}
+            )
+        except asyncio.TimeoutError:
+            logger.error("Translation timed out")
+            raise HTTPException(
+                status_code=504,
+                detail="The translation service took too long to respond. Please try again later."
+            )
         except OpenAIError as e:
             logger.error(f"OpenAI API error during translation: {e}")
             raise HTTPException(
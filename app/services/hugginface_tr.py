@@ -1,24 +1,55 @@
-from openai import AsyncOpenAI, OpenAIError
+from openai import OpenAIError
 import os
-from fastapi import UploadFile, HTTPException
-import tempfile
+import json
 import aiohttp
+from fastapi import UploadFile, HTTPException
 import asyncio
+from typing import Dict, List, Optional
 from app.utils.logger import logger
+from app.utils.metrics import ERRORS, IN_FLIGHT, TRANSLATION_SECONDS, WHISPER_SECONDS, observe, size_bucket
+from app.services.clients import ClientRegistry
+from app.services.audio_ingest import MB, ingest_upload, reopen_upload
+from app.services.transcript_cache import get_transcript_cache
+from app.services.translation_memory import get_translation_memory, translate_numbered
+from app.services.translation_router import TranslationRouter
+from app.services.singleflight import SingleFlight
+from app.services.micro_batcher import MicroBatcher
+from app.services.resilience import RETRYABLE_STATUS, CircuitOpenError, RetryableError, get_resilience, parse_retry_after
 
 
 class WhisperService:
-    def __init__(self):
-        # OpenAI setup
-        self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(self, clients: Optional[ClientRegistry] = None):
+        # Shared OpenAI client and aiohttp session
+        self.clients = clients or ClientRegistry.from_env()
+        self.openai_client = self.clients.openai
         
         # HuggingFace setup
         self.hf_api_key = os.getenv("HUGGINGFACE_API_KEY")
-        self.hf_base_url = "https://api-inference.huggingface.co/models"
+        self.hf_base_url = os.getenv("HUGGINGFACE_BASE_URL", "https://api-inference.huggingface.co/models")
         
         # File settings
         self.allowed_extensions = {".mp3", ".wav", ".m4a", ".mp4"}
         self.max_file_size_mb = 25
+        self.transcription_model = "whisper-1"
+        self.transcript_cache = get_transcript_cache()
+        self.openai_translation_model = "gpt-3.5-turbo"
+        self.translation_memory = get_translation_memory()
+        # Identical requests in flight at the same time share one upstream call
+        self.transcription_flight = SingleFlight("transcription")
+        self.translation_flight = SingleFlight("translation")
+
+        # Retries, circuit breakers and deadlines shared by every call to the same upstream
+        self.transcription_resilience = get_resilience(
+            f"openai:{self.transcription_model}",
+            stage="transcription",
+            attempt_timeout=float(os.getenv("TRANSCRIPTION_TIMEOUT_SECONDS", "300"))
+        )
+        self.openai_translation_resilience = get_resilience(
+            f"openai:{self.openai_translation_model}",
+            stage="translation",
+            attempt_timeout=float(os.getenv("TRANSLATION_TIMEOUT_SECONDS", "60"))
+        )
+        self.hf_timeout_seconds = float(os.getenv("HUGGINGFACE_TIMEOUT_SECONDS", "30"))
         
         # Translation models
         self.translation_models = {
@@ -28,61 +59,80 @@ class WhisperService:
             "italian": "Helsinki-NLP/opus-mt-en-it",
             "portuguese": "Helsinki-NLP/opus-mt-en-pt",
         }
+        self.default_translation_model = "Helsinki-NLP/opus-mt-en-es"
+
+        # Concurrent requests for the same model are sent to HuggingFace as one batched call
+        self.hf_batch_max_size = int(os.getenv("HUGGINGFACE_BATCH_MAX_SIZE", "32"))
+        self.hf_batch_wait_seconds = float(os.getenv("HUGGINGFACE_BATCH_WAIT_MS", "10")) / 1000
+        self.hf_batchers: Dict[str, MicroBatcher] = {}
+
+        # Picks the fastest healthy backend per request and hedges slow ones
+        self.translation_router = TranslationRouter.from_env()
 
     async def transcribe(self, file: UploadFile) -> str:
         """Transcribe audio using OpenAI Whisper (unchanged)"""
-        # Validating file type
-        if not any(file.filename.endswith(ext) for ext in self.allowed_extensions):
+        # Validate type and size while streaming over the upload
+        audio = await ingest_upload(file, self.allowed_extensions, self.max_file_size_mb * MB)
+
+        # Serve repeated uploads from the transcript cache
+        cache_key = self.transcript_cache.make_key(audio.digest, self.transcription_model)
+        cached_transcript = await self.transcript_cache.get(cache_key)
+        if cached_transcript is not None:
+            return cached_transcript
+
+        try:
+            # Transcribe with OpenAI Whisper straight from the spooled upload
+            with IN_FLIGHT.labels(stage="whisper").track_inprogress(), \
+                    observe(WHISPER_SECONDS, "whisper", model=self.transcription_model, size_bucket=size_bucket(audio.size)):
+                response = await self.transcription_flight.do(
+                    cache_key,
+                    lambda: self.transcription_resilience.call(lambda timeout: self._request_transcription(audio, timeout))
+                )
+
+            await self.transcript_cache.set(cache_key, response.text)
+            return response.text
+        except CircuitOpenError as e:
+            logger.error(f"Transcription skipped, {e}")
+            ERRORS.labels(stage="transcription", reason="circuit_open").inc()
             raise HTTPException(
-                status_code=400,
-                detail="Unsupported file type. Please upload MP3, WAV, MP4, or M4A."
+                status_code=503,
+                detail="The transcription service is temporarily unavailable.",
+                headers={"Retry-After": str(int(e.retry_after) + 1)}
             )
-        
-        # Read file content
-        file_content = await file.read()
-        
-        # Check file size
-        file_mb_size = len(file_content) / (1024 * 1024)
-        if file_mb_size > self.max_file_size_mb:
+        except asyncio.TimeoutError:
+            logger.error(f"Transcription of {audio.filename} timed out")
+            ERRORS.labels(stage="transcription", reason="timeout").inc()
             raise HTTPException(
-                status_code=400, 
-                detail=f"File too large. Max size is {self.max_file_size_mb}MB."
+                status_code=504,
+                detail="The transcription service took too long to respond."
             )
-        
-        # Save to tempfile and process
-        tmp_path = None
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[-1]) as tmp:
-                tmp.write(file_content)
-                tmp_path = tmp.name
-
-            # Transcribe with OpenAI Whisper
-            with open(tmp_path, "rb") as audio_file:
-                response = await self.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-            
-            return response.text
         except OpenAIError as e:
             logger.error(f"OpenAI API error: {e}")
+            ERRORS.labels(stage="transcription", reason="upstream").inc()
             raise HTTPException(
                 status_code=502,
                 detail="An error occurred while contacting the transcription service."
             )
         except Exception as e:
             logger.exception(f"Unexpected error during transcription: {e}")
+            ERRORS.labels(stage="transcription", reason="internal").inc()
             raise HTTPException(
                 status_code=500,
                 detail="Something went wrong during transcription."
             )
+
+    async def _request_transcription(self, audio, timeout: float):
+        # Coalesced callers may outlive the request whose upload this is, so read from an own handle
+        file = reopen_upload(audio.file)
+        try:
+            file.seek(0)
+            return await self.openai_client.audio.transcriptions.create(
+                model=self.transcription_model,
+                file=(audio.filename, file),
+                timeout=timeout
+            )
         finally:
-            # Clean up temp file
-            if tmp_path and os.path.exists(tmp_path):
-                try:
-                    os.remove(tmp_path)
-                except Exception:
-                    pass
+            file.close()
 
     async def translate(self, text: str, target_language: str, use_huggingface: bool = False) -> str:
         """
@@ -93,79 +143,193 @@ class WhisperService:
             target_language: Target language
             use_huggingface: If True, use HuggingFace instead of OpenAI
         """
-        if use_huggingface or not os.getenv("OPENAI_API_KEY"):
+        use_huggingface = use_huggingface or not os.getenv("OPENAI_API_KEY")
+        return await self.translation_flight.do(
+            (text, target_language, use_huggingface),
+            lambda: self._translate(text, target_language, use_huggingface)
+        )
+
+    async def _translate(self, text: str, target_language: str, use_huggingface: bool) -> str:
+        if use_huggingface:
             return await self._translate_with_huggingface(text, target_language)
-        else:
-            return await self._translate_with_openai(text, target_language)
+
+        candidates = {
+            f"openai:{self.openai_translation_model}": lambda: self._translate_with_openai(text, target_language)
+        }
+        # Only route to HuggingFace when it has a model for the target language
+        model_name = self.translation_models.get(target_language.lower())
+        if model_name is not None:
+            candidates[f"huggingface:{model_name}"] = lambda: self._translate_with_huggingface(text, target_language)
+
+        translation, _ = await self.translation_router.route(candidates)
+        return translation
 
     async def _translate_with_openai(self, text: str, target_language: str) -> str:
         """Translate using OpenAI"""
         try:
-            prompt = f"Translate the following text into {target_language}: \n\n{text}"
-
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a professional translator."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
+            return await self.translation_memory.translate(
+                text,
+                target_language,
+                backend=f"openai:{self.openai_translation_model}",
+                translate_batch=lambda sentences: self._openai_translate_sentences(sentences, target_language)
+            )
+        except CircuitOpenError as e:
+            # The translation router fails over to HuggingFace where it can
+            logger.error(f"OpenAI translation skipped, {e}")
+            ERRORS.labels(stage="translation", reason="circuit_open").inc()
+            raise HTTPException(
+                status_code=503,
+                detail="Translation service temporarily unavailable",
+                headers={"Retry-After": str(int(e.retry_after) + 1)}
+            )
+        except asyncio.TimeoutError:
+            logger.error("OpenAI translation timed out")
+            ERRORS.labels(stage="translation", reason="timeout").inc()
+            raise HTTPException(
+                status_code=504,
+                detail="Translation service timed out"
             )
-
-            return response.choices[0].message.content.strip()
         except OpenAIError as e:
             logger.error(f"OpenAI API error during translation: {e}")
-            # Fallback to HuggingFace
-            logger.info("Falling back to HuggingFace translation")
-            return await self._translate_with_huggingface(text, target_language)
+            ERRORS.labels(stage="translation", reason="upstream").inc()
+            raise HTTPException(
+                status_code=502,
+                detail="An error occurred while contacting the translation service."
+            )
         except Exception as e:
             logger.exception(f"Unexpected error during OpenAI translation: {e}")
+            ERRORS.labels(stage="translation", reason="internal").inc()
             raise HTTPException(
                 status_code=500,
                 detail="Translation service error"
             )
 
+    async def _openai_translate_sentences(self, sentences: List[str], target_language: str) -> List[str]:
+        """Translate sentences missing from the translation memory in one numbered OpenAI request"""
+        return await translate_numbered(sentences, target_language, self._openai_complete)
+
+    async def _openai_complete(self, prompt: str) -> str:
+        with IN_FLIGHT.labels(stage="translation").track_inprogress(), \
+                observe(TRANSLATION_SECONDS, "translation", backend=f"openai:{self.openai_translation_model}"):
+            response = await self.openai_translation_resilience.call(lambda timeout: self.openai_client.chat.completions.create(
+                model=self.openai_translation_model,
+                messages=[
+                    {"role": "system", "content": "You are a professional translator."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                timeout=timeout
+            ))
+        return response.choices[0].message.content.strip()
+
     async def _translate_with_huggingface(self, text: str, target_language: str) -> str:
         """Translate using HuggingFace"""
         try:
-            model_name = self.translation_models.get(target_language.lower(), "Helsinki-NLP/opus-mt-en-es")
-            
-            headers = {"Content-Type": "application/json"}
-            if self.hf_api_key:
-                headers["Authorization"] = f"Bearer {self.hf_api_key}"
-            
-            payload = {"inputs": text}
-            url = f"{self.hf_base_url}/{model_name}"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        if isinstance(result, list) and len(result) > 0:
-                            return result[0].get("translation_text", "Translation failed").strip()
-                    elif response.status == 503:
-                        # Model loading, wait and retry
-                        await asyncio.sleep(10)
-                        async with session.post(url, json=payload, headers=headers) as retry_response:
-                            if retry_response.status == 200:
-                                result = await retry_response.json()
-                                if isinstance(result, list) and len(result) > 0:
-                                    return result[0].get("translation_text", "Translation failed").strip()
-                    
-                    error_text = await response.text()
-                    logger.error(f"HuggingFace API error {response.status}: {error_text}")
-                    raise HTTPException(
-                        status_code=502,
-                        detail="Translation service temporarily unavailable"
-                    )
-                    
+            model_name = self.translation_models.get(target_language.lower(), self.default_translation_model)
+            return await self.translation_memory.translate(
+                text,
+                target_language,
+                backend=f"huggingface:{model_name}",
+                translate_batch=self._huggingface_batcher(model_name).submit_many
+            )
+        except HTTPException:
+            raise
+        except CircuitOpenError as e:
+            logger.error(f"HuggingFace translation skipped, {e}")
+            ERRORS.labels(stage="translation", reason="circuit_open").inc()
+            raise HTTPException(
+                status_code=503,
+                detail="Translation service temporarily unavailable",
+                headers={"Retry-After": str(int(e.retry_after) + 1)}
+            )
+        except RetryableError as e:
+            logger.error(f"HuggingFace translation failed after retries: {e}")
+            ERRORS.labels(stage="translation", reason="huggingface").inc()
+            raise HTTPException(
+                status_code=502,
+                detail="Translation service temporarily unavailable"
+            )
+        except asyncio.TimeoutError:
+            logger.error("HuggingFace translation timed out")
+            ERRORS.labels(stage="translation", reason="timeout").inc()
+            raise HTTPException(
+                status_code=504,
+                detail="Translation service timed out"
+            )
         except Exception as e:
             logger.exception(f"HuggingFace translation error: {e}")
+            ERRORS.labels(stage="translation", reason="huggingface").inc()
             raise HTTPException(
                 status_code=500,
                 detail="Translation service error"
             )
 
+    def _huggingface_batcher(self, model_name: str) -> MicroBatcher:
+        if model_name not in self.hf_batchers:
+            self.hf_batchers[model_name] = MicroBatcher(
+                f"huggingface:{model_name}",
+                lambda sentences: self._huggingface_translate_sentences(sentences, model_name),
+                max_batch_size=self.hf_batch_max_size,
+                max_wait=self.hf_batch_wait_seconds
+            )
+        return self.hf_batchers[model_name]
+
+    async def _huggingface_translate_sentences(self, sentences: List[str], model_name: str) -> List[str]:
+        """Translate sentences missing from the translation memory with one batched HuggingFace request"""
+        headers = {"Content-Type": "application/json"}
+        if self.hf_api_key:
+            headers["Authorization"] = f"Bearer {self.hf_api_key}"
+
+        payload = {"inputs": sentences}
+        url = f"{self.hf_base_url}/{model_name}"
+
+        resilience = get_resilience(
+            f"huggingface:{model_name}",
+            stage="translation",
+            attempt_timeout=self.hf_timeout_seconds
+        )
+        with IN_FLIGHT.labels(stage="translation").track_inprogress(), \
+                observe(TRANSLATION_SECONDS, "translation", backend=f"huggingface:{model_name}"):
+            return await resilience.call(
+                lambda timeout: self._request_huggingface(url, payload, headers, len(sentences), timeout)
+            )
+
+    async def _request_huggingface(self, url: str, payload: dict, headers: dict, count: int, timeout: float) -> List[str]:
+        async with self.clients.http_session.post(
+            url,
+            json=payload,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            if response.status == 200:
+                result = await response.json()
+                # Anything short of one translation per input is an error, never a placeholder the memory would keep
+                if isinstance(result, list) and len(result) == count and all(
+                    isinstance(item, dict) and isinstance(item.get("translation_text"), str) for item in result
+                ):
+                    return [item["translation_text"].strip() for item in result]
+                logger.error(f"Unexpected HuggingFace response: {result}")
+                raise HTTPException(
+                    status_code=502,
+                    detail="Translation service returned an unexpected response"
+                )
+
+            error_text = await response.text()
+            if response.status in RETRYABLE_STATUS:
+                # A loading model reports how long it expects to take
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                try:
+                    retry_after = float(json.loads(error_text).get("estimated_time", retry_after))
+                except (ValueError, TypeError, AttributeError):
+                    pass
+                raise RetryableError(f"HuggingFace API error {response.status}: {error_text}", response.status, retry_after)
+
+            logger.error(f"HuggingFace API error {response.status}: {error_text}")
+            raise HTTPException(
+                status_code=502,
+                detail="Translation service temporarily unavailable"
+            )
+
     async def transcribe_and_translate(self, file: UploadFile, target_language: str, use_huggingface: bool = False) -> dict:
         """Transcribe and translate with option to choose translation service"""
         transcribed_text = await self.transcribe(file)
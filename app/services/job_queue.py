@@ -0,0 +1,315 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from app.utils.logger import logger, request_id_var
+from app.utils.paths import data_path
+from app.utils.metrics import TEMPFILE_WRITE_SECONDS, observe, size_bucket
+from app.schema import TranscribeAndTranslate
+from app.services.audio_ingest import IngestedAudio
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+JobHandler = Callable[[IngestedAudio, str], Awaitable[TranscribeAndTranslate]]
+
+
+class JobQueue:
+    """
+    Persistent priority queue of transcribe-and-translate jobs with an
+    in-process worker pool.
+
+    Jobs and their uploaded audio are stored in SQLite and on disk, so queued
+    work survives restarts. Running jobs hold a lease that their worker renews;
+    if the process dies the lease expires and the job is picked up again.
+    Finished results are kept for result_ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        storage_dir: Optional[str] = None,
+        workers: int = 2,
+        result_ttl_seconds: float = 24 * 60 * 60,
+        lease_seconds: float = 60,
+        poll_interval: float = 1.0
+    ):
+        self.db_path = db_path or data_path("jobs.db")
+        self.storage_dir = storage_dir or data_path("jobs")
+        self.workers = workers
+        self.result_ttl_seconds = result_ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled: Set[str] = set()
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        return cls(
+            db_path=os.getenv("JOB_DB_PATH", data_path("jobs.db")),
+            storage_dir=os.getenv("JOB_STORAGE_DIR", data_path("jobs")),
+            workers=int(os.getenv("JOB_WORKERS", "2")),
+            result_ttl_seconds=float(os.getenv("JOB_RESULT_TTL_SECONDS", str(24 * 60 * 60))),
+        )
+
+    # Public API
+
+    async def submit(self, audio: IngestedAudio, target_language: str, priority: int = 0) -> Dict[str, Any]:
+        """
+        Stores the upload and enqueues a job for it.
+
+        Args:
+            audio (IngestedAudio): The validated upload
+            target_language (str): Target language for translation
+            priority (int): Higher priorities are processed first
+
+        Returns:
+            dict: The stored job record
+        """
+        job_id = uuid.uuid4().hex
+        audio_path = os.path.join(self.storage_dir, f"{job_id}.{audio.container}")
+        with observe(TEMPFILE_WRITE_SECONDS, "store", purpose="job", size_bucket=size_bucket(audio.size)):
+            await asyncio.to_thread(self._store_audio, audio, audio_path)
+        job = await asyncio.to_thread(
+            self._execute_one,
+            "INSERT INTO jobs (id, status, priority, target_language, filename, container, size, digest, "
+            "audio_path, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) RETURNING *",
+            (job_id, JobStatus.QUEUED, priority, target_language, audio.filename, audio.container,
+             audio.size, audio.digest, audio_path, time.time())
+        )
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._execute_one, "SELECT * FROM jobs WHERE id = ?", (job_id,))
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancels a queued or running job. Finished jobs are returned unchanged.
+        """
+        now = time.time()
+        job = await asyncio.to_thread(
+            self._execute_one,
+            "UPDATE jobs SET status = ?, finished_at = ?, expires_at = ? "
+            "WHERE id = ? AND status IN (?, ?) RETURNING *",
+            (JobStatus.CANCELLED, now, now + self.result_ttl_seconds, job_id, JobStatus.QUEUED, JobStatus.RUNNING)
+        )
+        if job is None:
+            return await self.get(job_id)
+
+        task = self._running.get(job_id)
+        if task is not None:
+            self._cancelled.add(job_id)
+            task.cancel()
+        await asyncio.to_thread(self._remove_audio, job["audio_path"])
+        return job
+
+    def start(self, handler: JobHandler) -> None:
+        """
+        Starts the worker pool and the expiry sweeper on the running loop.
+        """
+        self._connect()
+        self._worker_tasks = [asyncio.create_task(self._worker(handler)) for _ in range(self.workers)]
+        self._worker_tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self) -> None:
+        """
+        Stops the workers. Jobs that were running go back to the queue.
+        """
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
+    # Workers
+
+    async def _worker(self, handler: JobHandler) -> None:
+        while True:
+            job = await asyncio.to_thread(self._claim_next)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job, handler)
+
+    async def _run(self, job: Dict[str, Any], handler: JobHandler) -> None:
+        job_id = job["id"]
+        # The handler task copies the context, so its logs carry the job id
+        token = request_id_var.set(f"job-{job_id}")
+        task = asyncio.create_task(self._handle(job, handler))
+        self._running[job_id] = task
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, task))
+        try:
+            result = await task
+            await asyncio.to_thread(self._finish, job_id, JobStatus.SUCCEEDED, result.model_dump_json(), None)
+        except asyncio.CancelledError:
+            if job_id not in self._cancelled:
+                # The worker itself is shutting down: hand the job back
+                task.cancel()
+                await asyncio.to_thread(self._requeue, job_id)
+                raise
+            logger.info(f"Job {job_id} cancelled")
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            logger.error(f"Job {job_id} failed: {detail}")
+            await asyncio.to_thread(self._finish, job_id, JobStatus.FAILED, None, detail)
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job_id, None)
+            self._cancelled.discard(job_id)
+            request_id_var.reset(token)
+
+    async def _handle(self, job: Dict[str, Any], handler: JobHandler) -> TranscribeAndTranslate:
+        with open(job["audio_path"], "rb") as audio_file:
+            audio = IngestedAudio(
+                file=audio_file,
+                filename=job["filename"],
+                container=job["container"],
+                size=job["size"],
+                digest=job["digest"]
+            )
+            return await handler(audio, job["target_language"])
+
+    async def _heartbeat(self, job_id: str, task: asyncio.Task) -> None:
+        """
+        Renews the job lease and cancels the task if another worker cancelled the job.
+        """
+        while not task.done():
+            await asyncio.sleep(self.lease_seconds / 3)
+            job = await asyncio.to_thread(
+                self._execute_one,
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? RETURNING status",
+                (time.time() + self.lease_seconds, job_id)
+            )
+            if job is None or job["status"] == JobStatus.CANCELLED:
+                self._cancelled.add(job_id)
+                task.cancel()
+
+    async def _sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.result_ttl_seconds / 10, 1))
+            try:
+                expired = await asyncio.to_thread(self._purge_expired)
+                if expired:
+                    logger.info(f"Purged {expired} expired jobs")
+            except sqlite3.Error as e:
+                logger.error(f"Job purge failed: {e}")
+
+    # Storage
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            os.makedirs(self.storage_dir, exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, "
+                "target_language TEXT NOT NULL, filename TEXT NOT NULL, container TEXT NOT NULL, "
+                "size INTEGER NOT NULL, digest TEXT NOT NULL, audio_path TEXT NOT NULL, "
+                "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+                "lease_expires_at REAL, expires_at REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority DESC, created_at)")
+            self._db = db
+        return self._db
+
+    def _execute_one(self, sql: str, params: tuple) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            db = self._connect()
+            row = db.execute(sql, params).fetchone()
+            return dict(row) if row is not None else None
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._db_lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker died without releasing them go back to the queue
+                db.execute(
+                    "UPDATE jobs SET status = ? WHERE status = ? AND lease_expires_at < ?",
+                    (JobStatus.QUEUED, JobStatus.RUNNING, now)
+                )
+                row = db.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, lease_expires_at = ? WHERE id = ("
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY priority DESC, created_at LIMIT 1"
+                    ") RETURNING *",
+                    (JobStatus.RUNNING, now, now + self.lease_seconds, JobStatus.QUEUED)
+                ).fetchone()
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            return dict(row) if row is not None else None
+
+    def _finish(self, job_id: str, status: str, result: Optional[str], error: Optional[str]) -> None:
+        now = time.time()
+        job = self._execute_one(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ? "
+            "WHERE id = ? AND status = ? RETURNING audio_path",
+            (status, result, error, now, now + self.result_ttl_seconds, job_id, JobStatus.RUNNING)
+        )
+        if job is not None:
+            self._remove_audio(job["audio_path"])
+
+    def _requeue(self, job_id: str) -> None:
+        self._execute_one(
+            "UPDATE jobs SET status = ?, lease_expires_at = NULL WHERE id = ? AND status = ? RETURNING id",
+            (JobStatus.QUEUED, job_id, JobStatus.RUNNING)
+        )
+
+    def _purge_expired(self) -> int:
+        with self._db_lock:
+            db = self._connect()
+            rows = db.execute(
+                "DELETE FROM jobs WHERE expires_at < ? RETURNING audio_path", (time.time(),)
+            ).fetchall()
+        for row in rows:
+            self._remove_audio(row["audio_path"])
+        return len(rows)
+
+    @staticmethod
+    def _store_audio(audio: IngestedAudio, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        audio.file.seek(0)
+        with open(path, "wb") as destination:
+            shutil.copyfileobj(audio.file, destination)
+        audio.file.seek(0)
+
+    @staticmethod
+    def _remove_audio(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def job_result(job: Dict[str, Any]) -> Optional[TranscribeAndTranslate]:
+    if not job.get("result"):
+        return None
+    return TranscribeAndTranslate(**json.loads(job["result"]))
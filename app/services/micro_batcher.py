@@ -0,0 +1,134 @@
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+from app.services.deadline import SharedDeadline, current_deadline, set_deadline
+from app.utils.logger import request_id_var
+from app.utils.metrics import BATCH_SIZE, current_server_timing, record_server_timing, start_server_timing
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects items submitted concurrently and processes them in batches.
+
+    A batch is sent when max_batch_size items are waiting or max_wait seconds
+    after the first item arrived, whichever comes first. Identical items in a
+    batch are sent once, and each caller gets the results for its own items in
+    order. Items whose caller has gone away before the batch is sent are dropped,
+    and a batch is cancelled once every one of its callers has gone.
+
+    A batch runs in its caller's context, so its upstream calls keep that
+    request's deadline, request id and Server-Timing. A batch shared by several
+    requests gets the earliest of their deadlines and all of their request
+    ids, and its stage timings are added to each request's Server-Timing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process_batch: Callable[[List[T]], Awaitable[List[R]]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.01
+    ):
+        self.name = name
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[T, asyncio.Future, contextvars.Context]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit_many(self, items: List[T]) -> List[R]:
+        """
+        Queues items for the next batch and waits for their results.
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in items]
+        context = contextvars.copy_context()
+        self._pending.extend((item, future, context) for item, future in zip(items, futures))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    async def submit(self, item: T) -> R:
+        return (await self.submit_many([item]))[0]
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            live = [entry for entry in self._pending if not entry[1].done()]
+            batch, self._pending = live[:self.max_batch_size], live[self.max_batch_size:]
+            if not batch:
+                break
+            callers = list({id(context): context for _, _, context in batch}.values())
+            task = asyncio.create_task(self._run(batch, callers), context=self._batch_context(callers))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            for _, future, _ in batch:
+                future.add_done_callback(lambda _, task=task, batch=batch: self._cancel_if_abandoned(task, batch))
+            if len(self._pending) < self.max_batch_size:
+                break
+
+        if self._pending and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+    @staticmethod
+    def _batch_context(callers: List[contextvars.Context]) -> contextvars.Context:
+        if len(callers) == 1:
+            # A copy, so that overflow batches of one call do not share a context object
+            return callers[0].copy()
+        context = contextvars.Context()
+        deadlines = [deadline for deadline in (caller.run(current_deadline) for caller in callers) if deadline is not None]
+        if deadlines:
+            context.run(set_deadline, SharedDeadline(deadlines))
+        request_ids = sorted({request_id for request_id in (caller.run(request_id_var.get) for caller in callers) if request_id})
+        if request_ids:
+            context.run(request_id_var.set, ",".join(request_ids))
+        context.run(start_server_timing)
+        return context
+
+    @staticmethod
+    def _cancel_if_abandoned(task: asyncio.Task, batch: List[Tuple[T, asyncio.Future, contextvars.Context]]) -> None:
+        # Nobody is waiting for the results any more, so stop the upstream call
+        if all(future.cancelled() for _, future, _ in batch):
+            task.cancel()
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future, contextvars.Context]], callers: List[contextvars.Context]) -> None:
+        positions: Dict[T, int] = {}
+        unique: List[T] = []
+        for item, _, _ in batch:
+            if item not in positions:
+                positions[item] = len(unique)
+                unique.append(item)
+        BATCH_SIZE.labels(batcher=self.name).observe(len(unique))
+
+        try:
+            results = await self.process_batch(unique)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except asyncio.CancelledError:
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        finally:
+            if len(callers) > 1:
+                # Each request is charged the full duration of the stages it waited for
+                timings = current_server_timing() or {}
+                for caller in callers:
+                    for name, seconds in timings.items():
+                        caller.run(record_server_timing, name, seconds)
+
+        for item, future, _ in batch:
+            if not future.done():
+                future.set_result(results[positions[item]])
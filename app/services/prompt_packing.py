@@ -0,0 +1,104 @@
+import os
+import sys
+from typing import Callable, Dict, List, Optional
+from app.utils.logger import logger
+from app.utils.paths import data_path
+from app.services.transcript_cache import LRUCache
+
+
+class TokenCounter:
+    """
+    Counts prompt tokens with the model's tokenizer.
+
+    tiktoken downloads its encoding files on first use and keeps them in
+    TIKTOKEN_CACHE_DIR, which defaults to tiktoken/ under DATA_DIR here so
+    that the files survive restarts; warm it at build time with
+    `python -m app.services.prompt_packing <model>`. Without tiktoken or its
+    encoding files, counts are only estimated at four bytes per token, which
+    errs on the high side for English. Counts are cached per text since the
+    same sentences come back through the translation memory and the packer.
+    """
+
+    def __init__(self, model: str, max_entries: int = 50_000):
+        self.model = model
+        self.cache = LRUCache(max_entries)
+        self._encode = self._load_encoder(model)
+
+    @staticmethod
+    def _load_encoder(model: str) -> Optional[Callable[[str], List[int]]]:
+        try:
+            import tiktoken
+        except ImportError:
+            logger.warning("tiktoken is not installed, token counts are estimates only")
+            return None
+        os.environ.setdefault("TIKTOKEN_CACHE_DIR", data_path("tiktoken"))
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # Encodings are downloaded on first use, which fails offline
+            logger.error(f"Could not load tokenizer for {model}, token counts are estimates only: {e}")
+            return None
+        return encoding.encode_ordinary
+
+    @property
+    def exact(self) -> bool:
+        return self._encode is not None
+
+    def count(self, text: str) -> int:
+        tokens = self.cache.get(text)
+        if tokens is None:
+            tokens = len(self._encode(text)) if self._encode else max(len(text.encode("utf-8")) // 4, 1)
+            self.cache.set(text, tokens)
+        return tokens
+
+
+def pack_by_budget(sentences: List[str], count_tokens: Callable[[str], int], max_tokens: int) -> List[List[str]]:
+    """
+    Splits sentences, in order, into consecutive chunks of at most max_tokens
+    tokens each. A sentence longer than the budget gets a chunk of its own.
+
+    Args:
+        sentences (list): Sentences to pack
+        count_tokens: Returns the token count of one sentence
+        max_tokens (int): Token budget per chunk
+
+    Returns:
+        list: Chunks of sentences that together preserve the input order
+    """
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for sentence in sentences:
+        # Each numbered line costs a few tokens beyond the sentence itself
+        tokens = count_tokens(sentence) + 3
+        if current and used + tokens > max_tokens:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(sentence)
+        used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+_token_counters: Dict[str, TokenCounter] = {}
+
+
+def get_token_counter(model: str) -> TokenCounter:
+    """
+    Returns the process-wide token counter for a model.
+    """
+    if model not in _token_counters:
+        _token_counters[model] = TokenCounter(model, max_entries=int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "50000")))
+    return _token_counters[model]
+
+
+if __name__ == "__main__":
+    # Downloads the encodings of the given models into TIKTOKEN_CACHE_DIR
+    for name in sys.argv[1:] or ["gpt-4o"]:
+        if not TokenCounter(name).exact:
+            sys.exit(f"Could not load the tokenizer for {name}")
+        print(f"Tokenizer for {name} is cached in {os.environ['TIKTOKEN_CACHE_DIR']}")
@@ -0,0 +1,259 @@
+import os
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import openai
+from app.utils.logger import logger
+from app.utils.metrics import ABANDONED_WORK, CIRCUIT_STATE, UPSTREAM_RETRIES
+from app.services.deadline import current_deadline
+
+
+T = TypeVar("T")
+
+# Status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """
+    A transient upstream failure, optionally with the delay the upstream asked for.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised without calling the upstream while its circuit breaker is open.
+    """
+
+    def __init__(self, backend: str, retry_after: float):
+        super().__init__(f"Circuit for {backend} is open")
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header given either in seconds or as an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(error: BaseException) -> Optional[float]:
+    """
+    Decides whether an upstream error is transient.
+
+    Returns:
+        float: Seconds the upstream asked us to wait (0 if it did not say),
+        or None if the error should not be retried.
+    """
+    if isinstance(error, RetryableError):
+        return error.retry_after or 0.0
+    if isinstance(error, (asyncio.TimeoutError, openai.APIConnectionError)):
+        return 0.0
+    if isinstance(error, openai.APIStatusError) and error.status_code in RETRYABLE_STATUS:
+        headers = error.response.headers
+        if headers.get("retry-after-ms"):
+            try:
+                return float(headers["retry-after-ms"]) / 1000
+            except ValueError:
+                pass
+        return parse_retry_after(headers.get("retry-after")) or 0.0
+    return None
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated upstream failures.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected for reset_seconds. Then a single trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, backend: str, failure_threshold: int = 5, reset_seconds: float = 30):
+        self.backend = backend
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self) -> None:
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.backend, remaining)
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                raise CircuitOpenError(self.backend, self.reset_seconds)
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.backend} closed")
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.error(f"Circuit for {self.backend} opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def release(self) -> None:
+        # A trial call that ended without a verdict (e.g. cancelled) frees the slot
+        self._trial_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_STATE.labels(backend=self.backend).set(
+            {self.CLOSED: 0, self.HALF_OPEN: 1, self.OPEN: 2}[state]
+        )
+
+
+class ResilientCall:
+    """
+    Retry, circuit breaking and deadlines for one upstream backend.
+
+    Each attempt is bounded by attempt_timeout and the whole call, including
+    backoff sleeps, by deadline_seconds or by the request's deadline for this
+    stage, whichever comes first. Transient failures are retried with
+    full-jitter exponential backoff, waiting at least as long as the upstream
+    asked for (Retry-After or HuggingFace's estimated_time). A retry that would
+    overrun the deadline is not attempted.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        stage: str,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20,
+        attempt_timeout: float = 60,
+        deadline_seconds: float = 120,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30
+    ):
+        self.backend = backend
+        self.stage = stage
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.deadline_seconds = deadline_seconds
+        self.breaker = CircuitBreaker(backend, failure_threshold, reset_seconds)
+
+    def backoff(self, attempt: int, retry_after: float) -> float:
+        jitter = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(jitter, retry_after)
+
+    async def call(self, operation: Callable[[float], Awaitable[T]]) -> T:
+        """
+        Runs operation under the retry policy, circuit breaker and deadline.
+
+        Args:
+            operation: Coroutine function making one attempt, given the seconds
+                the attempt may take so it can pass them on to its client. It
+                is called again for each retry, so it must rewind any file it sends.
+
+        Returns:
+            The operation's result.
+        """
+        request_deadline = current_deadline()
+        deadline = time.monotonic() + self.deadline_seconds
+        if request_deadline is not None:
+            deadline = min(deadline, request_deadline.for_stage(self.stage))
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Not worth starting an attempt whose answer nobody will wait for
+                ABANDONED_WORK.labels(stage=self.stage, reason="expired").inc()
+                raise asyncio.TimeoutError(f"Deadline for {self.backend} passed")
+            self.breaker.before_call()
+            timeout = min(self.attempt_timeout, remaining)
+            try:
+                result = await asyncio.wait_for(operation(timeout), timeout=timeout)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                if request_deadline is not None and request_deadline.disconnected:
+                    ABANDONED_WORK.labels(stage=self.stage, reason="disconnected").inc()
+                raise
+            except Exception as e:
+                retry_after = classify(e)
+                if retry_after is None:
+                    # The request itself was rejected, the upstream is healthy
+                    self.breaker.release()
+                    raise
+                if timeout < self.attempt_timeout and deadline - time.monotonic() <= 0:
+                    # Cut short by the deadline rather than by a slow upstream
+                    self.breaker.release()
+                    ABANDONED_WORK.labels(stage=self.stage, reason="expired").inc()
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                delay = self.backoff(attempt, retry_after)
+                if attempt >= self.max_attempts or time.monotonic() + delay >= deadline or self.breaker.state == CircuitBreaker.OPEN:
+                    raise
+                reason = type(e).__name__
+                logger.info(f"Retrying {self.backend} in {delay:.2f}s after {reason} (attempt {attempt + 1}/{self.max_attempts})")
+                UPSTREAM_RETRIES.labels(backend=self.backend, reason=reason).inc()
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+
+_resilience: Dict[str, ResilientCall] = {}
+
+
+def get_resilience(backend: str, stage: str, attempt_timeout: float) -> ResilientCall:
+    """
+    Returns the process-wide retry/breaker state for a backend, so every
+    service calling the same upstream shares one circuit.
+
+    Args:
+        backend (str): Backend identifier, e.g. "openai:whisper-1"
+        stage (str): Request stage the calls belong to, "transcription" or "translation"
+        attempt_timeout (float): Default per-attempt timeout in seconds for this kind of call
+    """
+    if backend not in _resilience:
+        _resilience[backend] = ResilientCall(
+            backend,
+            stage,
+            max_attempts=int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.5")),
+            max_delay=float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", "20")),
+            attempt_timeout=attempt_timeout,
+            deadline_seconds=float(os.getenv("UPSTREAM_DEADLINE_SECONDS", str(attempt_timeout * 2))),
+            failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+            reset_seconds=float(os.getenv("CIRCUIT_RESET_SECONDS", "30")),
+        )
+    return _resilience[backend]
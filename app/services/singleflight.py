@@ -0,0 +1,64 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+from app.utils.metrics import COALESCED
+
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one shared task.
+
+    The first caller starts the work; callers arriving while it runs await the
+    same result (or exception). A waiter that is cancelled only stops waiting:
+    the shared task keeps running for the others and is cancelled only when
+    its last waiter has gone. Finished calls are forgotten, so this is not a
+    cache.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs work() for key, or joins the call already in flight for it.
+
+        Args:
+            key: Identity of the work, e.g. an audio digest
+            work: Coroutine function, only invoked if no call for key is in flight
+
+        Returns:
+            The shared result.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(work()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            COALESCED.labels(kind=self.name).inc()
+
+        call.waiters += 1
+        try:
+            # Shielded so one waiter's cancellation does not cancel the shared work
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.utils.logger import logger
+
+
+class LRUCache:
+    """
+    Bounded in-memory least-recently-used cache with hit/miss/eviction counters.
+    Entries optionally expire after ttl_seconds.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl_seconds is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+            del self._entries[key]
+            self.evictions += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TranscriptCache:
+    """
+    Content-addressed transcript cache.
+
+    Transcripts are keyed by a hash of the raw audio bytes plus the model and
+    language used. Lookups go to a bounded in-memory LRU first and then, when
+    a database path is configured, to an SQLite file that every uvicorn worker
+    on the host can share.
+    """
+
+    def __init__(self, max_entries: int = 1024, db_path: Optional[str] = None, max_disk_entries: int = 100_000):
+        self.memory = LRUCache(max_entries)
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    @staticmethod
+    def audio_digest(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def make_key(audio_digest: str, model: str, language: Optional[str] = None) -> str:
+        """
+        Build a cache key from the audio content hash, model and language.
+        """
+        return f"{model}:{language or 'auto'}:{audio_digest}"
+
+    async def get(self, key: str) -> Optional[str]:
+        transcript = self.memory.get(key)
+        if transcript is not None or not self.db_path:
+            return transcript
+
+        transcript = await asyncio.to_thread(self._disk_get, key)
+        if transcript is not None:
+            self.disk_hits += 1
+            self.memory.set(key, transcript)
+        return transcript
+
+    async def set(self, key: str, transcript: str) -> None:
+        self.memory.set(key, transcript)
+        if self.db_path:
+            await asyncio.to_thread(self._disk_set, key, transcript)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.memory.hits + self.disk_hits,
+            "misses": self.memory.misses - self.disk_hits,
+            "memory_hits": self.memory.hits,
+            "disk_hits": self.disk_hits,
+            "evictions": self.memory.evictions,
+            "disk_evictions": self.disk_evictions,
+            "entries": len(self.memory),
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                "key TEXT PRIMARY KEY, transcript TEXT NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_accessed ON transcripts(accessed_at)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        try:
+            with self._db_lock:
+                db = self._connect()
+                row = db.execute("SELECT transcript FROM transcripts WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                db.execute("UPDATE transcripts SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                db.commit()
+                return row[0]
+        except sqlite3.Error as e:
+            logger.error(f"Transcript cache read failed: {e}")
+            return None
+
+    def _disk_set(self, key: str, transcript: str) -> None:
+        try:
+            with self._db_lock:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO transcripts (key, transcript, accessed_at) VALUES (?, ?, ?)",
+                    (key, transcript, time.time())
+                )
+                cursor = db.execute(
+                    "DELETE FROM transcripts WHERE key IN ("
+                    "SELECT key FROM transcripts ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+                self.disk_evictions += max(cursor.rowcount, 0)
+                db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Transcript cache write failed: {e}")
+
+
+_transcript_cache: Optional[TranscriptCache] = None
+
+
+def get_transcript_cache() -> TranscriptCache:
+    """
+    Returns the process-wide transcript cache, configured from the environment.
+    """
+    global _transcript_cache
+    if _transcript_cache is None:
+        _transcript_cache = TranscriptCache(
+            max_entries=int(os.getenv("TRANSCRIPT_CACHE_SIZE", "1024")),
+            db_path=os.getenv("TRANSCRIPT_CACHE_PATH") or None,
+            max_disk_entries=int(os.getenv("TRANSCRIPT_CACHE_DISK_SIZE", "100000")),
+        )
+    return _transcript_cache
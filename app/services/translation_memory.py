@@ -0,0 +1,205 @@
+import os
+import re
+import asyncio
+import unicodedata
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from app.services.transcript_cache import LRUCache
+from app.utils.logger import logger
+from app.utils.metrics import FALLBACKS
+
+
+# Splits after sentence-ending punctuation or on line breaks, keeping the separator
+_SENTENCE_BOUNDARY = re.compile(r"((?<=[.!?。！？])\s+|\n+)")
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)[.)]\s*(.*)$")
+
+
+def split_sentences(text: str) -> List[Tuple[str, str]]:
+    """
+    Splits text into (sentence, trailing separator) pairs so that it can be
+    reassembled in the original order and spacing.
+    """
+    parts = _SENTENCE_BOUNDARY.split(text)
+    sentences = parts[0::2]
+    separators = parts[1::2] + [""]
+    return list(zip(sentences, separators))
+
+
+def normalize_sentence(sentence: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", sentence).split())
+
+
+def number_lines(sentences: List[str]) -> str:
+    """
+    Formats sentences as a numbered list for a single translation request.
+    """
+    return "\n".join(f"{i}. {sentence}" for i, sentence in enumerate(sentences, start=1))
+
+
+def parse_numbered_lines(output: str, count: int) -> Optional[List[str]]:
+    """
+    Maps a numbered translation reply back to its inputs.
+
+    Returns None when the reply does not contain exactly one line per input.
+    """
+    lines: Dict[int, str] = {}
+    for line in output.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if match:
+            lines[int(match.group(1))] = match.group(2).strip()
+    if sorted(lines) != list(range(1, count + 1)):
+        return None
+    return [lines[i] for i in range(1, count + 1)]
+
+
+async def translate_numbered(
+    sentences: List[str],
+    target_language: str,
+    complete: Callable[[str], Awaitable[str]],
+    source_language: Optional[str] = None
+) -> List[str]:
+    """
+    Translates sentences in one numbered request.
+
+    If the numbered reply cannot be mapped back to its inputs, each half is
+    translated again on its own, down to single sentences.
+
+    Args:
+        sentences (List[str]): Sentences to translate
+        target_language (str): Target language
+        complete: Coroutine sending a prompt and returning the reply text
+        source_language (str): Language named in the prompt, if known
+
+    Returns:
+        List[str]: One translation per sentence, in order
+    """
+    text = f"{source_language} text" if source_language else "text"
+    if len(sentences) == 1:
+        return [await complete(f"Translate the following {text} into {target_language}: \n\n{sentences[0]}")]
+
+    output = await complete(
+        f"Translate each numbered line of the following {text} into {target_language}. "
+        f"Reply with exactly one numbered line per input line and nothing else.\n\n{number_lines(sentences)}"
+    )
+    translations = parse_numbered_lines(output, len(sentences))
+    if translations is not None:
+        return translations
+
+    logger.info(f"Numbered translation reply did not match its {len(sentences)} lines, splitting the request")
+    FALLBACKS.labels(kind="numbered_reply").inc()
+    middle = len(sentences) // 2
+    first, second = await asyncio.gather(
+        translate_numbered(sentences[:middle], target_language, complete, source_language),
+        translate_numbered(sentences[middle:], target_language, complete, source_language)
+    )
+    return first + second
+
+
+class TranslationMemory:
+    """
+    Sentence-level translation memory.
+
+    Translations are stored per (normalized sentence, target language, backend)
+    so that boilerplate shared between transcripts is only translated once.
+    Eviction is LRU, bounded by max_entries and optionally by ttl_seconds.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: Optional[float] = None):
+        self.cache = LRUCache(max_entries, ttl_seconds)
+        self.sentences_translated = 0
+
+    @staticmethod
+    def make_key(sentence: str, target_language: str, backend: str) -> str:
+        return f"{backend}:{target_language.strip().lower()}:{sentence}"
+
+    async def translate(
+        self,
+        text: str,
+        target_language: str,
+        backend: str,
+        translate_batch: Callable[[List[str]], Awaitable[List[str]]]
+    ) -> str:
+        """
+        Translates text, sending only sentences missing from memory upstream.
+
+        Args:
+            text (str): Text to translate
+            target_language (str): Target language
+            backend (str): Backend/model identifier the translations belong to
+            translate_batch: Coroutine translating a list of sentences in order
+
+        Returns:
+            str: Translated text reassembled in the original sentence order
+        """
+        parts = [(normalize_sentence(sentence), separator) for sentence, separator in split_sentences(text)]
+        translations: Dict[str, str] = {}
+        missing: Dict[str, None] = {}
+
+        for sentence, _ in parts:
+            if not sentence or sentence in translations or sentence in missing:
+                continue
+            cached = self.cache.get(self.make_key(sentence, target_language, backend))
+            if cached is None:
+                missing[sentence] = None
+            else:
+                translations[sentence] = cached
+
+        if missing:
+            translated = await translate_batch(list(missing))
+            self.sentences_translated += len(missing)
+            for sentence, translation in zip(missing, translated):
+                # An empty reply line is a failed translation; remembering it would serve it again
+                if translation:
+                    self.cache.set(self.make_key(sentence, target_language, backend), translation)
+                translations[sentence] = translation
+
+        return "".join(
+            translations.get(sentence, sentence) + separator for sentence, separator in parts
+        ).strip()
+
+    def lookup(self, text: str, target_language: str, backend: str) -> Optional[str]:
+        """
+        Returns the translation of text if every sentence is already in memory.
+        """
+        parts = [(normalize_sentence(sentence), separator) for sentence, separator in split_sentences(text)]
+        translated = []
+        for sentence, separator in parts:
+            translation = self.cache.get(self.make_key(sentence, target_language, backend)) if sentence else ""
+            if translation is None:
+                return None
+            translated.append(translation + separator)
+        return "".join(translated).strip()
+
+    def remember(self, text: str, translation: str, target_language: str, backend: str) -> None:
+        """
+        Stores a translation produced outside translate(). Only single sentences
+        are stored, since a multi-sentence reply cannot be aligned reliably.
+        """
+        sentences = [sentence for sentence, _ in split_sentences(text) if sentence.strip()]
+        if len(sentences) == 1:
+            self.cache.set(self.make_key(normalize_sentence(sentences[0]), target_language, backend), translation)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "evictions": self.cache.evictions,
+            "entries": len(self.cache),
+            "sentences_translated": self.sentences_translated,
+        }
+
+
+_translation_memory: Optional[TranslationMemory] = None
+
+
+def get_translation_memory() -> TranslationMemory:
+    """
+    Returns the process-wide translation memory, configured from the environment.
+    """
+    global _translation_memory
+    if _translation_memory is None:
+        ttl = os.getenv("TRANSLATION_MEMORY_TTL_SECONDS")
+        _translation_memory = TranslationMemory(
+            max_entries=int(os.getenv("TRANSLATION_MEMORY_SIZE", "10000")),
+            ttl_seconds=float(ttl) if ttl else None,
+        )
+    return _translation_memory
@@ -0,0 +1,219 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from app.utils.logger import logger
+from app.utils.metrics import FALLBACKS, TRANSLATION_ROUTED
+
+
+TranslateCall = Callable[[], Awaitable[str]]
+
+
+class BackendStats:
+    """
+    Rolling latency and error statistics for one translation backend/model.
+    """
+
+    def __init__(self, window: int = 100, alpha: float = 0.2):
+        self.alpha = alpha
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.ewma: Optional[float] = None
+
+    def record(self, latency: float, ok: Optional[bool]) -> None:
+        """
+        Records a finished or abandoned call.
+
+        Args:
+            latency (float): Seconds the call took, or ran for before it was cancelled
+            ok (bool): Whether it succeeded; None for calls cancelled after losing a hedge,
+                whose latency is only a lower bound
+        """
+        self.latencies.append(latency)
+        self.ewma = latency if self.ewma is None else self.alpha * latency + (1 - self.alpha) * self.ewma
+        if ok is not None:
+            self.outcomes.append(ok)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(round(percentile / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class TranslationRouter:
+    """
+    Sends each translation to the backend that is currently fastest and
+    healthy, failing over to the next one on error.
+
+    When hedging is enabled and the chosen backend has not answered within its
+    hedge_percentile latency, the same request is also sent to the next-best
+    backend. The first successful answer wins and the other call is cancelled,
+    so tail latency follows the faster provider rather than the slower one.
+    Hedging costs a second upstream call, so it is off by default and, when
+    on, waits until the chosen backend has min_samples latencies to set the
+    delay from rather than hedging every call of a cold process.
+    """
+
+    def __init__(
+        self,
+        hedge_enabled: bool = False,
+        hedge_percentile: float = 95,
+        hedge_min_delay: float = 0.5,
+        window: int = 100,
+        min_samples: int = 5,
+        max_error_rate: float = 0.5,
+        explore_ratio: float = 0.05
+    ):
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.explore_ratio = explore_ratio
+        self.stats: Dict[str, BackendStats] = {}
+
+    @classmethod
+    def from_env(cls) -> "TranslationRouter":
+        return cls(
+            hedge_enabled=os.getenv("TRANSLATION_HEDGE_ENABLED", "false").lower() == "true",
+            hedge_percentile=float(os.getenv("TRANSLATION_HEDGE_PERCENTILE", "95")),
+            hedge_min_delay=float(os.getenv("TRANSLATION_HEDGE_MIN_DELAY_SECONDS", "0.5")),
+            window=int(os.getenv("TRANSLATION_ROUTER_WINDOW", "100")),
+            min_samples=int(os.getenv("TRANSLATION_ROUTER_MIN_SAMPLES", "5")),
+            max_error_rate=float(os.getenv("TRANSLATION_ROUTER_MAX_ERROR_RATE", "0.5")),
+            explore_ratio=float(os.getenv("TRANSLATION_ROUTER_EXPLORE_RATIO", "0.05")),
+        )
+
+    def _stats(self, backend: str) -> BackendStats:
+        if backend not in self.stats:
+            self.stats[backend] = BackendStats(self.window)
+        return self.stats[backend]
+
+    def healthy(self, backend: str) -> bool:
+        stats = self._stats(backend)
+        return len(stats.outcomes) < self.min_samples or stats.error_rate <= self.max_error_rate
+
+    def rank(self, backends: List[str]) -> List[str]:
+        """
+        Orders backends by preference: healthy before unhealthy, then by
+        smoothed latency. Backends without samples keep their given order
+        behind measured ones. Occasionally promotes another healthy backend so
+        its statistics stay current.
+        """
+        def key(item: Tuple[int, str]) -> Tuple[bool, float, int]:
+            index, backend = item
+            ewma = self._stats(backend).ewma
+            return (not self.healthy(backend), ewma if ewma is not None else float("inf"), index)
+
+        ranked = [backend for _, backend in sorted(enumerate(backends), key=key)]
+        healthy = [backend for backend in ranked if self.healthy(backend)]
+        if len(healthy) > 1 and random.random() < self.explore_ratio:
+            explored = random.choice(healthy[1:])
+            ranked.remove(explored)
+            ranked.insert(0, explored)
+        return ranked
+
+    def can_hedge(self, backend: str) -> bool:
+        return self.hedge_enabled and len(self._stats(backend).latencies) >= self.min_samples
+
+    def hedge_delay(self, backend: str) -> float:
+        latency = self._stats(backend).percentile(self.hedge_percentile)
+        return max(latency if latency is not None else 0.0, self.hedge_min_delay)
+
+    async def route(self, candidates: Dict[str, TranslateCall]) -> Tuple[str, str]:
+        """
+        Runs a translation on the best available backend.
+
+        Args:
+            candidates: Backend name (e.g. "openai:gpt-3.5-turbo") to a coroutine
+                function performing the translation on that backend
+
+        Returns:
+            tuple: The translation and the name of the backend that produced it
+        """
+        ranked = self.rank(list(candidates))
+        tried: List[str] = []
+        last_error: Optional[BaseException] = None
+        while ranked:
+            primary = ranked[0]
+            secondary = ranked[1] if len(ranked) > 1 and self.can_hedge(primary) else None
+            try:
+                return await self._race(primary, secondary, candidates, tried)
+            except Exception as e:
+                last_error = e
+                ranked = [backend for backend in ranked if backend not in tried]
+                if ranked:
+                    logger.info(f"Translation failed on {primary}, failing over to {ranked[0]}")
+                    FALLBACKS.labels(kind="translation_failover").inc()
+        raise last_error
+
+    async def _race(
+        self,
+        primary: str,
+        secondary: Optional[str],
+        candidates: Dict[str, TranslateCall],
+        tried: List[str]
+    ) -> Tuple[str, str]:
+        tried.append(primary)
+        tasks: Dict[asyncio.Task, str] = {asyncio.create_task(self._call(primary, candidates[primary])): primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(primary) if secondary else None)
+            if not done:
+                logger.info(f"Hedging translation from {primary} to {secondary}")
+                FALLBACKS.labels(kind="translation_hedge").inc()
+                tried.append(secondary)
+                tasks[asyncio.create_task(self._call(secondary, candidates[secondary]))] = secondary
+
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        TRANSLATION_ROUTED.labels(backend=tasks[task], outcome="won").inc()
+                        return task.result(), tasks[task]
+                    error = task.exception()
+            raise error
+        finally:
+            for task, backend in tasks.items():
+                if not task.done():
+                    task.cancel()
+                    TRANSLATION_ROUTED.labels(backend=backend, outcome="cancelled").inc()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _call(self, backend: str, translate: TranslateCall) -> str:
+        stats = self._stats(backend)
+        start = time.perf_counter()
+        try:
+            result = await translate()
+        except asyncio.CancelledError:
+            # Lost the hedge: the latency is a lower bound, not a failure
+            stats.record(time.perf_counter() - start, None)
+            raise
+        except Exception:
+            stats.record(time.perf_counter() - start, False)
+            TRANSLATION_ROUTED.labels(backend=backend, outcome="failed").inc()
+            raise
+        stats.record(time.perf_counter() - start, True)
+        return result
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[float]]]:
+        return {
+            backend: {
+                "ewma_s": stats.ewma,
+                "p95_s": stats.percentile(95),
+                "error_rate": stats.error_rate,
+                "samples": len(stats.latencies),
+            }
+            for backend, stats in self.stats.items()
+        }
@@ -1,22 +1,91 @@
-from openai import AsyncOpenAI, OpenAIError
+from openai import OpenAIError
 import os
+import time
 from fastapi import UploadFile, HTTPException
-import tempfile
+import asyncio
 from app.utils.logger import logger
-from dotenv import load_dotenv
-from typing import Dict
-from ..schema import TranscribeAndTranslate
-# import time
-# from pydub import AudioSegment
-# from pydub.utils import which
+from app.utils.metrics import (
+    ERRORS, FINGERPRINT_SECONDS, IN_FLIGHT, PREPROCESS_BYTES_SAVED, PREPROCESS_SECONDS, TEMPFILE_WRITE_SECONDS,
+    TRANSLATION_SECONDS, WHISPER_SECONDS, observe, size_bucket
+)
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+from ..schema import BatchItem, BatchTranslation, TranscribeAndTranslate
+from .audio_ingest import MB, MAX_LONG_AUDIO_MB, IngestedAudio, ingest_upload, reopen_upload
+from .audio_fingerprint import Fingerprint, compute_fingerprint, get_fingerprint_index
+from .clients import ClientRegistry
+from .audio_preprocess import preprocess_wav
+from .audio_segmenter import TranscriptStitcher, UnsupportedAudioError, can_decode_compressed, split_audio
+from .resilience import CircuitOpenError, get_resilience
+from .micro_batcher import MicroBatcher
+from .prompt_packing import get_token_counter, pack_by_budget
+from .singleflight import SingleFlight
+from .transcript_cache import get_transcript_cache
+from .translation_memory import get_translation_memory, translate_numbered
 
 class WhisperService:
-    def __init__(self):
-        load_dotenv(override=True)
-        api_key = os.getenv("OPENAI_API_KEY")
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(self, clients: Optional[ClientRegistry] = None):
+        self.clients = clients or ClientRegistry.from_env()
+        self.client = self.clients.openai
         self.allowed_extensions = {".mp3", ".wav", ".m4a", ".mp4", ".webm", ".mpga", ".mpeg"}
         self.max_file_size_mb = 25
+        self.transcription_model = "whisper-1"
+        self.transcription_language = "en"
+        self.transcript_cache = get_transcript_cache()
+        self.translation_model = "gpt-4o"
+        self.translation_memory = get_translation_memory()
+        # Identical requests in flight at the same time share one upstream call
+        self.transcription_flight = SingleFlight("transcription")
+        self.translation_flight = SingleFlight("translation")
+        # Retries, circuit breakers and deadlines shared by every call to the same upstream
+        self.transcription_resilience = get_resilience(
+            f"openai:{self.transcription_model}",
+            stage="transcription",
+            attempt_timeout=float(os.getenv("TRANSCRIPTION_TIMEOUT_SECONDS", "300"))
+        )
+        self.translation_resilience = get_resilience(
+            f"openai:{self.translation_model}",
+            stage="translation",
+            attempt_timeout=float(os.getenv("TRANSLATION_TIMEOUT_SECONDS", "60"))
+        )
+
+        # Long-audio mode: files over max_file_size_mb are split and transcribed in parallel
+        self.long_audio_enabled = os.getenv("LONG_AUDIO_ENABLED", "true").lower() == "true"
+        self.max_long_audio_mb = MAX_LONG_AUDIO_MB
+        # Only WAV can be split without pydub and ffmpeg, so other containers keep the upstream limit
+        self.long_compressed_audio = self.long_audio_enabled and can_decode_compressed()
+        if self.long_audio_enabled and not self.long_compressed_audio:
+            logger.warning(
+                f"pydub or ffmpeg is not available, long-audio mode only splits WAV; "
+                f"other formats are limited to {self.max_file_size_mb}MB"
+            )
+        self.segment_seconds = float(os.getenv("LONG_AUDIO_SEGMENT_SECONDS", "600"))
+        self.segment_overlap_seconds = float(os.getenv("LONG_AUDIO_OVERLAP_SECONDS", "3"))
+        self.segment_semaphore = asyncio.Semaphore(int(os.getenv("LONG_AUDIO_CONCURRENCY", "4")))
+        # Translation of transcript pieces runs under its own concurrency limit
+        self.translation_semaphore = asyncio.Semaphore(int(os.getenv("TRANSLATION_CONCURRENCY", "4")))
+        # Sentences from concurrent translations into the same language are packed into
+        # shared requests of at most translation_max_prompt_tokens tokens
+        self.token_counter = get_token_counter(self.translation_model)
+        self.translation_max_prompt_tokens = int(os.getenv("TRANSLATION_MAX_PROMPT_TOKENS", "2000"))
+        self.translation_pack_max_sentences = int(os.getenv("TRANSLATION_PACK_MAX_SENTENCES", "200"))
+        self.translation_pack_wait_seconds = float(os.getenv("TRANSLATION_PACK_WAIT_MS", "20")) / 1000
+        self.translation_packers: Dict[str, MicroBatcher] = {}
+        # Batch requests transcribe at most this many files at once across the process
+        self.batch_semaphore = asyncio.Semaphore(int(os.getenv("BATCH_CONCURRENCY", "4")))
+        self.max_batch_files = int(os.getenv("MAX_BATCH_FILES", "50"))
+
+        # Optional WAV pre-processing: mono, 16 kHz and shortened silences before upload
+        self.preprocess_enabled = os.getenv("AUDIO_PREPROCESS_ENABLED", "false").lower() == "true"
+        self.preprocess_silence_db = float(os.getenv("AUDIO_PREPROCESS_SILENCE_DB", "-45"))
+        self.preprocess_keep_silence_seconds = float(os.getenv("AUDIO_PREPROCESS_KEEP_SILENCE_SECONDS", "0.6"))
+
+        # Optional acoustic fingerprinting: re-encoded copies of an earlier upload reuse its transcript
+        self.fingerprint_enabled = os.getenv("FINGERPRINT_ENABLED", "false").lower() == "true"
+        self.fingerprint_index = get_fingerprint_index()
+        # Without pydub and ffmpeg only WAV uploads can be fingerprinted
+        self.fingerprint_compressed = self.fingerprint_enabled and can_decode_compressed()
+        if self.fingerprint_enabled and not self.fingerprint_compressed:
+            logger.warning("pydub or ffmpeg is not available, only WAV uploads are fingerprinted")
 
     async def transcribe(self, file: UploadFile) -> str:
         """
@@ -28,91 +97,426 @@ class WhisperService:
         Returns:
             str: Transcribed text from the audio.
         """
+        audio = await self.ingest(file)
+        return await self.transcribe_audio(audio)
+
+    async def ingest(self, file: UploadFile) -> IngestedAudio:
+        """
+        Validates type and size while streaming over the upload.
+
+        Args:
+            file (UploadFile): The uploaded audio file.
 
-        # Validating file type
-        if not any(file.filename.endswith(ext) for ext in self.allowed_extensions):
-            logger.error("Unsupported file type. Bad request.")
+        Returns:
+            IngestedAudio: The validated upload.
+        """
+        max_mb = self.max_long_audio_mb if self.long_audio_enabled else self.max_file_size_mb
+        max_compressed_mb = self.max_long_audio_mb if self.long_compressed_audio else self.max_file_size_mb
+        return await ingest_upload(file, self.allowed_extensions, max_mb * MB, max_compressed_mb * MB)
+
+    async def transcribe_audio(self, audio: IngestedAudio) -> str:
+        """
+        Transcribes an already ingested upload using OpenAI's Whisper API.
+
+        Args:
+            audio (IngestedAudio): The validated upload.
+
+        Returns:
+            str: Transcribed text from the audio.
+        """
+        return " ".join([piece async for piece in self.iter_transcript(audio)])
+
+    async def iter_transcript(self, audio: IngestedAudio) -> AsyncIterator[str]:
+        """
+        Yields the transcript of an ingested upload piece by piece, in order.
+
+        Short uploads yield a single piece. Long uploads are split into
+        segments that are transcribed concurrently; each stitched segment is
+        yielded as soon as it and every segment before it are done.
+
+        Args:
+            audio (IngestedAudio): The validated upload.
+
+        Yields:
+            str: The next piece of transcribed text.
+        """
+        # Serve repeated uploads from the transcript cache
+        cache_key = self.transcript_cache.make_key(
+            audio.digest,
+            self.transcription_model,
+            self.transcription_language
+        )
+        cached_transcript = await self.transcript_cache.get(cache_key)
+        fingerprint = None
+        if cached_transcript is None and self.fingerprint_enabled and (
+            audio.container == "wav" or self.fingerprint_compressed
+        ):
+            # Not byte-identical, but maybe the same recording encoded differently
+            fingerprint, cached_transcript = await self._match_fingerprint(audio)
+            if cached_transcript is not None:
+                await self.transcript_cache.set(cache_key, cached_transcript)
+        if cached_transcript is not None:
+            yield cached_transcript
+            return
+
+        pieces = []
+        original = audio
+        try:
+            if self.preprocess_enabled and audio.container == "wav":
+                audio = await self._preprocess(audio)
+            if audio.size > self.max_file_size_mb * MB:
+                async for piece in self._iter_long_transcript(audio, cache_key):
+                    pieces.append(piece)
+                    yield piece
+            else:
+                # Hand the spooled upload straight to the client, no tempfile copy
+                pieces.append(await self.transcription_flight.do(cache_key, lambda: self._transcribe_upload(audio)))
+                yield pieces[0]
+        except UnsupportedAudioError as e:
+            logger.error(f"Could not split long audio {audio.filename}: {e}")
+            ERRORS.labels(stage="transcription", reason="unsupported_audio").inc()
             raise HTTPException(
                 status_code=400,
-                detail="Unsupported file type. Please upload MP3, WAV, MP4, or M4A."
+                detail=f"File too large. Max size is {self.max_file_size_mb}MB for formats that cannot be split."
             )
-        
-        # Checking file size
-        file_content = await file.read()
-        file_mb_size = len(file_content) / (1024 * 1024)
-        if file_mb_size > self.max_file_size_mb:
+        except HTTPException:
+            raise
+        except CircuitOpenError as e:
+            logger.error(f"Transcription skipped, {e}")
+            ERRORS.labels(stage="transcription", reason="circuit_open").inc()
             raise HTTPException(
-                status_code=400, 
-                detail=f"File too large. Max size is {self.max_file_size_mb}MB."
-                )
-        
-        # Save to tempfile and process
-        tmp_path = None
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[-1]) as tmp:
-                tmp.write(file_content)
-                tmp_path = tmp.name
-
-            # Transcribe with OpenAI Whisper
-            with open(tmp_path, "rb") as audio_file:
-                response = await self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language="en"
-                )
-            
-            return response.text
+                status_code=503,
+                detail="The transcription service is temporarily unavailable. Please try again later.",
+                headers={"Retry-After": str(int(e.retry_after) + 1)}
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Transcription of {audio.filename} timed out")
+            ERRORS.labels(stage="transcription", reason="timeout").inc()
+            raise HTTPException(
+                status_code=504,
+                detail="The transcription service took too long to respond. Please try again later."
+            )
         except OpenAIError as e:
             logger.error(f"OpenAI API error: {e}")
+            ERRORS.labels(stage="transcription", reason="upstream").inc()
             raise HTTPException(
                 status_code=502,
                 detail="An error occurred while contacting the transcription service. Please try again later."
             )
         except Exception as e:
             logger.exception(f"Unexpected error during transcription: {e}")
+            ERRORS.labels(stage="transcription", reason="internal").inc()
             raise HTTPException(
                 status_code=500,
                 detail="Something went wrong during transcription. Please try again."
             )
         finally:
-            # Clear temp file
-            if tmp_path and os.path.exists(tmp_path):
-                try:
-                    os.remove(tmp_path)
-                except Exception:
-                    pass
+            if audio is not original:
+                audio.file.close()
 
+        await self.transcript_cache.set(cache_key, " ".join(pieces))
+        if fingerprint is not None:
+            await self.fingerprint_index.add(self._fingerprint_scope(), cache_key, fingerprint, " ".join(pieces))
 
-    async def translate(self, text: str, language: str) -> str:
+    def _fingerprint_scope(self) -> str:
+        return f"{self.transcription_model}:{self.transcription_language}"
+
+    async def _match_fingerprint(self, audio: IngestedAudio) -> Tuple[Optional[Fingerprint], Optional[str]]:
+        """
+        Fingerprints an upload and looks for an earlier upload that sounds the same.
+
+        Returns:
+            tuple: The fingerprint (None if the audio could not be decoded) and
+            the transcript of the matching upload, or None
+        """
         try:
-            prompt = (
-                f"Translate the following English text into {language}: \n\n{text}"
+            with observe(FINGERPRINT_SECONDS, "fingerprint", size_bucket=size_bucket(audio.size)):
+                fingerprint = await asyncio.to_thread(compute_fingerprint, audio.file, audio.container)
+                match = await self.fingerprint_index.lookup(self._fingerprint_scope(), fingerprint)
+        except UnsupportedAudioError as e:
+            logger.info(f"Not fingerprinting {audio.filename}: {e}")
+            return None, None
+        except Exception as e:
+            logger.exception(f"Fingerprinting {audio.filename} failed: {e}")
+            return None, None
+
+        if match is None:
+            return fingerprint, None
+        logger.info(
+            f"{audio.filename} matches an earlier upload ({match.similarity:.0%} of landmarks, {match.matches} aligned, "
+            f"{match.duration:.1f}s vs {fingerprint.duration:.1f}s), reusing its transcript"
+        )
+        return fingerprint, match.transcript
+
+    async def _transcribe_file(self, filename: str, file: BinaryIO, size: int) -> str:
+        with IN_FLIGHT.labels(stage="whisper").track_inprogress(), \
+                observe(WHISPER_SECONDS, "whisper", model=self.transcription_model, size_bucket=size_bucket(size)):
+            response = await self.transcription_resilience.call(
+                lambda timeout: self._request_transcription(filename, file, timeout)
             )
+        return response.text
 
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a professional translator."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
+    async def _request_transcription(self, filename: str, file: BinaryIO, timeout: float):
+        # Rewind so a retried attempt sends the whole file again
+        file.seek(0)
+        return await self.client.audio.transcriptions.create(
+            model=self.transcription_model,
+            file=(filename, file),
+            language=self.transcription_language,
+            timeout=timeout
+        )
+
+    async def _preprocess(self, audio: IngestedAudio) -> IngestedAudio:
+        """
+        Shrinks a WAV upload before it is sent upstream. Returns the upload
+        unchanged if it cannot be read as PCM or would not get smaller.
+        """
+        try:
+            with observe(PREPROCESS_SECONDS, "preprocess", size_bucket=size_bucket(audio.size)):
+                processed, stats = await asyncio.to_thread(
+                    preprocess_wav,
+                    audio.file,
+                    threshold_db=self.preprocess_silence_db,
+                    keep_silence_seconds=self.preprocess_keep_silence_seconds
+                )
+        except UnsupportedAudioError as e:
+            logger.info(f"Sending {audio.filename} without pre-processing: {e}")
+            return audio
+
+        logger.info(
+            f"Pre-processed {audio.filename} in {stats.processing_seconds:.2f}s | "
+            f"{round(stats.original_bytes / MB, 2)}MB -> {round(stats.processed_bytes / MB, 2)}MB "
+            f"({round(stats.bytes_saved / MB, 2)}MB saved) | "
+            f"Duration: {stats.input_seconds:.1f}s -> {stats.output_seconds:.1f}s"
+        )
+        if stats.bytes_saved <= 0:
+            processed.close()
+            return audio
+        PREPROCESS_BYTES_SAVED.inc(stats.bytes_saved)
+        return IngestedAudio(
+            file=processed,
+            filename=audio.filename,
+            container="wav",
+            size=stats.processed_bytes,
+            digest=audio.digest
+        )
+
+    async def _transcribe_upload(self, audio: IngestedAudio) -> str:
+        # Coalesced callers may outlive the request whose upload this is, so read from an own handle
+        file = reopen_upload(audio.file)
+        try:
+            return await self._transcribe_file(audio.filename, file, audio.size)
+        finally:
+            file.close()
+
+    async def _transcribe_segment(self, index: int, segment: BinaryIO) -> str:
+        # The segment belongs to this call, which may outlive the request that split it
+        try:
+            size = segment.seek(0, os.SEEK_END)
+            segment.seek(0)
+            async with self.segment_semaphore:
+                return await self._transcribe_file(f"segment-{index}.wav", segment, size)
+        finally:
+            segment.close()
+
+    async def _iter_long_transcript(self, audio: IngestedAudio, cache_key: str) -> AsyncIterator[str]:
+        """
+        Splits audio longer than the upload limit into overlapping segments,
+        transcribes them concurrently and yields the stitched text in order.
+
+        Segments already being transcribed for an identical upload are joined
+        rather than sent again.
+        """
+        with observe(TEMPFILE_WRITE_SECONDS, "split", purpose="segments", size_bucket=size_bucket(audio.size)):
+            segments = await asyncio.to_thread(
+                split_audio,
+                audio.file,
+                audio.container,
+                self.max_file_size_mb * MB,
+                segment_seconds=self.segment_seconds,
+                overlap_seconds=self.segment_overlap_seconds
             )
+        logger.info(f"Transcribing {audio.filename} as {len(segments)} segments")
+        started = set()
 
-            return response.choices[0].message.content.strip()
+        def transcribe_segment(index: int, segment: BinaryIO):
+            started.add(index)
+            return self._transcribe_segment(index, segment)
+
+        tasks = [
+            asyncio.create_task(self.transcription_flight.do(
+                f"{cache_key}:{index}",
+                lambda index=index, segment=segment: transcribe_segment(index, segment)
+            ))
+            for index, segment in enumerate(segments)
+        ]
+        stitcher = TranscriptStitcher()
+        try:
+            for task in tasks:
+                piece = stitcher.add(await task)
+                if piece:
+                    yield piece
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Segments handed to a transcription call are closed by it
+            for index, segment in enumerate(segments):
+                if index not in started:
+                    segment.close()
+
+    async def translate(self, text: str, language: str) -> str:
+        return await self.translation_flight.do((text, language), lambda: self._translate(text, language))
+
+    async def _translate(self, text: str, language: str) -> str:
+        try:
+            return await self.translation_memory.translate(
+                text,
+                language,
+                backend=f"openai:{self.translation_model}",
+                translate_batch=self._translation_packer(language).submit_many
+            )
+        except CircuitOpenError as e:
+            raise self._translation_unavailable(e)
+        except asyncio.TimeoutError:
+            raise self._translation_timed_out()
         except OpenAIError as e:
             logger.error(f"OpenAI API error during translation: {e}")
+            ERRORS.labels(stage="translation", reason="upstream").inc()
             raise HTTPException(
                 status_code=502,
                 detail="An error occurred while contacting the translation service. Please try again later."
             )
         except Exception as e:
             logger.exception(f"Unexpected error during translation: {e}")
+            ERRORS.labels(stage="translation", reason="internal").inc()
+            raise HTTPException(
+                status_code=500,
+                detail="Something went wrong during translation. Please try again."
+            )
+
+    async def translate_stream(self, text: str, language: str) -> AsyncIterator[str]:
+        """
+        Translates text, yielding translated tokens as they arrive.
+
+        Text whose sentences are all in the translation memory is served
+        locally as a single chunk.
+
+        Args:
+            text (str): Text to translate
+            language (str): Target language
+
+        Yields:
+            str: The next chunk of translated text.
+        """
+        backend = f"openai:{self.translation_model}"
+        cached = self.translation_memory.lookup(text, language, backend)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        try:
+            with IN_FLIGHT.labels(stage="translation").track_inprogress(), \
+                    observe(TRANSLATION_SECONDS, "translation", backend=backend):
+                # Only opening the stream is retried, never a stream that has started yielding
+                stream = await self.translation_resilience.call(lambda timeout: self.client.chat.completions.create(
+                    model=self.translation_model,
+                    messages=[
+                        {"role": "system", "content": "You are a professional translator."},
+                        {"role": "user", "content": f"Translate the following English text into {language}: \n\n{text}"}
+                    ],
+                    temperature=0.3,
+                    stream=True,
+                    timeout=timeout,
+                ))
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        except CircuitOpenError as e:
+            raise self._translation_unavailable(e)
+        except asyncio.TimeoutError:
+            raise self._translation_timed_out()
+        except OpenAIError as e:
+            logger.error(f"OpenAI API error during streamed translation: {e}")
+            ERRORS.labels(stage="translation", reason="upstream").inc()
+            raise HTTPException(
+                status_code=502,
+                detail="An error occurred while contacting the translation service. Please try again later."
+            )
+        except Exception as e:
+            logger.exception(f"Unexpected error during streamed translation: {e}")
+            ERRORS.labels(stage="translation", reason="internal").inc()
             raise HTTPException(
                 status_code=500,
                 detail="Something went wrong during translation. Please try again."
             )
-        
-    
+
+        self.translation_memory.remember(text, "".join(parts).strip(), language, backend)
+
+    async def _complete_translation(self, prompt: str) -> str:
+        with IN_FLIGHT.labels(stage="translation").track_inprogress(), \
+                observe(TRANSLATION_SECONDS, "translation", backend=f"openai:{self.translation_model}"):
+            response = await self.translation_resilience.call(lambda timeout: self.client.chat.completions.create(
+                model=self.translation_model,
+                messages=[
+                    {"role": "system", "content": "You are a professional translator."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                timeout=timeout,
+            ))
+
+        return response.choices[0].message.content.strip()
+
+    @staticmethod
+    def _translation_unavailable(error: CircuitOpenError) -> HTTPException:
+        logger.error(f"Translation skipped, {error}")
+        ERRORS.labels(stage="translation", reason="circuit_open").inc()
+        return HTTPException(
+            status_code=503,
+            detail="The translation service is temporarily unavailable. Please try again later.",
+            headers={"Retry-After": str(int(error.retry_after) + 1)}
+        )
+
+    @staticmethod
+    def _translation_timed_out() -> HTTPException:
+        logger.error("Translation timed out")
+        ERRORS.labels(stage="translation", reason="timeout").inc()
+        return HTTPException(
+            status_code=504,
+            detail="The translation service took too long to respond. Please try again later."
+        )
+
+    def _translation_packer(self, language: str) -> MicroBatcher:
+        key = language.strip().lower()
+        if key not in self.translation_packers:
+            self.translation_packers[key] = MicroBatcher(
+                f"openai:{self.translation_model}",
+                lambda sentences: self._translate_packed(sentences, language),
+                max_batch_size=self.translation_pack_max_sentences,
+                max_wait=self.translation_pack_wait_seconds
+            )
+        return self.translation_packers[key]
+
+    async def _translate_packed(self, sentences: List[str], language: str) -> List[str]:
+        """
+        Translates sentences collected from concurrent requests, in as few
+        requests as the prompt token budget allows. Long transcripts are split
+        into several budget-sized requests at sentence boundaries.
+        """
+        chunks = pack_by_budget(sentences, self.token_counter.count, self.translation_max_prompt_tokens)
+        results = await asyncio.gather(*(
+            translate_numbered(chunk, language, self._complete_translation, source_language="English") for chunk in chunks
+        ))
+        return [translation for chunk in results for translation in chunk]
+
+    async def _translate_piece(self, text: str, language: str) -> str:
+        async with self.translation_semaphore:
+            return await self.translate(text=text, language=language)
+
     async def transcribe_and_translate(self, file: UploadFile, target_language: str) -> Dict[str, str]:
         """
         Transcribes an audio file and translates the result.
@@ -124,35 +528,168 @@ class WhisperService:
         Returns:
             dict: Dictionary containing transcription, translation and target language
         """
-        # start_time = time.perf_counter()
+        audio = await self.ingest(file)
+        return await self.transcribe_and_translate_audio(audio, target_language)
 
-        # file_size_mb = round(os.fstat(file.file.fileno()).st_size / (1024 * 1024), 2)
-        
-        # file.file.seek(0)  # Reset pointer
-        # audio = AudioSegment.from_file(file.file)
-        # audio_duration_sec = round(len(audio) / 1000, 2)  # Convert ms to seconds
-        # file.file.seek(0)  # Reset again for transcription
+    async def transcribe_and_translate_audio(self, audio: IngestedAudio, target_language: str) -> TranscribeAndTranslate:
+        """
+        Transcribes an already ingested upload and translates the result.
 
+        Args:
+            audio (IngestedAudio): The validated upload
+            target_language (str): Target language for translation
 
-        # First transcribe the audio
-        transcribed_text = await self.transcribe(file)
+        Returns:
+            TranscribeAndTranslate: Transcription, translation and target language
+        """
+        start_time = time.perf_counter()
 
-        # # Then translate the transcribed text
-        translated_text = await self.translate(text=transcribed_text, language=target_language)
+        # Queue each transcript piece for translation as soon as it is ready
+        pieces = []
+        translations = []
+        try:
+            async for piece in self.iter_transcript(audio):
+                pieces.append(piece)
+                translations.append(asyncio.create_task(self._translate_piece(piece, target_language)))
+            translated_pieces = await asyncio.gather(*translations)
+        finally:
+            for task in translations:
+                task.cancel()
 
-        # end_time = time.perf_counter()
-        # processing_time = round(end_time - start_time, 2)
-        # logger.info(
-        #     f"Processing Time: {processing_time}s | File Size: {file_size_mb}MB | Duration: {audio_duration_sec}s"
-        # )
-        print(TranscribeAndTranslate(
-            transcription=transcribed_text,
-            translation=translated_text,
-            target_language=target_language
-        ))
+        transcribed_text = " ".join(pieces)
+        translated_text = " ".join(translated_pieces)
+
+        processing_time = round(time.perf_counter() - start_time, 2)
+        logger.info(
+            f"Processing Time: {processing_time}s | File Size: {round(audio.size / MB, 2)}MB",
+            extra={"processing_seconds": processing_time, "size_bytes": audio.size, "target_language": target_language}
+        )
         return TranscribeAndTranslate(
             transcription=transcribed_text,
             translation=translated_text,
             target_language=target_language
         )
-    
\ No newline at end of file
+
+    async def batch_transcribe_and_translate(self, files: List[UploadFile], target_languages: List[str]) -> List[BatchItem]:
+        """
+        Transcribes each file once and translates it into every target language.
+
+        Files are transcribed concurrently under the batch limit and their
+        translations fan out under the translation limit. Failures are reported
+        per file and per language without failing the rest of the batch.
+
+        Args:
+            files (List[UploadFile]): The uploaded audio files
+            target_languages (List[str]): Target languages for translation
+
+        Returns:
+            list: One BatchItem per file, in upload order
+        """
+        if len(files) > self.max_batch_files:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many files. Max batch size is {self.max_batch_files}."
+            )
+        languages = list(dict.fromkeys(language.strip() for language in target_languages if language.strip()))
+        if not languages:
+            raise HTTPException(status_code=400, detail="At least one target language is required.")
+
+        return list(await asyncio.gather(*(self._batch_item(file, languages) for file in files)))
+
+    async def _batch_item(self, file: UploadFile, languages: List[str]) -> BatchItem:
+        item = BatchItem(filename=file.filename or "audio")
+        try:
+            async with self.batch_semaphore:
+                audio = await self.ingest(file)
+                item.transcription = await self.transcribe_audio(audio)
+        except HTTPException as e:
+            item.error = e.detail
+            return item
+
+        translations = await asyncio.gather(
+            *(self._translate_piece(item.transcription, language) for language in languages),
+            return_exceptions=True
+        )
+        for language, translation in zip(languages, translations):
+            if isinstance(translation, HTTPException):
+                item.translations.append(BatchTranslation(target_language=language, error=translation.detail))
+            elif isinstance(translation, BaseException):
+                raise translation
+            else:
+                item.translations.append(BatchTranslation(target_language=language, translation=translation))
+        return item
+
+    async def stream_transcribe_and_translate(
+        self,
+        audio: IngestedAudio,
+        target_language: str
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Transcribes and translates an ingested upload, yielding progress events.
+
+        Transcript pieces are emitted as soon as they are ready while earlier
+        pieces are still being translated; translation tokens are emitted as
+        they stream in. The last event is either the final result or an error.
+
+        Args:
+            audio (IngestedAudio): The validated upload
+            target_language (str): Target language for translation
+
+        Yields:
+            tuple: Event name ("transcript", "translation", "result" or "error") and payload
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        pending_pieces: asyncio.Queue = asyncio.Queue()
+        pieces: List[str] = []
+        translations: List[str] = []
+
+        async def transcribe_pieces() -> None:
+            try:
+                async for piece in self.iter_transcript(audio):
+                    await events.put(("transcript", {"index": len(pieces), "text": piece}))
+                    pieces.append(piece)
+                    await pending_pieces.put(piece)
+            finally:
+                await pending_pieces.put(None)
+
+        async def translate_pieces() -> None:
+            while (piece := await pending_pieces.get()) is not None:
+                index = len(translations)
+                parts = []
+                async for delta in self.translate_stream(piece, target_language):
+                    parts.append(delta)
+                    await events.put(("translation", {"index": index, "delta": delta}))
+                translations.append("".join(parts).strip())
+
+        async def run() -> None:
+            stages = [asyncio.create_task(transcribe_pieces()), asyncio.create_task(translate_pieces())]
+            try:
+                await asyncio.gather(*stages)
+                result = TranscribeAndTranslate(
+                    transcription=" ".join(pieces),
+                    translation=" ".join(translations),
+                    target_language=target_language
+                )
+                await events.put(("result", result.model_dump()))
+            except HTTPException as e:
+                await events.put(("error", {"status_code": e.status_code, "detail": e.detail}))
+            except Exception as e:
+                # The response has already started, so the error can only be reported as an event
+                logger.exception(f"Unexpected error while streaming transcription and translation: {e}")
+                ERRORS.labels(stage="stream", reason="internal").inc()
+                await events.put((
+                    "error",
+                    {"status_code": 500, "detail": "Something went wrong during transcription and translation. Please try again."}
+                ))
+            finally:
+                for stage in stages:
+                    stage.cancel()
+                await events.put(None)
+
+        runner = asyncio.create_task(run())
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+        finally:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
@@ -0,0 +1,129 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+MATCH = "match"
+SUBSTITUTION = "substitution"
+INSERTION = "insertion"
+DELETION = "deletion"
+
+# Sub-problems at or below this many DP cells are aligned with a full matrix
+_FULL_MATRIX_CELLS = 4096
+
+AlignmentStep = Tuple[str, Optional[Hashable], Optional[Hashable]]
+
+
+def encode(reference: Sequence[Hashable], hypothesis: Sequence[Hashable]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Maps tokens of both sequences to shared integer ids so rows can be compared with NumPy.
+    """
+    vocabulary: Dict[Hashable, int] = {}
+    ref_ids = np.fromiter((vocabulary.setdefault(token, len(vocabulary)) for token in reference), dtype=np.int64, count=len(reference))
+    hyp_ids = np.fromiter((vocabulary.setdefault(token, len(vocabulary)) for token in hypothesis), dtype=np.int64, count=len(hypothesis))
+    return ref_ids, hyp_ids
+
+
+def _next_row(previous: np.ndarray, token: int, hypothesis: np.ndarray, row_index: int, offsets: np.ndarray) -> np.ndarray:
+    """
+    Computes one Levenshtein DP row from the previous one, vectorized over the hypothesis.
+
+    Deletions and substitutions only depend on the previous row. Insertions
+    chain along the row: row[j] = min_k<=j (candidate[k] + j - k), which is a
+    running minimum of candidate - j shifted back by j.
+    """
+    candidate = np.empty_like(previous)
+    candidate[0] = row_index
+    np.minimum(previous[1:] + 1, previous[:-1] + (hypothesis != token), out=candidate[1:])
+    return np.minimum.accumulate(candidate - offsets) + offsets
+
+
+def last_row(reference: np.ndarray, hypothesis: np.ndarray) -> np.ndarray:
+    """
+    Returns the final DP row (distances from all of reference to every prefix
+    of hypothesis) using two rows of memory.
+    """
+    offsets = np.arange(len(hypothesis) + 1, dtype=np.int64)
+    row = offsets.copy()
+    for i, token in enumerate(reference, start=1):
+        row = _next_row(row, token, hypothesis, i, offsets)
+    return row
+
+
+def distance(reference: np.ndarray, hypothesis: np.ndarray) -> int:
+    """
+    Levenshtein distance between two encoded sequences in O(min(n, m)) memory.
+    """
+    # Costs are symmetric, so loop over the shorter sequence and vectorize over the longer
+    if len(reference) > len(hypothesis):
+        reference, hypothesis = hypothesis, reference
+    if len(reference) == 0:
+        return len(hypothesis)
+    return int(last_row(reference, hypothesis)[-1])
+
+
+def _align_full(reference: np.ndarray, hypothesis: np.ndarray) -> List[Tuple[str, int, int]]:
+    offsets = np.arange(len(hypothesis) + 1, dtype=np.int64)
+    rows = [offsets.copy()]
+    for i, token in enumerate(reference, start=1):
+        rows.append(_next_row(rows[-1], token, hypothesis, i, offsets))
+
+    steps = []
+    i, j = len(reference), len(hypothesis)
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and rows[i][j] == rows[i - 1][j - 1] + (reference[i - 1] != hypothesis[j - 1]):
+            steps.append((MATCH if reference[i - 1] == hypothesis[j - 1] else SUBSTITUTION, i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif i > 0 and rows[i][j] == rows[i - 1][j] + 1:
+            steps.append((DELETION, i - 1, -1))
+            i -= 1
+        else:
+            steps.append((INSERTION, -1, j - 1))
+            j -= 1
+    steps.reverse()
+    return steps
+
+
+def _align(reference: np.ndarray, hypothesis: np.ndarray, ref_start: int, hyp_start: int) -> List[Tuple[str, int, int]]:
+    """
+    Hirschberg alignment: splits the reference in half, finds where the optimal
+    path crosses the middle row from a forward and a backward pass, and
+    recurses on both halves. Memory stays linear in the input length.
+    """
+    n, m = len(reference), len(hypothesis)
+    if n == 0:
+        return [(INSERTION, -1, hyp_start + j) for j in range(m)]
+    if m == 0:
+        return [(DELETION, ref_start + i, -1) for i in range(n)]
+    if n == 1 or (n + 1) * (m + 1) <= _FULL_MATRIX_CELLS:
+        return [
+            (op, ref_start + i if i >= 0 else -1, hyp_start + j if j >= 0 else -1)
+            for op, i, j in _align_full(reference, hypothesis)
+        ]
+
+    middle = n // 2
+    forward = last_row(reference[:middle], hypothesis)
+    backward = last_row(reference[middle:][::-1], hypothesis[::-1])[::-1]
+    split = int(np.argmin(forward + backward))
+    return (
+        _align(reference[:middle], hypothesis[:split], ref_start, hyp_start)
+        + _align(reference[middle:], hypothesis[split:], ref_start + middle, hyp_start + split)
+    )
+
+
+def align(reference: Sequence[Hashable], hypothesis: Sequence[Hashable]) -> List[AlignmentStep]:
+    """
+    Returns a minimum-cost alignment as (operation, reference token, hypothesis token) steps.
+    Missing sides are None.
+    """
+    ref_ids, hyp_ids = encode(reference, hypothesis)
+    return [
+        (op, reference[i] if i >= 0 else None, hypothesis[j] if j >= 0 else None)
+        for op, i, j in _align(ref_ids, hyp_ids, 0, 0)
+    ]
+
+
+def count_operations(steps: List[AlignmentStep]) -> Dict[str, int]:
+    counts = {MATCH: 0, SUBSTITUTION: 0, INSERTION: 0, DELETION: 0}
+    for op, _, _ in steps:
+        counts[op] += 1
+    return counts
@@ -1,41 +1,93 @@
-import numpy as np
-from nltk.translate.bleu_score import SmoothingFunction, sentence_bleu
-from nltk.translate.meteor_score import meteor_score
-import nltk
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+from app.utils import edit_distance
+
+
+@lru_cache(maxsize=8192)
+def tokenize(text: str) -> Tuple[str, ...]:
+     """
+     Whitespace tokenization, cached so repeated references are only split once.
+     """
+     return tuple(text.split())
 
 
 class EvaluationMetrics:
      """
     A utility class for evaluating transcription and translation performance.
-    Provides methods to compute Word Error Rate (WER) and BLEU score.
+    Provides methods to compute Word/Character Error Rate (WER/CER), BLEU and METEOR scores.
     """
      
+     @staticmethod
+     def _error_rate(errors: int, reference_length: int) -> float:
+          """
+          Converts an edit count into a percentage of the reference length.
+          An empty reference scores 0 if the hypothesis is also empty, else 100.
+          """
+          if reference_length == 0:
+               return 0.0 if errors == 0 else 100.0
+          return round(errors / reference_length * 100, 2)
+
+
      @staticmethod
      def calculate_wer(reference: str, hypothesis: str) -> float:
           """
           Calculate Word Error Rate (WER) between a reference and hypothesis string.
           """
+          reference_words = tokenize(reference)
+          hypothesis_words = tokenize(hypothesis)
+          errors = edit_distance.distance(*edit_distance.encode(reference_words, hypothesis_words))
+          return EvaluationMetrics._error_rate(errors, len(reference_words))
+
+
+     @staticmethod
+     def calculate_cer(reference: str, hypothesis: str) -> float:
+          """
+          Calculate Character Error Rate (CER) between a reference and hypothesis string.
+          Runs of whitespace count as a single space.
+          """
+          reference_chars = " ".join(reference.split())
+          hypothesis_chars = " ".join(hypothesis.split())
+          errors = edit_distance.distance(*edit_distance.encode(reference_chars, hypothesis_chars))
+          return EvaluationMetrics._error_rate(errors, len(reference_chars))
+
+
+     @staticmethod
+     def calculate_corpus_wer(references: List[str], hypotheses: List[str]) -> float:
+          """
+          Calculate corpus-level WER: total word edits over total reference words,
+          so long transcripts weigh more than short ones.
+          """
+          if len(references) != len(hypotheses):
+               raise ValueError("references and hypotheses must have the same length")
+          errors = 0
+          reference_length = 0
+          for reference, hypothesis in zip(references, hypotheses):
+               reference_words = tokenize(reference)
+               errors += edit_distance.distance(*edit_distance.encode(reference_words, tokenize(hypothesis)))
+               reference_length += len(reference_words)
+          return EvaluationMetrics._error_rate(errors, reference_length)
+
+
+     @staticmethod
+     def wer_details(reference: str, hypothesis: str, include_alignment: bool = False) -> Dict[str, Any]:
+          """
+          Calculate WER together with substitution, insertion, deletion and hit counts.
+          Optionally includes the word alignment as (operation, reference, hypothesis) steps.
+          """
           reference_words = reference.split()
-          hypothesis_words = hypothesis.split()
-          n = len(reference_words)
-
-          dp = np.zeros((len(reference_words) + 1, len(hypothesis_words) + 1), dtype=int)
-          for i in range(len(reference_words) + 1):
-               dp[i][0] = i
-          for j in range(len(hypothesis_words) + 1):
-               dp[0][j] = j
-
-          for i in range(1, len(reference_words) + 1):
-               for j in range(1, len(hypothesis_words) + 1):
-                    if reference_words[i - 1] == hypothesis_words[j - 1]:
-                         dp[i][j] = dp[i - 1][j - 1]
-                    else:
-                         dp[i][j] = 1 + min(dp[i - 1][j],        # Del
-                                            dp[i][j - 1],        # Ins
-                                            dp[i - 1][j - 1])    # Sub
-                         
-          wer = dp[len(reference_words)][len(hypothesis_words)] / n
-          return round(wer * 100, 2)
+          steps = edit_distance.align(reference_words, hypothesis.split())
+          counts = edit_distance.count_operations(steps)
+          errors = counts[edit_distance.SUBSTITUTION] + counts[edit_distance.INSERTION] + counts[edit_distance.DELETION]
+          details: Dict[str, Any] = {
+               "wer": EvaluationMetrics._error_rate(errors, len(reference_words)),
+               "substitutions": counts[edit_distance.SUBSTITUTION],
+               "insertions": counts[edit_distance.INSERTION],
+               "deletions": counts[edit_distance.DELETION],
+               "hits": counts[edit_distance.MATCH],
+          }
+          if include_alignment:
+               details["alignment"] = steps
+          return details
      
 
      @staticmethod
@@ -44,11 +96,25 @@ class EvaluationMetrics:
         Calculate BLEU score between a reference and hypothesis string.
         Uses NLTK's sentence_bleu with smoothing for short sentences.
         """
-          ref_tokens = [reference.split()]
-          hyp_tokens = hypothesis.split()
+          # NLTK is imported on first use, it is slow to load and only needed for scoring
+          from nltk.translate.bleu_score import SmoothingFunction, sentence_bleu
+          ref_tokens = [list(tokenize(reference))]
+          hyp_tokens = list(tokenize(hypothesis))
           smoothie = SmoothingFunction().method4
           bleu_score = sentence_bleu(ref_tokens, hyp_tokens, smoothing_function=smoothie)
           return round(bleu_score, 2)
+
+
+     @staticmethod
+     def calculate_corpus_bleu(references: List[str], hypotheses: List[str]) -> float:
+          """
+          Calculate corpus-level BLEU, pooling n-gram statistics over all pairs.
+          """
+          from nltk.translate.bleu_score import SmoothingFunction, corpus_bleu
+          ref_tokens = [[list(tokenize(reference))] for reference in references]
+          hyp_tokens = [list(tokenize(hypothesis)) for hypothesis in hypotheses]
+          smoothie = SmoothingFunction().method4
+          return round(corpus_bleu(ref_tokens, hyp_tokens, smoothing_function=smoothie), 2)
      
 
      @staticmethod
@@ -56,8 +122,9 @@ class EvaluationMetrics:
           """
           Calculate METEOR score between reference and hypothesis.
           """
-          ref_tokens = [reference.split()]
-          hyp_tokens = hypothesis.split()
+          from nltk.translate.meteor_score import meteor_score
+          ref_tokens = [list(tokenize(reference))]
+          hyp_tokens = list(tokenize(hypothesis))
           score = meteor_score(ref_tokens, hyp_tokens)
           return round(score, 2)
 
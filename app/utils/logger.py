@@ -1,32 +1,176 @@
 import os
+import copy
+import json
+import queue
+import atexit
+import random
 import logging
-from logging.handlers import RotatingFileHandler
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+from app.utils.metrics import current_server_timing
 
 
-os.makedirs("logs", exist_ok=True) # Creates logs directory if it doesn't exist
+# Id of the request (or job) being handled, attached to every record logged while handling it
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "stages"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, including the request id,
+    the stage durations recorded so far for the request and any `extra` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "stages", None):
+            entry["stages_ms"] = record.stages
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Captures per-request context on the calling thread, before the record is
+    handed to the listener thread where the context variables are not visible.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        timings = current_server_timing()
+        record.stages = {name: round(seconds * 1000, 1) for name, seconds in timings.items()} if timings else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps every warning and error, but once more than threshold_per_second
+    lower-level records arrive within a second, keeps only sample_rate of them.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, threshold_per_second: int = 50):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.threshold_per_second = threshold_per_second
+        self._second = 0
+        self._count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.sample_rate >= 1.0:
+            return True
+        second = int(record.created)
+        if second != self._second:
+            self._second, self._count = second, 0
+        self._count += 1
+        return self._count <= self.threshold_per_second or random.random() < self.sample_rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Enqueues records without blocking; records are dropped (and counted)
+    when the queue is full rather than stalling the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render message and traceback here so no live arguments or frames cross threads
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging() -> None:
+    """
+    Attaches the queue handler to `logger` and starts the listener thread that
+    writes the file and console output. Called once at application start-up
+    (see the lifespan in app.main), so importing this module creates no files
+    or threads; repeated calls do nothing.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        os.makedirs("logs", exist_ok=True) # Creates logs directory if it doesn't exist
+
+        # Rotating file handler: 1MB per file, keep 5 backups, written by the listener thread
+        file_handler = RotatingFileHandler(
+            "logs/app.log",
+            maxBytes=1 * 1024 * 1024,
+            backupCount=5
+        )
+        file_handler.setLevel(logging.INFO)
+        file_handler.setFormatter(JsonFormatter())
+
+        # Console handler for Dev mode
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.ERROR)
+        console_handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
+
+        # Records are only enqueued on the event loop; file I/O and rotation happen on the listener thread
+        log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(
+            sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "1.0")),
+            threshold_per_second=int(os.getenv("LOG_SAMPLE_THRESHOLD_PER_SECOND", "50"))
+        ))
+        queue_handler.addFilter(ContextFilter())
+
+        logger.addHandler(queue_handler)
+        _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        # Flush what is still queued when the process exits
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """
+    Stops the listener thread after it has written every queued record.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        for handler in list(logger.handlers):
+            if isinstance(handler, NonBlockingQueueHandler):
+                logger.removeHandler(handler)
+        _listener = None
+
 
 # Define logger
 logger = logging.getLogger("transcription_logger")
 logger.setLevel(logging.INFO)
-
-# Rotating file handler: 1MB per file, keep 5 backups
-file_handler = RotatingFileHandler(
-    "logs/app.log",
-    maxBytes=1 * 1024 * 1024,
-    backupCount=5
-)
-file_handler.setLevel(logging.INFO)
-
-# Console handler for Dev mode
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.ERROR)
-
-# Format log
-formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
-
-# Avoids duplicate logs if this module is re-imported
-if not logger.handlers:
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
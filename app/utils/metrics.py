@@ -0,0 +1,226 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+MB = 1024 * 1024
+
+# Upper bounds of the file-size buckets used as a label on per-file stages
+_SIZE_BUCKETS = ((1, "<1MB"), (5, "1-5MB"), (25, "5-25MB"), (100, "25-100MB"))
+
+_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+UPLOAD_READ_SECONDS = Histogram(
+    "stt_upload_read_seconds",
+    "Time to stream, validate and hash an upload",
+    ["size_bucket"],
+    buckets=_LATENCY_BUCKETS
+)
+TEMPFILE_WRITE_SECONDS = Histogram(
+    "stt_tempfile_write_seconds",
+    "Time spent writing audio to temporary storage",
+    ["purpose", "size_bucket"],
+    buckets=_LATENCY_BUCKETS
+)
+WHISPER_SECONDS = Histogram(
+    "stt_whisper_request_seconds",
+    "Duration of upstream transcription calls",
+    ["model", "size_bucket"],
+    buckets=_LATENCY_BUCKETS
+)
+TRANSLATION_SECONDS = Histogram(
+    "stt_translation_request_seconds",
+    "Duration of upstream translation calls",
+    ["backend"],
+    buckets=_LATENCY_BUCKETS
+)
+PREPROCESS_SECONDS = Histogram(
+    "stt_preprocess_seconds",
+    "Time spent downmixing, resampling and compressing silence before upload",
+    ["size_bucket"],
+    buckets=_LATENCY_BUCKETS
+)
+FINGERPRINT_SECONDS = Histogram(
+    "stt_fingerprint_seconds",
+    "Time to fingerprint an upload and look it up in the fingerprint index",
+    ["size_bucket"],
+    buckets=_LATENCY_BUCKETS
+)
+BATCH_SIZE = Histogram(
+    "stt_micro_batch_size",
+    "Distinct items per micro-batched upstream call",
+    ["batcher"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+REQUEST_SECONDS = Histogram(
+    "stt_http_request_seconds",
+    "Total HTTP request time",
+    ["method", "route", "status", "size_bucket"],
+    buckets=_LATENCY_BUCKETS
+)
+
+ERRORS = Counter(
+    "stt_errors_total",
+    "Errors by pipeline stage and reason",
+    ["stage", "reason"]
+)
+FALLBACKS = Counter(
+    "stt_fallbacks_total",
+    "Times a degraded path was taken",
+    ["kind"]
+)
+TRANSLATION_ROUTED = Counter(
+    "stt_translation_routed_total",
+    "Routed translation calls by backend and outcome (won, failed, cancelled)",
+    ["backend", "outcome"]
+)
+UPSTREAM_RETRIES = Counter(
+    "stt_upstream_retries_total",
+    "Retried upstream calls by backend and error",
+    ["backend", "reason"]
+)
+CIRCUIT_STATE = Gauge(
+    "stt_circuit_state",
+    "Circuit breaker state per backend (0 closed, 1 half-open, 2 open)",
+    ["backend"]
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "stt_admission_queue_depth",
+    "Requests waiting for admission"
+)
+ADMISSION_IN_FLIGHT_BYTES = Gauge(
+    "stt_admission_in_flight_bytes",
+    "Declared request bytes of admitted requests"
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "stt_admission_wait_seconds",
+    "Time admitted requests spent in the wait queue",
+    buckets=_LATENCY_BUCKETS
+)
+ADMISSION_REJECTIONS = Counter(
+    "stt_admission_rejections_total",
+    "Requests rejected with 429 by reason (rate_limited, queue_full, queue_timeout)",
+    ["reason"]
+)
+ABANDONED_WORK = Counter(
+    "stt_abandoned_work_total",
+    "Requests and upstream calls stopped early, by stage and reason (disconnected, expired)",
+    ["stage", "reason"]
+)
+PREPROCESS_BYTES_SAVED = Counter(
+    "stt_preprocess_bytes_saved_total",
+    "Upload bytes saved by audio pre-processing"
+)
+COALESCED = Counter(
+    "stt_coalesced_requests_total",
+    "Calls that joined an identical call already in flight instead of going upstream",
+    ["kind"]
+)
+STARTUP_SECONDS = Gauge(
+    "stt_startup_seconds",
+    "Duration of start-up phases: import, lifespan, build:<service> and first_success (since import)",
+    ["phase"]
+)
+IN_FLIGHT = Gauge(
+    "stt_in_flight",
+    "Work currently in progress",
+    ["stage"]
+)
+
+# Per-request stage durations for the Server-Timing header, set by the middleware
+_server_timing: ContextVar[Optional[Dict[str, float]]] = ContextVar("server_timing", default=None)
+
+
+def size_bucket(size_bytes: Optional[int]) -> str:
+    if size_bytes is None:
+        return "unknown"
+    for upper_mb, label in _SIZE_BUCKETS:
+        if size_bytes < upper_mb * MB:
+            return label
+    return ">100MB"
+
+
+def start_server_timing() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _server_timing.set(timings)
+    return timings
+
+
+def current_server_timing() -> Optional[Dict[str, float]]:
+    return _server_timing.get()
+
+
+def record_server_timing(name: str, seconds: float) -> None:
+    """
+    Adds a stage duration to the current request's Server-Timing entry.
+    Stages that run several times in one request (e.g. segments) are summed.
+    """
+    timings = _server_timing.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+@contextmanager
+def observe(histogram: Histogram, timing_name: str, **labels: str) -> Iterator[Dict[str, str]]:
+    """
+    Times the enclosed block into a histogram and the request's Server-Timing.
+
+    Yields the label dict so labels that are only known inside the block
+    (such as the size of a streamed upload) can be filled in before it ends.
+    """
+    start = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.labels(**labels).observe(elapsed)
+        record_server_timing(timing_name, elapsed)
+
+
+class CacheStatsCollector:
+    """
+    Exports the counters kept by the transcript cache and the translation
+    memory at scrape time, so they stay the single source of truth.
+    """
+
+    def __init__(self, sources: Dict[str, Callable[[], Dict[str, int]]]):
+        self.sources = sources
+
+    def collect(self):
+        hits = CounterMetricFamily("stt_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("stt_cache_misses", "Cache misses", labels=["cache"])
+        evictions = CounterMetricFamily("stt_cache_evictions", "Cache evictions", labels=["cache"])
+        entries = GaugeMetricFamily("stt_cache_entries", "Entries held in memory", labels=["cache"])
+        for name, stats in self.sources.items():
+            current = stats()
+            hits.add_metric([name], current["hits"])
+            misses.add_metric([name], current["misses"])
+            evictions.add_metric([name], current["evictions"])
+            entries.add_metric([name], current["entries"])
+        yield from (hits, misses, evictions, entries)
+
+
+_cache_collector: Optional[CacheStatsCollector] = None
+
+
+def register_cache_stats(sources: Dict[str, Callable[[], Dict[str, int]]]) -> None:
+    """
+    Registers (or re-points) the collector for cache counters.
+    """
+    global _cache_collector
+    if _cache_collector is None:
+        _cache_collector = CacheStatsCollector(sources)
+        REGISTRY.register(_cache_collector)
+    else:
+        _cache_collector.sources = sources
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
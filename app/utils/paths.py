@@ -0,0 +1,13 @@
+import os
+
+
+def data_path(*parts: str) -> str:
+    """
+    Builds the default location of a file or directory the service keeps
+    across restarts (job store, fingerprint index, tokenizer files).
+
+    Everything lives under DATA_DIR, "data" relative to the working directory
+    by default, so a deployment only needs to mount one volume. Each store's
+    own path variable still overrides its location.
+    """
+    return os.path.join(os.getenv("DATA_DIR", "data"), *parts)
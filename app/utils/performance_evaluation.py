@@ -1,36 +1,202 @@
-import requests
-from evaluation_metrics import EvaluationMetrics
-
-
-# Example: Test data (ground truth transcription and translation)
-test_cases = [
-    # {
-    #     "audio_file": "../../audio_samples/audio2_native.mp4",
-    #     "target_language": "English",
-    #     "ground_truth_transcription": "Technology is helping people around the world talk to each other, even when they speak different languages.",
-    #     "ground_truth_translation": "Technologie helpt mensen over de hele wereld met elkaar te praten, zelfs als ze verschillende talen spreken."
-    # }
-]
-
-# api_url = "http://localhost:8000/v1/transcribe-and-translate"
-api_url = ""
-
-for case in test_cases:
-    with open(case["audio_file"], "rb") as audio:
-        response = requests.post(api_url, files={"file": audio}, data={"target_language": case["target_language"]})
-        result = response.json()
-        print(result)
-
-        # Extract system outputs
-        system_transcription = result["data"]["transcription"]
-        system_translation = result["data"]["translation"]
-
-        # Calculate BLEU
-        bleu = EvaluationMetrics.calculate_bleu(case["ground_truth_translation"], system_translation)
-
-        # Calculate METEOR
-        meteor_score = EvaluationMetrics.calculate_meteor(case["ground_truth_translation"], system_translation)
-
-        print(f"File: {case['audio_file']}")
-        print(f"METEOR: {meteor_score}")
-        print(f"BLEU: {bleu}\n")
+"""
+Evaluation runner for the transcribe-and-translate API.
+
+Loads a manifest of test cases, sends them to the API concurrently, scores the
+outputs in a process pool with EvaluationMetrics and writes the results as JSON
+so runs can be compared over time.
+
+A manifest is a JSON list (or JSON Lines file) of cases:
+
+    {
+        "audio_file": "audio_samples/audio2_native.mp4",
+        "target_language": "Dutch",
+        "ground_truth_transcription": "Technology is helping people ...",
+        "ground_truth_translation": "Technologie helpt mensen ..."
+    }
+
+Relative audio paths are resolved against the manifest's directory.
+
+Usage:
+    python -m app.utils.performance_evaluation manifest.json \\
+        --api-url http://localhost:8000/v1/transcribe-and-translate --concurrency 4
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import aiohttp
+from app.utils.evaluation_metrics import EvaluationMetrics
+
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    """
+    Reads test cases from a JSON list or a JSON Lines file.
+    """
+    with open(path, encoding="utf-8") as manifest:
+        content = manifest.read().strip()
+    if content.startswith("["):
+        cases = json.loads(content)
+    else:
+        cases = [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for case in cases:
+        case["audio_file"] = os.path.join(base_dir, case["audio_file"])
+    return cases
+
+
+async def run_case(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    api_url: str,
+    case: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Sends one case to the API and records its outputs and latency.
+    """
+    async with semaphore:
+        form = aiohttp.FormData()
+        form.add_field("target_language", case["target_language"])
+        with open(case["audio_file"], "rb") as audio:
+            form.add_field("file", audio, filename=os.path.basename(case["audio_file"]))
+            start = time.perf_counter()
+            try:
+                async with session.post(api_url, data=form) as response:
+                    body = await response.json(content_type=None)
+                    latency = time.perf_counter() - start
+                    if response.status != 200:
+                        return {**case, "latency_s": round(latency, 3), "error": f"HTTP {response.status}: {body}"}
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                return {**case, "latency_s": round(time.perf_counter() - start, 3), "error": str(e)}
+
+    return {
+        **case,
+        "latency_s": round(latency, 3),
+        "transcription": body["data"]["transcription"],
+        "translation": body["data"]["translation"],
+        "error": None,
+    }
+
+
+def score_case(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Scores one case. Runs in a worker process, so it only takes and returns plain data.
+    """
+    scores: Dict[str, Optional[float]] = {}
+    if result.get("error") is None:
+        if result.get("ground_truth_transcription") is not None:
+            scores["wer"] = EvaluationMetrics.calculate_wer(result["ground_truth_transcription"], result["transcription"])
+            scores["cer"] = EvaluationMetrics.calculate_cer(result["ground_truth_transcription"], result["transcription"])
+        if result.get("ground_truth_translation") is not None:
+            scores["bleu"] = EvaluationMetrics.calculate_bleu(result["ground_truth_translation"], result["translation"])
+            try:
+                scores["meteor"] = EvaluationMetrics.calculate_meteor(result["ground_truth_translation"], result["translation"])
+            except LookupError:
+                # WordNet data is not installed (nltk.download("wordnet"))
+                scores["meteor"] = None
+    return {**result, "scores": scores}
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(percentile / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return round(ordered[index], 3)
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregates corpus-level scores and latency over all successful cases.
+    """
+    succeeded = [result for result in results if result["error"] is None]
+    transcribed = [result for result in succeeded if result.get("ground_truth_transcription") is not None]
+    translated = [result for result in succeeded if result.get("ground_truth_translation") is not None]
+    meteor_scores = [result["scores"]["meteor"] for result in translated if result["scores"].get("meteor") is not None]
+    latencies = [result["latency_s"] for result in succeeded]
+
+    return {
+        "cases": len(results),
+        "errors": len(results) - len(succeeded),
+        "corpus_wer": EvaluationMetrics.calculate_corpus_wer(
+            [result["ground_truth_transcription"] for result in transcribed],
+            [result["transcription"] for result in transcribed]
+        ) if transcribed else None,
+        "corpus_bleu": EvaluationMetrics.calculate_corpus_bleu(
+            [result["ground_truth_translation"] for result in translated],
+            [result["translation"] for result in translated]
+        ) if translated else None,
+        "mean_meteor": round(statistics.mean(meteor_scores), 2) if meteor_scores else None,
+        "latency_p50_s": _percentile(latencies, 50),
+        "latency_p95_s": _percentile(latencies, 95),
+        "latency_max_s": max(latencies) if latencies else None,
+    }
+
+
+async def evaluate(
+    cases: List[Dict[str, Any]],
+    api_url: str,
+    concurrency: int = 4,
+    workers: Optional[int] = None,
+    timeout_s: float = 600
+) -> Dict[str, Any]:
+    """
+    Runs all cases against the API and scores them.
+
+    Requests go out concurrently; each finished case is scored in the process
+    pool while the remaining requests are still in flight.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout_s)) as session:
+            async def run_and_score(case: Dict[str, Any]) -> Dict[str, Any]:
+                result = await run_case(session, semaphore, api_url, case)
+                return await loop.run_in_executor(pool, score_case, result)
+
+            results = await asyncio.gather(*(run_and_score(case) for case in cases))
+
+    return {
+        "run_at": datetime.now(timezone.utc).isoformat(),
+        "api_url": api_url,
+        "concurrency": concurrency,
+        "wall_time_s": round(time.perf_counter() - started, 3),
+        "summary": summarize(results),
+        "cases": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="JSON or JSON Lines file of test cases")
+    parser.add_argument("--api-url", default="http://localhost:8000/v1/transcribe-and-translate")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once")
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=600, help="Per-request timeout in seconds")
+    parser.add_argument("--output", default=None, help="Results file (default: evaluation_results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(evaluate(load_manifest(args.manifest), args.api_url, args.concurrency, args.workers, args.timeout))
+
+    output = args.output or os.path.join(
+        "evaluation_results", f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as results_file:
+        json.dump(report, results_file, indent=2, ensure_ascii=False)
+
+    for case in report["cases"]:
+        print(f"File: {case['audio_file']} | {case['latency_s']}s | {case['error'] or case['scores']}")
+    print(json.dumps(report["summary"], indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
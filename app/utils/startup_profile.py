@@ -0,0 +1,127 @@
+"""
+Cold-start profiling for the API.
+
+At runtime this module records how long the app took to import, to finish
+its lifespan start-up, to build each service and to serve its first
+successful request, as the stt_startup_seconds gauge and one log line.
+
+Run as a script it measures the import time of app.main in fresh
+interpreters, prints a breakdown by top-level package and exits non-zero
+when the median exceeds the budget, so it can gate CI:
+
+    python -m app.utils.startup_profile --budget-ms 1000 --runs 5
+
+tests/test_startup.py runs the same measurement with the same 1000ms budget,
+allowing a margin for busy test machines unless STARTUP_IMPORT_BUDGET_MARGIN=1.
+"""
+import re
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.utils.metrics import STARTUP_SECONDS
+
+# Taken when the app first imports this module, i.e. at the start of importing app.main
+_started = time.perf_counter()
+_phases: Dict[str, float] = {}
+_first_success_seen = False
+
+
+def since_start() -> float:
+    return time.perf_counter() - _started
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    _phases[phase] = seconds
+    STARTUP_SECONDS.labels(phase=phase).set(seconds)
+
+
+@contextmanager
+def timed_phase(phase: str) -> Iterator[None]:
+    """
+    Records the duration of the enclosed block as a start-up phase.
+    """
+    start = time.perf_counter()
+    yield
+    record_phase(phase, time.perf_counter() - start)
+
+
+def mark_first_success() -> None:
+    """
+    Records the time to the first successful request and logs the profile.
+    Cheap after the first call, so it can run on every response.
+    """
+    global _first_success_seen
+    if _first_success_seen:
+        return
+    _first_success_seen = True
+    record_phase("first_success", since_start())
+    from app.utils.logger import logger
+    logger.info("Startup profile: " + ", ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in _phases.items()))
+
+
+def report() -> Dict[str, float]:
+    return dict(_phases)
+
+
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def measure_imports(module: str = "app.main") -> Tuple[float, Dict[str, float]]:
+    """
+    Imports module in a fresh interpreter with -X importtime.
+
+    Returns:
+        tuple: Total import time in ms and the self time in ms per top-level package
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    total = 0.0
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+        if name == module:
+            total = int(cumulative_us) / 1000
+    return total, packages
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the cold-start import time of the API")
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to measure; the median is reported")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list in the breakdown")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if the median import time exceeds this")
+    args = parser.parse_args(argv)
+
+    runs = [measure_imports(args.module) for _ in range(args.runs)]
+    totals = [total for total, _ in runs]
+    median = statistics.median(totals)
+    # Break down the run closest to the median
+    _, packages = min(runs, key=lambda run: abs(run[0] - median))
+
+    print(f"Import time of {args.module}: median {median:.0f}ms over {args.runs} runs "
+          f"(min {min(totals):.0f}ms, max {max(totals):.0f}ms)")
+    print(f"{'package':<30} {'ms':>8}")
+    for package, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{package:<30} {ms:>8.1f}")
+
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"FAIL: import time {median:.0f}ms exceeds the budget of {args.budget_ms:.0f}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
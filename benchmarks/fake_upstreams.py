@@ -0,0 +1,208 @@
+"""
+Local stand-ins for the OpenAI and HuggingFace inference APIs.
+
+Implements just enough of POST /v1/audio/transcriptions, POST /v1/chat/completions
+(including stream=True) and POST /models/{model} for the services to run against
+them without spending money. Latency, error rates and HuggingFace's 503
+"model is loading" responses are configurable.
+
+Run standalone with:
+    python -m benchmarks.fake_upstreams --port 9000 --whisper-latency lognormal:0.8,0.4
+and point the API at it with OPENAI_BASE_URL=http://127.0.0.1:9000/v1 and
+HUGGINGFACE_BASE_URL=http://127.0.0.1:9000/models.
+"""
+import json
+import math
+import re
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, List
+from aiohttp import web
+
+
+_NUMBERING = re.compile(r"^(\s*\d+[.)]\s*)?")
+
+
+class LatencyDistribution:
+    """
+    Samples latencies in seconds from a spec such as "fixed:0.2",
+    "uniform:0.1,0.5", "normal:0.5,0.1" or "lognormal:0.8,0.4" (median, sigma).
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",") if value]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "normal":
+            return max(rng.gauss(*self.params), 0.0)
+        median, sigma = self.params
+        return rng.lognormvariate(math.log(median), sigma)
+
+
+@dataclass
+class UpstreamBehaviour:
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    error_rate: float = 0.0
+    # Extra seconds per MB of request body, to model upload time
+    seconds_per_mb: float = 0.0
+
+
+@dataclass
+class FakeUpstreams:
+    whisper: UpstreamBehaviour = field(default_factory=UpstreamBehaviour)
+    chat: UpstreamBehaviour = field(default_factory=UpstreamBehaviour)
+    huggingface: UpstreamBehaviour = field(default_factory=UpstreamBehaviour)
+    # Probability that a HuggingFace call gets 503 "model is loading"
+    loading_rate: float = 0.0
+    loading_estimated_time: float = 2.0
+    seed: int = 0
+    requests: Dict[str, int] = field(default_factory=lambda: {"whisper": 0, "chat": 0, "huggingface": 0})
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+    async def _delay(self, behaviour: UpstreamBehaviour, body_bytes: int) -> None:
+        await asyncio.sleep(behaviour.latency.sample(self.rng) + behaviour.seconds_per_mb * body_bytes / (1024 * 1024))
+
+    def _failure(self, behaviour: UpstreamBehaviour):
+        if self.rng.random() < behaviour.error_rate:
+            status = self.rng.choice([429, 500, 503])
+            headers = {"Retry-After": "1"} if status == 429 else {}
+            return web.json_response({"error": {"message": "Injected failure", "type": "server_error"}}, status=status, headers=headers)
+        return None
+
+    @staticmethod
+    def _transcript() -> str:
+        # Unique sentences so neither the transcript cache nor the translation memory hides upstream cost
+        token = uuid.uuid4().hex[:8]
+        return f"This is benchmark recording {token}. It has a few sentences of speech. Reference {token} ends here."
+
+    async def transcriptions(self, request: web.Request) -> web.Response:
+        self.requests["whisper"] += 1
+        body_bytes = 0
+        reader = await request.multipart()
+        async for part in reader:
+            while chunk := await part.read_chunk():
+                body_bytes += len(chunk)
+        await self._delay(self.whisper, body_bytes)
+        return self._failure(self.whisper) or web.json_response({"text": self._transcript()})
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        self.requests["chat"] += 1
+        payload = await request.json()
+        prompt = payload["messages"][-1]["content"]
+        await self._delay(self.chat, len(prompt))
+        failure = self._failure(self.chat)
+        if failure is not None:
+            return failure
+
+        # Echo the text after the instruction, tagged so callers can see it was "translated"
+        # keeping any "N. " numbering so batched prompts map back to their inputs
+        content = "\n".join(
+            _NUMBERING.sub(r"\1[fake] ", line) if line.strip() else line
+            for line in prompt.split("\n\n", 1)[-1].split("\n")
+        )
+        created = int(time.time())
+        if not payload.get("stream"):
+            return web.json_response({
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": created,
+                "model": payload["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(prompt) + len(content)) // 4},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for word in content.split(" "):
+            chunk = {
+                "id": "chatcmpl-stream",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": payload["model"],
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(0.005)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def huggingface_inference(self, request: web.Request) -> web.Response:
+        self.requests["huggingface"] += 1
+        payload = await request.json()
+        model = request.match_info["model"]
+        if self.rng.random() < self.loading_rate:
+            return web.json_response(
+                {"error": f"Model {model} is currently loading", "estimated_time": self.loading_estimated_time},
+                status=503
+            )
+        inputs: List[str] = payload["inputs"] if isinstance(payload["inputs"], list) else [payload["inputs"]]
+        await self._delay(self.huggingface, sum(len(text) for text in inputs))
+        failure = self._failure(self.huggingface)
+        if failure is not None:
+            return failure
+        return web.json_response([{"translation_text": f"[{model}] {text}"} for text in inputs])
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_post("/v1/audio/transcriptions", self.transcriptions)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/models/{model:.+}", self.huggingface_inference)
+        return app
+
+
+async def start_fake_upstreams(upstreams: FakeUpstreams, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+    """
+    Starts the fake server on the running loop. Returns the runner; its bound
+    port is available as runner.addresses[0][1].
+    """
+    runner = web.AppRunner(upstreams.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner
+
+
+def add_upstream_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--whisper-latency", default="lognormal:0.8,0.3", help="Whisper latency distribution")
+    parser.add_argument("--whisper-seconds-per-mb", type=float, default=0.05)
+    parser.add_argument("--chat-latency", default="lognormal:0.6,0.3", help="Chat completion latency distribution")
+    parser.add_argument("--hf-latency", default="lognormal:0.3,0.3", help="HuggingFace latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected 429/500/503 rate for every upstream")
+    parser.add_argument("--hf-loading-rate", type=float, default=0.0, help="HuggingFace 503 model-loading rate")
+
+
+def upstreams_from_arguments(args: argparse.Namespace) -> FakeUpstreams:
+    return FakeUpstreams(
+        whisper=UpstreamBehaviour(LatencyDistribution(args.whisper_latency), args.error_rate, args.whisper_seconds_per_mb),
+        chat=UpstreamBehaviour(LatencyDistribution(args.chat_latency), args.error_rate),
+        huggingface=UpstreamBehaviour(LatencyDistribution(args.hf_latency), args.error_rate),
+        loading_rate=args.hf_loading_rate,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(upstreams_from_arguments(args).app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Lookup-time benchmark for the acoustic fingerprint index.
+
+Indexes a set of real fingerprints, computed from synthetic speech, then
+grows the index with synthetic fingerprints whose peak frequencies and
+spacings are drawn from those real ones, so common hashes are as common as
+in speech. At each index size it times lookups of re-encoded copies of the
+real clips (which should match) and of unseen clips (which should not),
+both on the open connection (warm) and on a fresh one (cold).
+
+Usage:
+    python -m benchmarks.fingerprint_benchmark [--sizes 1000 10000 100000] [--queries 50]
+"""
+import io
+import os
+import time
+import wave
+import argparse
+import tempfile
+import statistics
+from typing import Dict, List, Sequence
+import numpy as np
+from app.services.audio_fingerprint import (
+    DELTA_BITS, FREQUENCY_BITS, HOP, FINGERPRINT_RATE, Fingerprint, FingerprintIndex, compute_fingerprint
+)
+
+RATE = 16000
+SCOPE = "whisper-1:auto"
+HASHES_PER_SECOND = 21
+
+
+def speech_like(rng: np.random.Generator, seconds: float) -> np.ndarray:
+    """Voiced syllables with random pitch and formants, separated by short pauses."""
+    pieces = []
+    length = 0
+    while length < seconds * RATE:
+        n = int(rng.uniform(0.08, 0.25) * RATE)
+        length += n
+        if rng.random() < 0.2:
+            pieces.append(np.zeros(n))
+            continue
+        t = np.arange(n) / RATE
+        pitch = rng.uniform(90, 250)
+        formants = rng.uniform([300, 900, 2000], [900, 2200, 3200])
+        syllable = np.zeros(n)
+        for harmonic in range(1, int(3800 // pitch)):
+            frequency = harmonic * pitch
+            gain = sum(np.exp(-((frequency - formant) / 150) ** 2) for formant in formants) + 0.02
+            syllable += gain * np.sin(2 * np.pi * frequency * t + rng.uniform(0, 2 * np.pi))
+        pieces.append(syllable * np.hanning(n))
+    signal = np.concatenate(pieces)[:int(seconds * RATE)]
+    return signal / np.abs(signal).max() * 0.5
+
+
+def reencoded(signal: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Encoder delay, resampling to 44.1 kHz, a low-pass, a gain change and noise."""
+    delayed = np.concatenate([np.zeros(int(0.137 * RATE)), signal])
+    target = np.arange(int(len(delayed) * 44100 / RATE)) / 44100
+    resampled = np.interp(target, np.arange(len(delayed)) / RATE, delayed)
+    filtered = np.convolve(resampled, np.ones(5) / 5, mode="same") * 0.7
+    return filtered + rng.normal(0, 0.01, len(filtered))
+
+
+def fingerprint_of(signal: np.ndarray, rate: int = RATE) -> Fingerprint:
+    wav = io.BytesIO()
+    with wave.open(wav, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+    return compute_fingerprint(wav, "wav")
+
+
+def synthetic_fingerprint(rng: np.random.Generator, pool: np.ndarray, seconds: float) -> Fingerprint:
+    """Hashes whose fields follow the distribution of the real hashes in pool."""
+    count = int(seconds * HASHES_PER_SECOND)
+    mask = (1 << FREQUENCY_BITS) - 1
+    first = (rng.choice(pool, count) >> (FREQUENCY_BITS + DELTA_BITS)) & mask
+    second = (rng.choice(pool, count) >> DELTA_BITS) & mask
+    delta = rng.choice(pool, count) & ((1 << DELTA_BITS) - 1)
+    hashes = (first << (FREQUENCY_BITS + DELTA_BITS)) | (second << DELTA_BITS) | delta
+    offsets = np.sort(rng.integers(0, int(seconds * FINGERPRINT_RATE / HOP), count))
+    return Fingerprint(hashes.astype(np.int64), offsets.astype(np.int64), seconds)
+
+
+def time_lookups(index: FingerprintIndex, queries: Sequence[Fingerprint], db_path: str, cold: bool) -> Dict[str, float]:
+    timings: List[float] = []
+    found = 0
+    for query in queries:
+        if cold:
+            index = FingerprintIndex(db_path, max_entries=index.max_entries,
+                                     max_query_hashes=index.max_query_hashes, max_hash_uploads=index.max_hash_uploads)
+        start = time.perf_counter()
+        match = index._lookup(SCOPE, query)
+        timings.append((time.perf_counter() - start) * 1000)
+        found += match is not None
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings),
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "found": found / len(queries),
+    }
+
+
+def run(args: argparse.Namespace, db_path: str) -> None:
+    rng = np.random.default_rng(0)
+    index = FingerprintIndex(
+        db_path, max_entries=max(args.sizes) + args.queries,
+        max_query_hashes=args.max_query_hashes, max_hash_uploads=args.max_hash_uploads
+    )
+
+    print(f"Fingerprinting {args.queries} real clips...", flush=True)
+    originals, copies, unseen = [], [], []
+    for number in range(args.queries):
+        seconds = float(rng.uniform(args.min_seconds, args.max_seconds))
+        signal = speech_like(rng, seconds)
+        originals.append(fingerprint_of(signal))
+        copies.append(fingerprint_of(reencoded(signal, rng), rate=44100))
+        unseen.append(fingerprint_of(speech_like(rng, seconds)))
+        index._add(SCOPE, f"real-{number}", originals[-1], "transcript")
+    pool = np.concatenate([fingerprint.hashes for fingerprint in originals])
+
+    print(f"{'entries':>9} {'build_s':>8} {'kind':>6} {'cache':>5} {'p50_ms':>8} {'p99_ms':>8} {'found':>6}")
+    entries = args.queries
+    for size in sorted(args.sizes):
+        start = time.perf_counter()
+        while entries < size:
+            seconds = float(rng.uniform(args.min_seconds, args.max_seconds))
+            index._add(SCOPE, f"synthetic-{entries}", synthetic_fingerprint(rng, pool, seconds), "transcript")
+            entries += 1
+        build = time.perf_counter() - start
+        for kind, queries in (("copy", copies), ("unseen", unseen)):
+            for cold in (False, True):
+                result = time_lookups(index, queries, db_path, cold)
+                print(
+                    f"{entries:>9} {build:>8.1f} {kind:>6} {'cold' if cold else 'warm':>5} "
+                    f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['found']:>6.2f}",
+                    flush=True
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Indexed uploads")
+    parser.add_argument("--queries", type=int, default=50, help="Lookups of each kind per size")
+    parser.add_argument("--min-seconds", type=float, default=5)
+    parser.add_argument("--max-seconds", type=float, default=30)
+    parser.add_argument("--max-query-hashes", type=int, default=256)
+    parser.add_argument("--max-hash-uploads", type=int, default=1000)
+    parser.add_argument("--db", default=None, help="Index file to use; a temporary file by default")
+    args = parser.parse_args()
+
+    if args.db:
+        run(args, args.db)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            run(args, os.path.join(directory, "fingerprints.db"))
+
+
+if __name__ == "__main__":
+    main()
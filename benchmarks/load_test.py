@@ -0,0 +1,255 @@
+"""
+Load and latency benchmark for /v1/transcribe-and-translate.
+
+Starts the fake OpenAI/HuggingFace upstreams, runs the API in-process with
+uvicorn on its own thread and event loop, then drives it at increasing
+concurrency for each upload size. For every (file size, concurrency) step it
+reports throughput, p50/p95/p99 latency, error count, the worst event-loop lag
+seen on the API's loop and peak process RSS.
+
+Usage:
+    python -m benchmarks.load_test --sizes-mb 1 5 20 --concurrency 1 4 16 --requests 32
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import statistics
+from typing import Any, Dict, List, Optional
+import aiohttp
+from benchmarks.fake_upstreams import add_upstream_arguments, start_fake_upstreams, upstreams_from_arguments
+
+
+class LoopLagProbe:
+    """
+    Measures how late a periodic timer fires on the API's event loop. Any
+    blocking work on the loop shows up directly as lag.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.max_lag = 0.0
+        self.lags: List[float] = []
+
+    def reset(self) -> None:
+        self.max_lag = 0.0
+        self.lags = []
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+
+class RssSampler(threading.Thread):
+    """
+    Samples resident set size from /proc so the peak can be reset per step.
+    """
+
+    def __init__(self, interval: float = 0.02):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def current_bytes() -> int:
+        try:
+            with open("/proc/self/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def reset(self) -> None:
+        self.peak_bytes = self.current_bytes()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, self.current_bytes())
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+class ApiServer:
+    """
+    Runs the FastAPI app with uvicorn on a background thread.
+    """
+
+    def __init__(self, port: int, probe: LoopLagProbe):
+        import uvicorn
+        from app.main import app
+
+        self.port = port
+        self.probe = probe
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self.probe.run())
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self) -> None:
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(round(percentile / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def make_payload(size_bytes: int) -> bytearray:
+    # An ID3 header is enough for the container sniffing; the rest is opaque bytes
+    return bytearray(b"ID3" + os.urandom(min(size_bytes, 1024 * 1024)) * max(size_bytes // (1024 * 1024), 1))[:size_bytes]
+
+
+async def run_step(
+    session: aiohttp.ClientSession,
+    url: str,
+    payload: bytearray,
+    concurrency: int,
+    requests: int,
+    counter: List[int]
+) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def one() -> None:
+        async with semaphore:
+            # Make each upload unique so the transcript cache cannot short-circuit it
+            counter[0] += 1
+            payload[3:11] = counter[0].to_bytes(8, "little")
+            form = aiohttp.FormData()
+            form.add_field("target_language", "French")
+            form.add_field("file", bytes(payload), filename="benchmark.mp3", content_type="audio/mpeg")
+            start = time.perf_counter()
+            try:
+                async with session.post(url, data=form) as response:
+                    await response.read()
+                    if response.status == 200:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors[str(response.status)] = errors.get(str(response.status), 0) + 1
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_s": _percentile(latencies, 50),
+        "p95_s": _percentile(latencies, 95),
+        "p99_s": _percentile(latencies, 99),
+        "mean_s": statistics.mean(latencies) if latencies else None,
+        "errors": errors,
+    }
+
+
+async def benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    upstreams = upstreams_from_arguments(args)
+    runner = await start_fake_upstreams(upstreams)
+    upstream_port = runner.addresses[0][1]
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{upstream_port}/v1"
+    os.environ["HUGGINGFACE_BASE_URL"] = f"http://127.0.0.1:{upstream_port}/models"
+    # All traffic comes from one loopback client, so the per-client rate limit and the
+    # admission caps would otherwise turn the benchmark into a measurement of 429s
+    max_concurrency = max(args.concurrency)
+    os.environ["RATE_LIMIT_PER_MINUTE"] = "0"
+    os.environ["ADMISSION_MAX_IN_FLIGHT"] = str(max_concurrency)
+    os.environ["ADMISSION_MAX_IN_FLIGHT_MB"] = str(int(max_concurrency * (max(args.sizes_mb) + 1)))
+    os.environ["ADMISSION_MAX_QUEUE"] = str(max_concurrency)
+    os.environ["ADMISSION_QUEUE_TIMEOUT_SECONDS"] = str(args.timeout)
+
+    probe = LoopLagProbe()
+    rss = RssSampler()
+    rss.start()
+    server = ApiServer(_free_port(), probe)
+    server.start()
+    url = f"http://127.0.0.1:{server.port}/v1/transcribe-and-translate"
+
+    results = []
+    counter = [0]
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+            for size_mb in args.sizes_mb:
+                payload = make_payload(int(size_mb * 1024 * 1024))
+                for concurrency in args.concurrency:
+                    probe.reset()
+                    rss.reset()
+                    step = await run_step(session, url, payload, concurrency, args.requests, counter)
+                    step.update({
+                        "size_mb": size_mb,
+                        "concurrency": concurrency,
+                        "loop_lag_max_ms": round(probe.max_lag * 1000, 2),
+                        "loop_lag_p99_ms": round((_percentile(probe.lags, 99) or 0) * 1000, 2),
+                        "peak_rss_mb": round(rss.peak_bytes / (1024 * 1024), 1),
+                    })
+                    results.append(step)
+                    print(
+                        f"{size_mb:>7} {concurrency:>5} {step['throughput_rps']:>8} "
+                        f"{_fmt(step['p50_s'])} {_fmt(step['p95_s'])} {_fmt(step['p99_s'])} "
+                        f"{step['loop_lag_max_ms']:>9} {step['peak_rss_mb']:>9} {sum(step['errors'].values()):>6}",
+                        flush=True
+                    )
+    finally:
+        server.stop()
+        rss.stop()
+        await runner.cleanup()
+    return results
+
+
+def _fmt(value: Optional[float]) -> str:
+    return f"{value:>7.3f}" if value is not None else f"{'-':>7}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=32, help="Requests per step")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"{'size_mb':>7} {'conc':>5} {'rps':>8} {'p50_s':>7} {'p95_s':>7} {'p99_s':>7} {'lag_ms':>9} {'rss_mb':>9} {'errors':>6}")
+    results = asyncio.run(benchmark(args))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"argv": sys.argv[1:], "results": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
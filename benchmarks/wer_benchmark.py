@@ -0,0 +1,79 @@
+"""
+Micro-benchmark for the WER engine.
+
+Compares EvaluationMetrics.calculate_wer against the previous full-matrix,
+pure-Python implementation on synthetic transcripts of increasing length.
+
+Usage:
+    python -m benchmarks.wer_benchmark [--lengths 500 2000 5000] [--baseline-max 2000]
+"""
+import argparse
+import random
+import time
+import numpy as np
+from app.utils.evaluation_metrics import EvaluationMetrics
+
+
+def baseline_wer(reference: str, hypothesis: str) -> float:
+    """The original O(n*m) matrix with a Python double loop."""
+    reference_words = reference.split()
+    hypothesis_words = hypothesis.split()
+    dp = np.zeros((len(reference_words) + 1, len(hypothesis_words) + 1), dtype=int)
+    for i in range(len(reference_words) + 1):
+        dp[i][0] = i
+    for j in range(len(hypothesis_words) + 1):
+        dp[0][j] = j
+    for i in range(1, len(reference_words) + 1):
+        for j in range(1, len(hypothesis_words) + 1):
+            if reference_words[i - 1] == hypothesis_words[j - 1]:
+                dp[i][j] = dp[i - 1][j - 1]
+            else:
+                dp[i][j] = 1 + min(dp[i - 1][j], dp[i][j - 1], dp[i - 1][j - 1])
+    return round(dp[len(reference_words)][len(hypothesis_words)] / len(reference_words) * 100, 2)
+
+
+def make_pair(length: int, error_rate: float, rng: random.Random):
+    vocabulary = [f"word{i}" for i in range(2000)]
+    reference = [rng.choice(vocabulary) for _ in range(length)]
+    hypothesis = []
+    for word in reference:
+        roll = rng.random()
+        if roll < error_rate / 3:
+            continue  # deletion
+        if roll < 2 * error_rate / 3:
+            hypothesis.append(rng.choice(vocabulary))  # substitution
+        else:
+            hypothesis.append(word)
+        if rng.random() < error_rate / 3:
+            hypothesis.append(rng.choice(vocabulary))  # insertion
+    return " ".join(reference), " ".join(hypothesis)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[500, 2000, 5000, 20000])
+    parser.add_argument("--baseline-max", type=int, default=2000, help="Skip the slow baseline above this length")
+    parser.add_argument("--error-rate", type=float, default=0.15)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'words':>8} {'engine (s)':>12} {'baseline (s)':>14} {'speedup':>9}  WER")
+    for length in args.lengths:
+        reference, hypothesis = make_pair(length, args.error_rate, rng)
+        wer, engine_seconds = timed(EvaluationMetrics.calculate_wer, reference, hypothesis)
+        if length <= args.baseline_max:
+            baseline, baseline_seconds = timed(baseline_wer, reference, hypothesis)
+            assert baseline == wer, f"WER mismatch: {baseline} != {wer}"
+            print(f"{length:>8} {engine_seconds:>12.4f} {baseline_seconds:>14.4f} {baseline_seconds / engine_seconds:>8.1f}x  {wer}")
+        else:
+            print(f"{length:>8} {engine_seconds:>12.4f} {'-':>14} {'-':>9}  {wer}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _isolated_working_directory(tmp_path_factory):
+    # Logs and the SQLite stores are created relative to the working directory
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("cwd"))
+    yield
+    os.chdir(previous)
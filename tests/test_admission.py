@@ -0,0 +1,252 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+import pytest
+from app.api.middleware import AdmissionController, AdmissionMiddleware, AdmissionRejected, TokenBucket
+
+
+async def _request(middleware: AdmissionMiddleware, body_bytes: int = 10, client: str = "10.0.0.1") -> Tuple[int, Dict[bytes, bytes]]:
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/v1/transcribe-and-translate",
+        "headers": [(b"content-length", str(body_bytes).encode())],
+        "client": (client, 50000),
+    }
+    messages: List[dict] = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    return messages[0]["status"], dict(messages[0]["headers"])
+
+
+def _holding_app(release: Optional[asyncio.Event] = None):
+    async def app(scope, receive, send) -> None:
+        if release is not None:
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+def test_queued_requests_are_admitted_in_fifo_order():
+    async def scenario() -> None:
+        controller = AdmissionController(max_in_flight=10, max_in_flight_bytes=1000, max_queue=10, queue_timeout=5)
+        await controller.acquire(500)
+        admitted: List[str] = []
+
+        async def waiter(name: str, weight: int) -> None:
+            await controller.acquire(weight)
+            admitted.append(name)
+
+        tasks = []
+        for name, weight in (("large", 600), ("small", 1), ("smaller", 1)):
+            tasks.append(asyncio.create_task(waiter(name, weight)))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        # The small requests would fit, but must not overtake the large one queued before them
+        assert admitted == []
+
+        controller.release(500)
+        await asyncio.gather(*tasks)
+        assert admitted == ["large", "small", "smaller"]
+
+    asyncio.run(scenario())
+
+
+def test_in_flight_bytes_limit_holds_back_requests_that_do_not_fit():
+    async def scenario() -> None:
+        controller = AdmissionController(max_in_flight=10, max_in_flight_bytes=100, max_queue=10, queue_timeout=5)
+        await controller.acquire(60)
+        second = asyncio.create_task(controller.acquire(60))
+        await asyncio.sleep(0.01)
+        assert not second.done()
+        assert controller.in_flight == 1
+
+        controller.release(60)
+        await asyncio.wait_for(second, timeout=1)
+        assert controller.in_flight_bytes == 60
+        controller.release(60)
+
+        # A body larger than the whole cap is still admitted when nothing else runs
+        await asyncio.wait_for(controller.acquire(500), timeout=1)
+        assert controller.in_flight_bytes == 500
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_raises_and_leaves_the_queue():
+    async def scenario() -> None:
+        controller = AdmissionController(max_in_flight=1, max_in_flight_bytes=1000, max_queue=10, queue_timeout=0.05)
+        await controller.acquire(1)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(1)
+        assert rejected.value.reason == "queue_timeout"
+        assert not controller._waiters
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_returns_429_with_retry_after():
+    async def scenario() -> None:
+        release = asyncio.Event()
+        middleware = AdmissionMiddleware(
+            _holding_app(release), max_in_flight=1, max_queue=10, queue_timeout=0.05, rate_per_minute=0
+        )
+        holder = asyncio.create_task(_request(middleware))
+        await asyncio.sleep(0.01)
+
+        status, headers = await _request(middleware)
+        assert status == 429
+        assert headers[b"retry-after"] == b"1"
+
+        release.set()
+        assert (await holder)[0] == 200
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_returns_429():
+    async def scenario() -> None:
+        release = asyncio.Event()
+        middleware = AdmissionMiddleware(
+            _holding_app(release), max_in_flight=1, max_queue=0, queue_timeout=5, rate_per_minute=0
+        )
+        holder = asyncio.create_task(_request(middleware))
+        await asyncio.sleep(0.01)
+        assert (await _request(middleware))[0] == 429
+        release.set()
+        await holder
+
+    asyncio.run(scenario())
+
+
+def test_client_that_disconnects_while_queued_leaves_the_queue():
+    async def scenario() -> None:
+        release = asyncio.Event()
+        middleware = AdmissionMiddleware(
+            _holding_app(release), max_in_flight=1, max_queue=10, queue_timeout=5, rate_per_minute=0
+        )
+        holder = asyncio.create_task(_request(middleware))
+        await asyncio.sleep(0.01)
+
+        disconnect = asyncio.Event()
+        messages = iter([{"type": "http.request", "body": b"x" * 10, "more_body": False}])
+        sent: List[dict] = []
+
+        async def receive() -> dict:
+            message = next(messages, None)
+            if message is not None:
+                return message
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/v1/transcribe", "headers": [], "client": ("10.0.0.2", 1)}
+        queued = asyncio.create_task(middleware(scope, receive, send))
+        await asyncio.sleep(0.01)
+        assert len(middleware.controller._waiters) == 1
+
+        disconnect.set()
+        await asyncio.wait_for(queued, timeout=1)
+        assert not middleware.controller._waiters
+        assert scope["client_disconnected"]
+        assert sent == []
+
+        release.set()
+        assert (await holder)[0] == 200
+        assert middleware.controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_queued_request_gets_the_body_read_ahead_once_admitted():
+    async def scenario() -> None:
+        release = asyncio.Event()
+        received: List[dict] = []
+
+        async def echo(scope, receive, send) -> None:
+            while True:
+                message = await receive()
+                received.append(message)
+                if not message.get("more_body", False):
+                    break
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        holding = _holding_app(release)
+
+        async def app(scope, receive, send) -> None:
+            handler = holding if scope["path"].endswith("hold") else echo
+            await handler(scope, receive, send)
+
+        middleware = AdmissionMiddleware(app, max_in_flight=1, max_queue=10, queue_timeout=5, rate_per_minute=0, max_read_ahead_bytes=4)
+        hold_scope = {"type": "http", "method": "POST", "path": "/v1/hold", "headers": [], "client": ("10.0.0.1", 1)}
+
+        async def nothing() -> dict:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def ignore(message: dict) -> None:
+            pass
+
+        holder = asyncio.create_task(middleware(hold_scope, nothing, ignore))
+        await asyncio.sleep(0.01)
+
+        chunks = [{"type": "http.request", "body": body, "more_body": more} for body, more in ((b"abc", True), (b"def", True), (b"ghi", False))]
+        reads = 0
+
+        async def receive() -> dict:
+            nonlocal reads
+            reads += 1
+            return chunks[reads - 1]
+
+        scope = {"type": "http", "method": "POST", "path": "/v1/echo", "headers": [], "client": ("10.0.0.2", 1)}
+        queued = asyncio.create_task(middleware(scope, receive, ignore))
+        await asyncio.sleep(0.01)
+        # Reading ahead stops once the limit is reached
+        assert reads == 2
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(holder, queued), timeout=1)
+        assert b"".join(message["body"] for message in received) == b"abcdefghi"
+
+    asyncio.run(scenario())
+
+
+def test_rate_limited_client_gets_429_with_retry_after():
+    async def scenario() -> None:
+        middleware = AdmissionMiddleware(_holding_app(), rate_per_minute=30, burst=1)
+        assert (await _request(middleware))[0] == 200
+
+        status, headers = await _request(middleware)
+        assert status == 429
+        # 30 requests per minute refill one token every two seconds
+        assert headers[b"retry-after"] == b"2"
+
+        # Other clients have buckets of their own
+        assert (await _request(middleware, client="10.0.0.2"))[0] == 200
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_refills_over_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.api.middleware.time.monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() == pytest.approx(0.5)
+
+    now[0] += 0.5
+    assert bucket.take() == 0
+    now[0] += 10
+    # Refill is capped at the capacity
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() > 0
@@ -0,0 +1,212 @@
+import io
+import wave
+import asyncio
+from types import SimpleNamespace
+import numpy as np
+from app.services.audio_fingerprint import Fingerprint, FingerprintIndex, compute_fingerprint
+from app.services.audio_ingest import IngestedAudio
+from app.services.transcript_cache import TranscriptCache
+from app.services.whisper_service import WhisperService
+
+RATE = 16000
+
+
+def _speech_like(seed: int, seconds: float) -> np.ndarray:
+    """
+    Voiced syllables with random pitch and formants and short pauses, which
+    gives peak patterns close enough to speech for landmark hashing.
+    """
+    rng = np.random.default_rng(seed)
+    pieces = []
+    length = 0
+    while length < seconds * RATE:
+        n = int(rng.uniform(0.08, 0.25) * RATE)
+        length += n
+        if rng.random() < 0.2:
+            pieces.append(np.zeros(n))
+            continue
+        t = np.arange(n) / RATE
+        pitch = rng.uniform(90, 250)
+        formants = rng.uniform([300, 900, 2000], [900, 2200, 3200])
+        syllable = np.zeros(n)
+        for harmonic in range(1, int(3800 // pitch)):
+            frequency = harmonic * pitch
+            gain = sum(np.exp(-((frequency - formant) / 150) ** 2) for formant in formants) + 0.02
+            syllable += gain * np.sin(2 * np.pi * frequency * t + rng.uniform(0, 2 * np.pi))
+        pieces.append(syllable * np.hanning(n))
+    signal = np.concatenate(pieces)[:int(seconds * RATE)]
+    return signal / np.abs(signal).max() * 0.5
+
+
+def _reencoded(signal: np.ndarray) -> np.ndarray:
+    """
+    What a lossy round trip does to the spectral peaks, without needing
+    ffmpeg: encoder delay, resampling to 44.1 kHz, a low-pass, a gain change
+    and added noise.
+    """
+    rng = np.random.default_rng(0)
+    delayed = np.concatenate([np.zeros(int(0.137 * RATE)), signal])
+    target = np.arange(int(len(delayed) * 44100 / RATE)) / 44100
+    resampled = np.interp(target, np.arange(len(delayed)) / RATE, delayed)
+    filtered = np.convolve(resampled, np.ones(5) / 5, mode="same") * 0.7
+    return filtered + rng.normal(0, 0.01, len(filtered))
+
+
+def _fingerprint(signal: np.ndarray, rate: int = RATE, channels: int = 1) -> Fingerprint:
+    wav = io.BytesIO()
+    with wave.open(wav, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(np.repeat((np.clip(signal, -1, 1) * 32767).astype("<i2"), channels).tobytes())
+    return compute_fingerprint(wav, "wav")
+
+
+def _index(tmp_path) -> FingerprintIndex:
+    # Production defaults apart from the location
+    return FingerprintIndex(str(tmp_path / "fingerprints.db"))
+
+
+def test_reencoded_copy_matches(tmp_path):
+    async def scenario() -> None:
+        index = _index(tmp_path)
+        original = _speech_like(1, 8.0)
+        await index.add("scope", "original", _fingerprint(original), "transcript")
+
+        match = await index.lookup("scope", _fingerprint(_reencoded(original), rate=44100, channels=2))
+        assert match is not None
+        assert match.cache_key == "original"
+        assert match.similarity >= index.threshold
+
+    asyncio.run(scenario())
+
+
+def test_short_reencoded_copy_matches(tmp_path):
+    async def scenario() -> None:
+        index = _index(tmp_path)
+        original = _speech_like(100, 2.0)
+        await index.add("scope", "original", _fingerprint(original), "transcript")
+        match = await index.lookup("scope", _fingerprint(_reencoded(original), rate=44100))
+        assert match is not None and match.cache_key == "original"
+
+    asyncio.run(scenario())
+
+
+def test_different_clips_of_similar_length_do_not_match(tmp_path):
+    async def scenario() -> None:
+        index = _index(tmp_path)
+        for seed in range(10):
+            await index.add("scope", f"clip-{seed}", _fingerprint(_speech_like(seed, 8.0)), "transcript")
+        for seed in range(10, 30):
+            assert await index.lookup("scope", _fingerprint(_speech_like(seed, 8.0))) is None
+
+    asyncio.run(scenario())
+
+
+def test_different_short_clips_do_not_match(tmp_path):
+    async def scenario() -> None:
+        # Short clips have few hashes, so a few chance coincidences are a large share of them
+        index = _index(tmp_path)
+        for seed in range(100, 130):
+            await index.add("scope", f"clip-{seed}", _fingerprint(_speech_like(seed, 2.0)), "transcript")
+        for seed in range(130, 160):
+            assert await index.lookup("scope", _fingerprint(_speech_like(seed, 2.0))) is None
+
+    asyncio.run(scenario())
+
+
+def test_upload_of_a_different_duration_does_not_match(tmp_path):
+    async def scenario() -> None:
+        index = _index(tmp_path)
+        original = _speech_like(1, 8.0)
+        await index.add("scope", "original", _fingerprint(original), "transcript")
+
+        # Shares every landmark of the original, but has more speech to transcribe
+        extended = np.concatenate([original, _speech_like(2, 4.0)])
+        assert await index.lookup("scope", _fingerprint(extended)) is None
+        assert await index.lookup("scope", _fingerprint(original[:6 * RATE])) is None
+
+    asyncio.run(scenario())
+
+
+def test_match_is_limited_to_its_scope(tmp_path):
+    async def scenario() -> None:
+        index = _index(tmp_path)
+        original = _speech_like(1, 8.0)
+        await index.add("whisper-1:en", "original", _fingerprint(original), "transcript")
+        assert await index.lookup("whisper-1:fr", _fingerprint(original)) is None
+
+    asyncio.run(scenario())
+
+
+def test_sampled_query_still_matches(tmp_path):
+    async def scenario() -> None:
+        index = FingerprintIndex(str(tmp_path / "fingerprints.db"), max_query_hashes=40)
+        original = _speech_like(1, 8.0)
+        await index.add("scope", "original", _fingerprint(original), "transcript")
+        await index.add("scope", "other", _fingerprint(_speech_like(2, 8.0)), "transcript")
+
+        match = await index.lookup("scope", _fingerprint(_reencoded(original), rate=44100))
+        assert match is not None and match.cache_key == "original"
+        # Fewer hashes were compared, but the similarity is scaled back to the whole upload
+        assert match.matches < 40
+        assert match.similarity >= index.threshold
+
+    asyncio.run(scenario())
+
+
+def test_hashes_common_to_many_uploads_are_skipped(tmp_path):
+    async def scenario() -> None:
+        index = FingerprintIndex(str(tmp_path / "fingerprints.db"), max_hash_uploads=2, max_entries=3)
+        clip = _fingerprint(_speech_like(1, 8.0))
+        for number in range(3):
+            await index.add("scope", f"copy-{number}", clip, "transcript")
+        # Every hash of the clip is now in three uploads, too many to tell them apart
+        assert index._common == set(clip.hashes.tolist())
+        assert await index.lookup("scope", clip) is None
+
+        # Evicting the oldest copy brings the counts back under the limit
+        await index.add("scope", "unrelated", _fingerprint(_speech_like(2, 8.0)), "transcript")
+        assert index.evictions == 1
+        assert not index._common & set(clip.hashes.tolist())
+        match = await index.lookup("scope", clip)
+        assert match is not None and match.cache_key in ("copy-1", "copy-2")
+
+        # A fresh connection reads the counts back from disk
+        reopened = FingerprintIndex(str(tmp_path / "fingerprints.db"), max_hash_uploads=1)
+        await reopened.lookup("scope", clip)
+        assert set(clip.hashes.tolist()) <= reopened._common
+
+    asyncio.run(scenario())
+
+
+def test_only_wav_is_fingerprinted_without_a_decoder(tmp_path, monkeypatch):
+    monkeypatch.setenv("FINGERPRINT_ENABLED", "true")
+    monkeypatch.setattr("app.services.whisper_service.can_decode_compressed", lambda: False)
+    fingerprinted = []
+    monkeypatch.setattr(
+        "app.services.whisper_service.compute_fingerprint",
+        lambda file, container: fingerprinted.append(container) or compute_fingerprint(file, container)
+    )
+
+    async def create(**kwargs):
+        return SimpleNamespace(text="hello")
+
+    async def scenario() -> None:
+        client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+        service = WhisperService(SimpleNamespace(openai=client))
+        service.transcript_cache = TranscriptCache()
+        service.fingerprint_index = _index(tmp_path)
+        wav = io.BytesIO()
+        with wave.open(wav, "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(RATE)
+            writer.writeframes((_speech_like(0, 3) * 32767).astype("<i2").tobytes())
+        for content, container in ((b"ID3" + bytes(100), "mp3"), (wav.getvalue(), "wav")):
+            audio = IngestedAudio(io.BytesIO(content), f"a.{container}", container, len(content), container)
+            assert await service.transcribe_audio(audio) == "hello"
+
+        assert fingerprinted == ["wav"]
+
+    asyncio.run(scenario())
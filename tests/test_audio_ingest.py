@@ -0,0 +1,133 @@
+import io
+import asyncio
+import hashlib
+import tempfile
+import pytest
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from fastapi.testclient import TestClient
+from app.api.middleware import UploadSizeLimitMiddleware
+from app.services.audio_ingest import ingest_upload, reopen_upload, sniff_container
+
+EXTENSIONS = (".mp3", ".wav", ".mp4", ".m4a")
+WAV_HEAD = b"RIFF\x00\x00\x00\x00WAVEfmt "
+
+
+@pytest.mark.parametrize("head, extension", [
+    (WAV_HEAD, ".wav"),
+    (b"\x00\x00\x00\x20ftypM4A \x00\x00", ".m4a"),
+    (b"\x00\x00\x00\x20ftypisom\x00\x00", ".mp4"),
+    (b"ID3\x04\x00\x00\x00\x00\x00\x00", ".mp3"),
+    (b"\xff\xfb\x90\x00", ".mp3"),
+    (b"OggS\x00\x02", ".ogg"),
+    (b"fLaC\x00\x00", ".flac"),
+    (b"\x1a\x45\xdf\xa3", ".webm"),
+    (b"%PDF-1.4", None),
+    (b"", None),
+])
+def test_container_is_sniffed_from_magic_bytes(head, extension):
+    assert sniff_container(head) == extension
+
+
+def test_ingest_names_and_hashes_the_upload():
+    content = WAV_HEAD + bytes(3 * 1024 * 1024)
+    upload = UploadFile(io.BytesIO(content), filename="voice.mp3")
+    audio = asyncio.run(ingest_upload(upload, EXTENSIONS, len(content)))
+
+    # The name follows the sniffed container, not the client's extension
+    assert (audio.filename, audio.container) == ("voice.wav", "wav")
+    assert audio.size == len(content)
+    assert audio.digest == hashlib.sha256(content).hexdigest()
+    assert audio.file.read() == content
+
+
+@pytest.mark.parametrize("content", [b"%PDF-1.4 not audio", b"OggS\x00\x02"])
+def test_unsupported_containers_are_rejected(content):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(ingest_upload(UploadFile(io.BytesIO(content), filename="a.mp3"), EXTENSIONS, 100))
+    assert raised.value.status_code == 400
+
+
+@pytest.mark.parametrize("declared", [None, 10])
+def test_size_limit_holds_whatever_size_is_declared(declared):
+    upload = UploadFile(io.BytesIO(WAV_HEAD + bytes(200)), filename="a.wav", size=declared)
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(ingest_upload(upload, EXTENSIONS, 100))
+    assert raised.value.status_code == 400
+    assert "too large" in raised.value.detail
+
+
+def _limited_client(max_body_bytes: int) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(UploadSizeLimitMiddleware, max_body_bytes=max_body_bytes)
+    return TestClient(app)
+
+
+def test_declared_oversized_body_is_refused_with_413():
+    response = _limited_client(100).post("/upload", content=bytes(101))
+    assert response.status_code == 413
+    assert _limited_client(100).post("/upload", content=bytes(100)).json() == {"size": 100}
+
+
+def test_body_without_content_length_is_counted_as_it_arrives():
+    def chunks():
+        for _ in range(10):
+            yield bytes(40)
+
+    # A generator body is sent chunked, with no Content-Length to check up front
+    response = _limited_client(100).post("/upload", content=chunks())
+    assert response.status_code == 413
+
+
+def test_reopened_spool_on_disk_has_its_own_offset_and_outlives_the_original():
+    upload = tempfile.SpooledTemporaryFile(max_size=4)
+    upload.write(b"0123456789")
+    upload.seek(3)
+    reopened = reopen_upload(upload)
+
+    assert reopened.read(4) == b"0123"
+    # Reading the copy does not move the original
+    assert upload.tell() == 3
+    upload.close()
+    assert reopened.read() == b"456789"
+    reopened.close()
+
+
+def test_in_memory_spool_is_copied_without_rolling_it_over():
+    upload = tempfile.SpooledTemporaryFile(max_size=1024)
+    upload.write(b"0123456789")
+    upload.seek(5)
+    reopened = reopen_upload(upload)
+
+    assert not upload._rolled
+    assert upload.tell() == 5
+    upload.close()
+    assert reopened.read() == b"0123456789"
+
+
+def test_bytes_upload_is_copied():
+    upload = io.BytesIO(b"audio")
+    reopened = reopen_upload(upload)
+    upload.close()
+    assert reopened.read() == b"audio"
+
+
+def test_closed_upload_cannot_be_reopened():
+    upload = io.BytesIO(b"audio")
+    upload.close()
+    with pytest.raises(ValueError):
+        reopen_upload(upload)
+
+
+def test_compressed_containers_have_their_own_limit():
+    async def ingest(content: bytes):
+        return await ingest_upload(UploadFile(io.BytesIO(content), filename="a"), EXTENSIONS, 100, max_compressed_bytes=50)
+
+    assert asyncio.run(ingest(WAV_HEAD + bytes(80))).size == 96
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(ingest(b"ID3" + bytes(80)))
+    assert raised.value.status_code == 400
@@ -0,0 +1,74 @@
+import io
+import wave
+import numpy as np
+import pytest
+from app.services.audio_preprocess import StreamingResampler, preprocess_wav
+from app.services.audio_segmenter import UnsupportedAudioError
+
+
+def tone(seconds: float, rate: int, frequency: float = 440) -> np.ndarray:
+    return 0.5 * np.sin(2 * np.pi * frequency * np.arange(int(seconds * rate)) / rate)
+
+
+def make_wav(samples: np.ndarray, rate: int, channels: int = 1, sample_width: int = 2) -> io.BytesIO:
+    interleaved = np.repeat(samples, channels)
+    if sample_width == 1:
+        raw = (interleaved * 127 + 128).astype(np.uint8).tobytes()
+    else:
+        raw = (interleaved * 32767).astype("<i2").tobytes()
+    wav = io.BytesIO()
+    with wave.open(wav, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(sample_width)
+        writer.setframerate(rate)
+        writer.writeframes(raw)
+    wav.seek(0)
+    return wav
+
+
+def read_wav(file) -> wave.Wave_read:
+    return wave.open(file, "rb")
+
+
+def test_long_silences_are_shortened_and_output_is_mono_16k():
+    rate = 44100
+    samples = np.concatenate([tone(2, rate), np.zeros(3 * rate), tone(2, rate)])
+    source = make_wav(samples, rate, channels=2)
+    output, stats = preprocess_wav(source, keep_silence_seconds=0.6)
+
+    with read_wav(output) as reader:
+        assert (reader.getnchannels(), reader.getsampwidth(), reader.getframerate()) == (1, 2, 16000)
+        assert reader.getnframes() / 16000 == pytest.approx(stats.output_seconds)
+    assert stats.input_seconds == pytest.approx(7)
+    # Three seconds of silence shrink to about 0.6s; frames are 30ms
+    assert stats.output_seconds == pytest.approx(4.6, abs=0.1)
+    assert stats.bytes_saved > 0
+    assert source.tell() == 0
+
+
+def test_short_pauses_are_kept():
+    rate = 16000
+    samples = np.concatenate([tone(1, rate), np.zeros(int(0.3 * rate)), tone(1, rate)])
+    _, stats = preprocess_wav(make_wav(samples, rate), keep_silence_seconds=0.6)
+    assert stats.output_seconds == pytest.approx(2.3, abs=0.03)
+
+
+def test_8_bit_input_is_converted():
+    output, stats = preprocess_wav(make_wav(tone(1, 8000), 8000, sample_width=1))
+    with read_wav(output) as reader:
+        assert reader.getsampwidth() == 2 and reader.getframerate() == 16000
+    assert stats.output_seconds == pytest.approx(1, abs=0.03)
+
+
+def test_streaming_resampler_matches_a_single_pass():
+    signal = tone(1, 44100, frequency=300).astype(np.float32)
+    whole = StreamingResampler(44100, 16000).process(signal)
+    streaming = StreamingResampler(44100, 16000)
+    blocks = [streaming.process(block) for block in np.array_split(signal, [1000, 1001, 17000, 30000])]
+    assert np.allclose(np.concatenate(blocks), whole, atol=1e-6)
+    assert len(whole) == pytest.approx(16000, abs=1)
+
+
+def test_unreadable_input_is_reported():
+    with pytest.raises(UnsupportedAudioError):
+        preprocess_wav(io.BytesIO(b"RIFF not really a wave file"))
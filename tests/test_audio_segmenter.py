@@ -0,0 +1,66 @@
+import io
+import wave
+import numpy as np
+from app.services.audio_segmenter import TranscriptStitcher, plan_segments, split_wav
+
+RATE = 1000
+
+
+def make_wav(seconds: float, silences=()) -> io.BytesIO:
+    """A tone, with silence over the given (start, end) second ranges."""
+    samples = 0.5 * np.sin(2 * np.pi * 100 * np.arange(int(seconds * RATE)) / RATE)
+    for start, end in silences:
+        samples[int(start * RATE):int(end * RATE)] = 0
+    wav = io.BytesIO()
+    with wave.open(wav, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(RATE)
+        writer.writeframes((samples * 32767).astype("<i2").tobytes())
+    wav.seek(0)
+    return wav
+
+
+def plan(wav: io.BytesIO, segment: float, overlap: float, search: float):
+    with wave.open(wav, "rb") as reader:
+        return plan_segments(reader, segment, overlap, search)
+
+
+def test_short_audio_is_a_single_segment():
+    assert plan(make_wav(5), 10, 1, 2) == [(0, 5 * RATE)]
+
+
+def test_cuts_move_to_silence_and_segments_overlap():
+    ranges = plan(make_wav(25, silences=[(8.5, 9), (17, 17.5)]), 10, 1, 3)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 25 * RATE
+    # Each cut lands in the silence before its nominal position
+    assert 8.5 * RATE <= ranges[0][1] <= 9 * RATE
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end - start == 1 * RATE
+    assert all(end - start <= 10 * RATE for start, end in ranges)
+
+
+def test_split_segments_fit_the_byte_limit():
+    segments = split_wav(make_wav(30), max_segment_bytes=20000, overlap_seconds=1, search_seconds=2)
+    assert len(segments) > 1
+    for segment in segments:
+        assert len(segment.read()) <= 20000
+
+
+def test_stitcher_drops_the_repeated_overlap():
+    stitcher = TranscriptStitcher()
+    assert stitcher.add("the quick brown fox jumps") == "the quick brown fox jumps"
+    assert stitcher.add("Fox jumps over the lazy dog.") == "over the lazy dog."
+
+
+def test_stitcher_keeps_text_that_only_matches_away_from_the_end():
+    stitcher = TranscriptStitcher()
+    stitcher.add("we went to the market and then walked home slowly afterwards")
+    assert stitcher.add("the market was closed today") == "the market was closed today"
+
+
+def test_stitcher_skips_words_the_previous_segment_had_after_the_match():
+    stitcher = TranscriptStitcher()
+    stitcher.add("one two three four fife")
+    # "three four" matches; "fife" was the previous segment's take on "five"
+    assert stitcher.add("three four five six seven") == "six seven"
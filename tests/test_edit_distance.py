@@ -0,0 +1,95 @@
+import random
+import pytest
+from app.utils import edit_distance
+from app.utils.evaluation_metrics import EvaluationMetrics
+
+
+def reference_distance(a, b) -> int:
+    """Textbook full-matrix Levenshtein distance."""
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, start=1):
+        current = [i]
+        for j, y in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+def random_pair(rng: random.Random, length: int):
+    words = ["a", "b", "c", "d"]
+    reference = [rng.choice(words) for _ in range(length)]
+    hypothesis = [word for word in reference if rng.random() > 0.15]
+    for _ in range(length // 5):
+        hypothesis.insert(rng.randrange(len(hypothesis) + 1), rng.choice(words))
+    return reference, hypothesis
+
+
+@pytest.mark.parametrize("length", [0, 1, 7, 40, 150])
+def test_distance_matches_the_full_matrix(length):
+    rng = random.Random(length)
+    for _ in range(20):
+        reference, hypothesis = random_pair(rng, length)
+        expected = reference_distance(reference, hypothesis)
+        assert edit_distance.distance(*edit_distance.encode(reference, hypothesis)) == expected
+        assert edit_distance.distance(*edit_distance.encode(hypothesis, reference)) == expected
+
+
+@pytest.mark.parametrize("length", [1, 7, 40, 150])
+def test_alignment_is_minimal_and_covers_both_sequences(length):
+    # 150 words is past the full-matrix threshold, so the Hirschberg split is exercised
+    rng = random.Random(length)
+    for _ in range(10):
+        reference, hypothesis = random_pair(rng, length)
+        steps = edit_distance.align(reference, hypothesis)
+        assert [ref for op, ref, _ in steps if op != edit_distance.INSERTION] == reference
+        assert [hyp for op, _, hyp in steps if op != edit_distance.DELETION] == hypothesis
+        for op, ref, hyp in steps:
+            assert (op == edit_distance.MATCH) == (ref is not None and ref == hyp)
+        counts = edit_distance.count_operations(steps)
+        assert len(steps) - counts[edit_distance.MATCH] == reference_distance(reference, hypothesis)
+
+
+def test_alignment_of_an_edited_sentence():
+    steps = edit_distance.align("so the cat sat down".split(), "well the cat sat on down".split())
+    assert steps == [
+        ("substitution", "so", "well"),
+        ("match", "the", "the"),
+        ("match", "cat", "cat"),
+        ("match", "sat", "sat"),
+        ("insertion", None, "on"),
+        ("match", "down", "down"),
+    ]
+    steps = edit_distance.align("so the cat sat".split(), "well so the sat".split())
+    assert steps == [
+        ("insertion", None, "well"),
+        ("match", "so", "so"),
+        ("match", "the", "the"),
+        ("deletion", "cat", None),
+        ("match", "sat", "sat"),
+    ]
+
+
+def test_error_rates():
+    assert EvaluationMetrics.calculate_wer("the cat sat", "the  bat sat") == 33.33
+    assert EvaluationMetrics.calculate_wer("", "") == 0.0
+    assert EvaluationMetrics.calculate_wer("", "extra") == 100.0
+    # Runs of whitespace count as one space
+    assert EvaluationMetrics.calculate_cer("ab  cd", "ab cx") == 20.0
+
+
+def test_corpus_wer_weighs_by_reference_length():
+    references = ["one", "one two three four five six seven eight nine"]
+    hypotheses = ["two", "one two three four five six seven eight nine"]
+    assert EvaluationMetrics.calculate_corpus_wer(references, hypotheses) == 10.0
+    with pytest.raises(ValueError):
+        EvaluationMetrics.calculate_corpus_wer(references, hypotheses[:1])
+
+
+def test_wer_details_counts_each_operation():
+    details = EvaluationMetrics.wer_details("so the cat sat down now", "well so the sat down", include_alignment=True)
+    assert {key: details[key] for key in ("substitutions", "insertions", "deletions", "hits")} == {
+        "substitutions": 0, "insertions": 1, "deletions": 2, "hits": 4
+    }
+    assert details["wer"] == 50.0
+    assert len(details["alignment"]) == 7
+    assert "alignment" not in EvaluationMetrics.wer_details("a", "a")
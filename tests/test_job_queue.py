@@ -0,0 +1,175 @@
+import io
+import os
+import asyncio
+import hashlib
+from fastapi import HTTPException
+from app.schema import TranscribeAndTranslate
+from app.services.audio_ingest import IngestedAudio
+from app.services.job_queue import JobQueue, JobStatus, job_result
+
+
+def make_audio(content: bytes = b"RIFF audio") -> IngestedAudio:
+    return IngestedAudio(io.BytesIO(content), "a.wav", "wav", len(content), hashlib.sha256(content).hexdigest())
+
+
+def make_queue(tmp_path, **kwargs) -> JobQueue:
+    return JobQueue(str(tmp_path / "jobs.db"), str(tmp_path / "jobs"), poll_interval=0.01, **kwargs)
+
+
+async def wait_for_status(queue: JobQueue, job_id: str, status: str) -> dict:
+    for _ in range(500):
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} is {job['status']}, expected {status}")
+
+
+def test_stores_default_to_the_data_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.delenv("JOB_DB_PATH", raising=False)
+    monkeypatch.delenv("JOB_STORAGE_DIR", raising=False)
+    queue = JobQueue.from_env()
+    assert queue.db_path == str(tmp_path / "jobs.db")
+    assert queue.storage_dir == str(tmp_path / "jobs")
+
+
+def test_submitted_job_runs_and_keeps_its_result(tmp_path):
+    async def handler(audio, target_language):
+        return TranscribeAndTranslate(transcription=audio.file.read().decode(), translation="hola", target_language=target_language)
+
+    async def scenario() -> None:
+        queue = make_queue(tmp_path)
+        job = await queue.submit(make_audio(), "Spanish")
+        assert os.path.exists(job["audio_path"])
+        queue.start(handler)
+        try:
+            done = await wait_for_status(queue, job["id"], JobStatus.SUCCEEDED)
+        finally:
+            await queue.stop()
+        assert job_result(done) == TranscribeAndTranslate(transcription="RIFF audio", translation="hola", target_language="Spanish")
+        assert done["expires_at"] > done["finished_at"]
+        # The stored upload is removed once the job is done
+        assert not os.path.exists(job["audio_path"])
+
+    asyncio.run(scenario())
+
+
+def test_failed_job_records_the_error(tmp_path):
+    async def handler(audio, target_language):
+        raise HTTPException(status_code=502, detail="Upstream failed")
+
+    async def scenario() -> None:
+        queue = make_queue(tmp_path)
+        job = await queue.submit(make_audio(), "Spanish")
+        queue.start(handler)
+        try:
+            failed = await wait_for_status(queue, job["id"], JobStatus.FAILED)
+        finally:
+            await queue.stop()
+        assert failed["error"] == "Upstream failed"
+        assert job_result(failed) is None
+
+    asyncio.run(scenario())
+
+
+def test_jobs_are_claimed_by_priority_then_age(tmp_path):
+    async def scenario() -> None:
+        queue = make_queue(tmp_path)
+        low = await queue.submit(make_audio(), "Spanish")
+        first = await queue.submit(make_audio(), "Spanish", priority=5)
+        second = await queue.submit(make_audio(), "Spanish", priority=5)
+        claimed = [queue._claim_next()["id"] for _ in range(3)]
+        assert claimed == [first["id"], second["id"], low["id"]]
+        assert queue._claim_next() is None
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_job_with_an_expired_lease_is_claimed_again(tmp_path):
+    async def scenario() -> None:
+        queue = make_queue(tmp_path, lease_seconds=60)
+        job = await queue.submit(make_audio(), "Spanish")
+        assert queue._claim_next()["id"] == job["id"]
+        # Another worker cannot take a job whose lease is live
+        assert queue._claim_next() is None
+
+        # The worker holding it died and stopped renewing the lease
+        queue._execute_one("UPDATE jobs SET lease_expires_at = 0 WHERE id = ? RETURNING id", (job["id"],))
+        reclaimed = queue._claim_next()
+        assert reclaimed["id"] == job["id"]
+        assert reclaimed["status"] == JobStatus.RUNNING
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stopping_hands_running_jobs_back_to_the_queue(tmp_path):
+    started = []
+
+    async def handler(audio, target_language):
+        started.append(audio.filename)
+        await asyncio.Event().wait()
+
+    async def scenario() -> None:
+        queue = make_queue(tmp_path)
+        job = await queue.submit(make_audio(), "Spanish")
+        queue.start(handler)
+        await wait_for_status(queue, job["id"], JobStatus.RUNNING)
+        while not started:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+        restarted = make_queue(tmp_path)
+        requeued = await restarted.get(job["id"])
+        assert requeued["status"] == JobStatus.QUEUED
+        assert requeued["lease_expires_at"] is None
+        assert os.path.exists(requeued["audio_path"])
+        assert restarted._claim_next()["id"] == job["id"]
+        await restarted.stop()
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_a_running_job_stops_its_handler(tmp_path):
+    started, cancelled = asyncio.Event(), []
+
+    async def handler(audio, target_language):
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario() -> None:
+        queue = make_queue(tmp_path)
+        job = await queue.submit(make_audio(), "Spanish")
+        queue.start(handler)
+        try:
+            await asyncio.wait_for(started.wait(), 5)
+            assert (await queue.cancel(job["id"]))["status"] == JobStatus.CANCELLED
+            while not cancelled:
+                await asyncio.sleep(0.01)
+            # A finished job is returned unchanged
+            assert (await queue.cancel(job["id"]))["status"] == JobStatus.CANCELLED
+        finally:
+            await queue.stop()
+        assert not os.path.exists(job["audio_path"])
+
+    asyncio.run(scenario())
+
+
+def test_expired_results_are_purged_with_their_audio(tmp_path):
+    async def scenario() -> None:
+        queue = make_queue(tmp_path, result_ttl_seconds=0)
+        job = await queue.submit(make_audio(), "Spanish")
+        await queue.cancel(job["id"])
+        kept = await queue.submit(make_audio(), "Spanish")
+        assert queue._purge_expired() == 1
+        assert await queue.get(job["id"]) is None
+        assert await queue.get(kept["id"]) is not None
+        await queue.stop()
+
+    asyncio.run(scenario())
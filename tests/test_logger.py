@@ -0,0 +1,31 @@
+import os
+import json
+import logging
+from app.utils.logger import logger, request_id_var, setup_logging, shutdown_logging
+
+
+def test_records_reach_root_handlers(caplog):
+    with caplog.at_level(logging.INFO, logger=logger.name):
+        logger.info("visible to pytest")
+    assert "visible to pytest" in caplog.text
+
+
+def test_setup_writes_json_lines_with_the_request_id(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    setup_logging()
+    setup_logging()
+    token = request_id_var.set("request-1")
+    try:
+        logger.info("Handled upload", extra={"size_mb": 2.5})
+    finally:
+        request_id_var.reset(token)
+    # Stopping the listener writes what is still queued
+    shutdown_logging()
+
+    with open(os.path.join("logs", "app.log")) as log_file:
+        records = [json.loads(line) for line in log_file]
+    assert len(records) == 1
+    assert records[0]["message"] == "Handled upload"
+    assert records[0]["request_id"] == "request-1"
+    assert records[0]["size_mb"] == 2.5
+    assert not any(type(handler).__name__ == "NonBlockingQueueHandler" for handler in logger.handlers)
@@ -0,0 +1,94 @@
+import asyncio
+from typing import List, Optional
+from app.services.micro_batcher import MicroBatcher
+
+
+class _Recorder:
+    def __init__(self, delay: float = 0, error: Optional[Exception] = None):
+        self.delay = delay
+        self.error = error
+        self.batches: List[List[str]] = []
+
+    async def __call__(self, items: List[str]) -> List[str]:
+        self.batches.append(list(items))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [item.upper() for item in items]
+
+
+def test_batch_flushes_when_full_without_waiting():
+    async def scenario() -> None:
+        recorder = _Recorder()
+        batcher = MicroBatcher("test", recorder, max_batch_size=3, max_wait=10)
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.submit("a"), batcher.submit("b"), batcher.submit("c")), timeout=1
+        )
+        assert results == ["A", "B", "C"]
+        assert recorder.batches == [["a", "b", "c"]]
+
+    asyncio.run(scenario())
+
+
+def test_batch_flushes_on_timeout():
+    async def scenario() -> None:
+        recorder = _Recorder()
+        batcher = MicroBatcher("test", recorder, max_batch_size=100, max_wait=0.02)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await asyncio.gather(batcher.submit_many(["a", "b"]), batcher.submit("a"))
+        assert loop.time() - start >= 0.02
+        assert results == [["A", "B"], "A"]
+        # Identical items are sent once
+        assert recorder.batches == [["a", "b"]]
+
+    asyncio.run(scenario())
+
+
+def test_overflow_is_split_into_several_batches():
+    async def scenario() -> None:
+        recorder = _Recorder()
+        batcher = MicroBatcher("test", recorder, max_batch_size=2, max_wait=0.01)
+        results = await batcher.submit_many(["a", "b", "c", "d", "e"])
+        assert results == ["A", "B", "C", "D", "E"]
+        assert recorder.batches == [["a", "b"], ["c", "d"], ["e"]]
+
+    asyncio.run(scenario())
+
+
+def test_batch_error_reaches_every_caller():
+    async def scenario() -> None:
+        batcher = MicroBatcher("test", _Recorder(error=ValueError("upstream failed")), max_batch_size=10, max_wait=0.01)
+        results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+        assert [type(result) for result in results] == [ValueError, ValueError]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario() -> None:
+        recorder = _Recorder(delay=0.05)
+        batcher = MicroBatcher("test", recorder, max_batch_size=10, max_wait=0.01)
+        leaving = asyncio.create_task(batcher.submit("a"))
+        staying = asyncio.create_task(batcher.submit("b"))
+        await asyncio.sleep(0.02)
+        leaving.cancel()
+        assert await staying == "B"
+        assert leaving.cancelled()
+
+    asyncio.run(scenario())
+
+
+def test_caller_cancelled_before_the_flush_is_dropped_from_the_batch():
+    async def scenario() -> None:
+        recorder = _Recorder()
+        batcher = MicroBatcher("test", recorder, max_batch_size=10, max_wait=0.02)
+        leaving = asyncio.create_task(batcher.submit("a"))
+        staying = asyncio.create_task(batcher.submit("b"))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        assert await staying == "B"
+        assert recorder.batches == [["b"]]
+
+    asyncio.run(scenario())
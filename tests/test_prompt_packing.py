@@ -0,0 +1,22 @@
+import sys
+import logging
+from app.services.prompt_packing import TokenCounter, pack_by_budget
+from app.utils.logger import logger
+
+
+def test_counts_are_estimated_and_logged_without_tiktoken(monkeypatch, caplog):
+    # A None entry makes the import raise ImportError
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    with caplog.at_level(logging.WARNING, logger=logger.name):
+        counter = TokenCounter("gpt-4o")
+    assert not counter.exact
+    assert "estimates only" in caplog.text
+    assert counter.count("x" * 40) == 10
+    assert counter.count("") == 1
+
+
+def test_packing_respects_the_budget_and_the_order():
+    sentences = ["a" * 20, "b" * 20, "c" * 20, "d" * 200]
+    chunks = pack_by_budget(sentences, lambda sentence: len(sentence) // 4, max_tokens=16)
+    # Each sentence costs its tokens plus 3 for the numbering
+    assert chunks == [["a" * 20, "b" * 20], ["c" * 20], ["d" * 200]]
@@ -0,0 +1,214 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from typing import List
+import httpx
+import openai
+import pytest
+from fastapi import HTTPException
+from app.services.deadline import Deadline, set_deadline
+from app.services.hugginface_tr import WhisperService as TranslationService
+from app.services.resilience import (
+    CircuitBreaker, CircuitOpenError, ResilientCall, RetryableError, classify, parse_retry_after
+)
+from app.services.whisper_service import WhisperService
+
+_REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def _status_error(status: int, headers: dict) -> openai.APIStatusError:
+    return openai.APIStatusError("upstream", response=httpx.Response(status, headers=headers, request=_REQUEST), body=None)
+
+
+class _Flaky:
+    """Fails with the given errors, then succeeds."""
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls: List[float] = []
+
+    async def __call__(self, timeout: float) -> str:
+        self.calls.append(time.monotonic())
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_retry_after_is_read_from_headers():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert classify(_status_error(429, {"retry-after": "7"})) == 7.0
+    assert classify(_status_error(503, {"retry-after-ms": "1500"})) == 1.5
+    assert classify(_status_error(400, {"retry-after": "7"})) is None
+    assert classify(openai.APIConnectionError(request=_REQUEST)) == 0.0
+    assert classify(ValueError("bad input")) is None
+
+
+def test_backoff_waits_at_least_as_long_as_the_upstream_asked():
+    async def scenario() -> None:
+        call = ResilientCall("test", "translation", base_delay=0.001, max_delay=0.001)
+        operation = _Flaky(RetryableError("loading", 503, retry_after=0.1))
+        assert await call.call(operation) == "ok"
+        assert operation.calls[1] - operation.calls[0] >= 0.1
+
+    asyncio.run(scenario())
+
+
+def test_huggingface_estimated_time_becomes_the_retry_delay():
+    class _Loading:
+        status = 503
+        headers = {"Retry-After": "1"}
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+        async def text(self):
+            return '{"error": "Model is loading", "estimated_time": 12.5}'
+
+    async def scenario() -> None:
+        session = SimpleNamespace(post=lambda url, **kwargs: _Loading())
+        service = TranslationService(SimpleNamespace(openai=None, http_session=session))
+        with pytest.raises(RetryableError) as error:
+            await service._request_huggingface("http://hf/model", {"inputs": ["Hi"]}, {}, 1, timeout=5)
+        assert error.value.retry_after == 12.5
+
+    asyncio.run(scenario())
+
+
+def test_non_retryable_error_is_raised_at_once_and_keeps_the_circuit_closed():
+    async def scenario() -> None:
+        call = ResilientCall("test", "translation", failure_threshold=1)
+        operation = _Flaky(_status_error(400, {}))
+        with pytest.raises(openai.APIStatusError):
+            await call.call(operation)
+        assert len(operation.calls) == 1
+        assert call.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_half_open_trial_closes_or_reopens_the_circuit(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.services.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=30)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == 30
+
+    # After the reset period one trial call is let through, and only one
+    now[0] += 30
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # A failed trial opens the circuit again for a full period
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    now[0] += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] += 1
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_cancelled_trial_frees_the_half_open_slot(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.services.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    now[0] += 30
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+
+
+def test_retries_stop_once_the_circuit_opens():
+    async def scenario() -> None:
+        call = ResilientCall("test", "translation", max_attempts=5, base_delay=0.001, failure_threshold=2)
+        operation = _Flaky(*(RetryableError("down", 503) for _ in range(5)))
+        with pytest.raises(RetryableError):
+            await call.call(operation)
+        assert len(operation.calls) == 2
+        with pytest.raises(CircuitOpenError):
+            await call.call(operation)
+
+    asyncio.run(scenario())
+
+
+def test_gives_up_rather_than_sleep_past_the_deadline():
+    async def scenario() -> None:
+        call = ResilientCall("test", "translation", base_delay=0.001, deadline_seconds=0.2)
+        operation = _Flaky(RetryableError("busy", 429, retry_after=5), RetryableError("busy", 429))
+        start = time.monotonic()
+        with pytest.raises(RetryableError):
+            await call.call(operation)
+        assert len(operation.calls) == 1
+        assert time.monotonic() - start < 0.2
+
+    asyncio.run(scenario())
+
+
+def test_expired_request_deadline_makes_no_attempt():
+    async def scenario() -> None:
+        set_deadline(Deadline(0))
+        operation = _Flaky()
+        with pytest.raises(asyncio.TimeoutError):
+            await ResilientCall("test", "translation").call(operation)
+        assert operation.calls == []
+
+    asyncio.run(scenario())
+
+
+class _Stream:
+    """A streamed completion that breaks after its first chunk."""
+
+    def __init__(self):
+        self.chunks = ["Bon", "jour"]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if len(self.chunks) < 2:
+            raise openai.APIConnectionError(request=_REQUEST)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.chunks.pop(0)))])
+
+
+def test_only_opening_a_stream_is_retried():
+    async def scenario() -> None:
+        attempts = []
+
+        async def create(**kwargs):
+            attempts.append(kwargs)
+            if len(attempts) == 1:
+                raise openai.APIConnectionError(request=_REQUEST)
+            return _Stream()
+
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        service = WhisperService(SimpleNamespace(openai=client))
+        service.translation_resilience = ResilientCall("test", "translation", base_delay=0.001)
+
+        received = []
+        with pytest.raises(HTTPException) as error:
+            async for delta in service.translate_stream(f"Hello {time.time_ns()}.", "French"):
+                received.append(delta)
+        # Opening failed once and was retried; the stream that broke after yielding was not
+        assert len(attempts) == 2
+        assert received == ["Bon"]
+        assert error.value.status_code == 502
+
+    asyncio.run(scenario())
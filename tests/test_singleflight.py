@@ -0,0 +1,105 @@
+import asyncio
+from app.services.singleflight import SingleFlight
+
+
+def test_singleflight_callers_share_one_result():
+    async def scenario() -> None:
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work() -> str:
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        assert results == ["result"] * 5
+        assert len(calls) == 1
+        # Finished calls are forgotten
+        assert len(flight) == 0
+
+    asyncio.run(scenario())
+
+
+def test_singleflight_callers_share_one_exception():
+    async def scenario() -> None:
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work() -> str:
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            raise ValueError("failed once")
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)), return_exceptions=True)
+        assert len(calls) == 1
+        assert all(isinstance(result, ValueError) for result in results)
+        assert results[0] is results[1] is results[2]
+
+    asyncio.run(scenario())
+
+
+def test_singleflight_waiter_cancellation_keeps_the_shared_work():
+    async def scenario() -> None:
+        flight = SingleFlight("test")
+        finished = []
+
+        async def work() -> str:
+            await asyncio.sleep(0.05)
+            finished.append(1)
+            return "result"
+
+        leaving = asyncio.create_task(flight.do("key", work))
+        staying = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        assert await staying == "result"
+        assert finished == [1]
+
+    asyncio.run(scenario())
+
+
+def test_singleflight_cancels_the_work_when_every_waiter_has_gone():
+    async def scenario() -> None:
+        flight = SingleFlight("test")
+        started = asyncio.Event()
+        cancelled = []
+
+        async def work() -> str:
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return "result"
+
+        waiters = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert cancelled == [1]
+        assert len(flight) == 0
+
+        # A later call starts fresh work rather than joining the cancelled one
+        async def quick() -> str:
+            return "again"
+
+        assert await flight.do("key", quick) == "again"
+
+    asyncio.run(scenario())
+
+
+def test_singleflight_keys_are_independent():
+    async def scenario() -> None:
+        flight = SingleFlight("test")
+
+        async def work(value: str) -> str:
+            await asyncio.sleep(0.01)
+            return value
+
+        assert await asyncio.gather(flight.do("a", lambda: work("a")), flight.do("b", lambda: work("b"))) == ["a", "b"]
+
+    asyncio.run(scenario())
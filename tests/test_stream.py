@@ -0,0 +1,85 @@
+import json
+from types import SimpleNamespace
+from typing import AsyncIterator, List, Tuple
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from app.api.dependencies import get_whisper_service
+from app.api.v1.transcribe_and_translate import router
+from app.services.whisper_service import WhisperService
+
+
+def _client(service: WhisperService) -> TestClient:
+    app = FastAPI()
+    app.include_router(router, prefix="/v1/transcribe-and-translate")
+    app.dependency_overrides[get_whisper_service] = lambda: service
+    return TestClient(app)
+
+
+def _service(pieces: List[str], failure: Exception = None) -> WhisperService:
+    service = WhisperService(SimpleNamespace(openai=None))
+
+    async def ingest(file):
+        return SimpleNamespace(filename=file.filename)
+
+    async def iter_transcript(audio) -> AsyncIterator[str]:
+        for piece in pieces:
+            yield piece
+        if failure is not None:
+            raise failure
+
+    async def translate_stream(text: str, language: str) -> AsyncIterator[str]:
+        for word in text.split():
+            yield f"{word.upper()} "
+
+    service.ingest = ingest
+    service.iter_transcript = iter_transcript
+    service.translate_stream = translate_stream
+    return service
+
+
+def _events(service: WhisperService) -> List[Tuple[str, dict]]:
+    response = _client(service).post(
+        "/v1/transcribe-and-translate/stream",
+        files={"file": ("audio.wav", b"RIFF", "audio/wav")},
+        data={"target_language": "French"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for frame in response.text.strip().split("\n\n"):
+        event, data = frame.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_events_arrive_in_order_and_end_with_the_result():
+    events = _events(_service(["hello world", "good bye"]))
+    names = [name for name, _ in events]
+    assert names[0] == "transcript"
+    assert names[-1] == "result"
+    # A piece is always sent before any of its translation
+    for index in (0, 1):
+        transcript = events.index(("transcript", {"index": index, "text": ["hello world", "good bye"][index]}))
+        first_delta = next(i for i, (name, data) in enumerate(events) if name == "translation" and data["index"] == index)
+        assert transcript < first_delta
+    assert [data["text"] for name, data in events if name == "transcript"] == ["hello world", "good bye"]
+    assert events[-1][1] == {
+        "transcription": "hello world good bye",
+        "translation": "HELLO WORLD GOOD BYE",
+        "target_language": "French",
+    }
+
+
+def test_http_error_is_sent_as_an_error_event():
+    events = _events(_service(["hello"], HTTPException(status_code=502, detail="Upstream failed.")))
+    assert events[-1] == ("error", {"status_code": 502, "detail": "Upstream failed."})
+    assert "result" not in [name for name, _ in events]
+
+
+def test_unexpected_error_ends_the_stream_with_a_generic_error_event():
+    events = _events(_service(["hello"], RuntimeError("secret internals")))
+    name, data = events[-1]
+    assert name == "error"
+    assert data["status_code"] == 500
+    assert "secret" not in data["detail"]
+    assert [name for name, _ in events].count("error") == 1
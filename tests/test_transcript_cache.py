@@ -0,0 +1,84 @@
+import io
+import uuid
+import asyncio
+from types import SimpleNamespace
+from app.services.audio_ingest import IngestedAudio
+from app.services.transcript_cache import LRUCache, TranscriptCache
+from app.services.whisper_service import WhisperService
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert (cache.hits, cache.misses, cache.evictions) == (3, 1, 1)
+
+
+def test_lru_entries_expire_after_their_ttl(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("app.services.transcript_cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(ttl_seconds=10)
+    cache.set("a", 1)
+    now[0] = 10
+    assert cache.get("a") == 1
+    now[0] = 10.5
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_key_depends_on_the_audio_model_and_language():
+    digest = TranscriptCache.audio_digest(b"audio")
+    keys = {
+        TranscriptCache.make_key(digest, "whisper-1", "en"),
+        TranscriptCache.make_key(digest, "whisper-1", "fr"),
+        TranscriptCache.make_key(digest, "whisper-2", "en"),
+        TranscriptCache.make_key(TranscriptCache.audio_digest(b"other"), "whisper-1", "en"),
+    }
+    assert len(keys) == 4
+    assert TranscriptCache.make_key(digest, "whisper-1") == TranscriptCache.make_key(digest, "whisper-1", None)
+
+
+def test_disk_tier_is_shared_between_workers_and_bounded(tmp_path):
+    async def scenario() -> None:
+        path = str(tmp_path / "transcripts.db")
+        writer, reader = TranscriptCache(db_path=path, max_disk_entries=2), TranscriptCache(db_path=path)
+        await writer.set("a", "first")
+        assert await reader.get("a") == "first"
+        assert reader.stats()["disk_hits"] == 1
+        # Served from memory the second time
+        assert await reader.get("a") == "first"
+        assert reader.stats()["memory_hits"] == 1
+
+        await writer.set("b", "second")
+        await writer.set("c", "third")
+        assert writer.disk_evictions == 1
+        assert await TranscriptCache(db_path=path).get("a") is None
+
+    asyncio.run(scenario())
+
+
+def test_repeated_upload_is_transcribed_once():
+    async def scenario() -> None:
+        calls = []
+
+        async def create(**kwargs):
+            calls.append(kwargs["file"][1].read())
+            return SimpleNamespace(text="hello world")
+
+        client = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create)))
+        service = WhisperService(SimpleNamespace(openai=client))
+        service.transcript_cache = TranscriptCache()
+        content = uuid.uuid4().bytes
+
+        def upload() -> IngestedAudio:
+            return IngestedAudio(io.BytesIO(content), "a.mp3", "mp3", len(content), TranscriptCache.audio_digest(content))
+
+        assert await service.transcribe_audio(upload()) == "hello world"
+        assert await service.transcribe_audio(upload()) == "hello world"
+        assert calls == [content]
+
+    asyncio.run(scenario())
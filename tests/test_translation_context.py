@@ -0,0 +1,174 @@
+import uuid
+import asyncio
+from types import SimpleNamespace
+from typing import List, Optional
+from prometheus_client import REGISTRY
+from app.api.middleware import RequestDeadlineMiddleware
+from app.services.deadline import Deadline, current_deadline, set_deadline
+from app.services.micro_batcher import MicroBatcher
+from app.services.whisper_service import WhisperService
+from app.utils.logger import request_id_var
+from app.utils.metrics import record_server_timing, start_server_timing
+
+
+class _FakeCompletions:
+    """
+    Stands in for the OpenAI chat completions API and records what each call saw.
+    """
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.started = asyncio.Event()
+        self.cancelled = False
+        self.finished = False
+        self.request_ids: List[Optional[str]] = []
+        self.deadlines: List[Optional[Deadline]] = []
+
+    async def create(self, **kwargs):
+        self.request_ids.append(request_id_var.get())
+        self.deadlines.append(current_deadline())
+        self.started.set()
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        self.finished = True
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Bonjour."))])
+
+
+def _service(completions: _FakeCompletions) -> WhisperService:
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return WhisperService(SimpleNamespace(openai=client))
+
+
+def _unique_text() -> str:
+    # Sentences already in the process-wide translation memory never reach the upstream
+    return f"Hello number {uuid.uuid4().hex}."
+
+
+def _abandoned(stage: str, reason: str) -> float:
+    return REGISTRY.get_sample_value("stt_abandoned_work_total", {"stage": stage, "reason": reason}) or 0.0
+
+
+def test_client_disconnect_cancels_the_packed_translation_call():
+    async def scenario() -> None:
+        completions = _FakeCompletions(delay=5)
+        service = _service(completions)
+        disconnect = asyncio.Event()
+        text = _unique_text()
+
+        async def app(scope, receive, send) -> None:
+            await receive()
+            translation = await service.translate(text, "French")
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": translation.encode()})
+
+        messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+
+        async def receive() -> dict:
+            message = next(messages, None)
+            if message is not None:
+                return message
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            raise AssertionError("No response is expected after the client left")
+
+        before = _abandoned("translation", "disconnected")
+        scope = {"type": "http", "method": "POST", "path": "/v1/transcribe-and-translate", "headers": []}
+        request = asyncio.create_task(RequestDeadlineMiddleware(app, timeout_seconds=30)(scope, receive, send))
+        await asyncio.wait_for(completions.started.wait(), timeout=1)
+        # The call runs under the request's own deadline
+        assert isinstance(completions.deadlines[0], Deadline)
+
+        disconnect.set()
+        await asyncio.wait_for(request, timeout=1)
+        # The upstream call is cancelled by the batch, a few loop iterations after the handler
+        await asyncio.sleep(0.01)
+        assert completions.cancelled
+        assert not completions.finished
+        assert _abandoned("translation", "disconnected") == before + 1
+
+    asyncio.run(scenario())
+
+
+def test_packed_translation_keeps_the_request_context():
+    async def scenario() -> None:
+        completions = _FakeCompletions()
+        service = _service(completions)
+        deadline = Deadline(30)
+        request_id_var.set("request-1")
+        set_deadline(deadline)
+        timings = start_server_timing()
+
+        assert await service.translate(_unique_text(), "French") == "Bonjour."
+        assert completions.request_ids == ["request-1"]
+        assert completions.deadlines == [deadline]
+        assert timings["translation"] > 0
+
+    asyncio.run(scenario())
+
+
+def test_shared_batch_runs_under_the_earliest_deadline_and_reports_to_every_caller():
+    async def scenario() -> None:
+        seen = {}
+
+        async def process(items: List[str]) -> List[str]:
+            seen["deadline"] = current_deadline().for_stage("translation")
+            seen["request_id"] = request_id_var.get()
+            record_server_timing("translation", 0.25)
+            return items
+
+        batcher = MicroBatcher("test", process, max_batch_size=10, max_wait=0.01)
+        soon, later = Deadline(5), Deadline(60)
+
+        async def caller(request_id: str, deadline: Deadline, item: str) -> float:
+            request_id_var.set(request_id)
+            set_deadline(deadline)
+            timings = start_server_timing()
+            assert await batcher.submit(item) == item
+            return timings["translation"]
+
+        charged = await asyncio.gather(caller("b", later, "x"), caller("a", soon, "y"))
+        assert seen["deadline"] == soon.expires_at
+        assert seen["request_id"] == "a,b"
+        assert charged == [0.25, 0.25]
+
+    asyncio.run(scenario())
+
+
+def test_shared_batch_is_cancelled_only_when_every_caller_has_gone():
+    async def scenario() -> None:
+        started = asyncio.Event()
+        outcome = []
+
+        async def process(items: List[str]) -> List[str]:
+            started.set()
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                outcome.append("cancelled")
+                raise
+            outcome.append("finished")
+            return items
+
+        batcher = MicroBatcher("test", process, max_batch_size=10, max_wait=0.01)
+        first = asyncio.create_task(batcher.submit("a"))
+        second = asyncio.create_task(batcher.submit("b"))
+        await started.wait()
+        first.cancel()
+        assert await second == "b"
+        assert outcome == ["finished"]
+
+        started.clear()
+        callers = [asyncio.create_task(batcher.submit(item)) for item in ("c", "d")]
+        await started.wait()
+        for task in callers:
+            task.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert outcome == ["finished", "cancelled"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,114 @@
+import re
+import uuid
+import asyncio
+from types import SimpleNamespace
+from typing import List
+import pytest
+from fastapi import HTTPException
+from app.services.hugginface_tr import WhisperService as TranslationService
+from app.services.translation_memory import TranslationMemory, parse_numbered_lines, translate_numbered
+
+
+class _Completions:
+    """
+    Answers numbered prompts of up to max_lines lines correctly and drops a
+    line from longer ones, the way a model loses count on long lists.
+    """
+
+    def __init__(self, max_lines: int):
+        self.max_lines = max_lines
+        self.prompts: List[str] = []
+
+    async def create(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        lines = re.findall(r"^(\d+)\. (.*)$", prompt, re.MULTILINE)
+        if not lines:
+            reply = prompt.split("\n\n", 1)[1].upper()
+        else:
+            kept = lines if len(lines) <= self.max_lines else lines[:-1]
+            reply = "\n".join(f"{number}. {text.upper()}" for number, text in kept)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+
+def _unique(count: int) -> List[str]:
+    marker = uuid.uuid4().hex[:8]
+    return [f"Sentence {marker} {i}." for i in range(count)]
+
+
+def test_numbered_reply_is_mapped_back_to_its_lines():
+    assert parse_numbered_lines("1. Un\n2) Deux\n", 2) == ["Un", "Deux"]
+    assert parse_numbered_lines("1. Un", 2) is None
+    assert parse_numbered_lines("1. Un\n2. Deux\n3. Trois", 2) is None
+
+
+def test_mismatched_reply_is_split_in_halves():
+    async def scenario() -> None:
+        completions = _Completions(max_lines=2)
+
+        async def complete(prompt: str) -> str:
+            response = await completions.create([{"content": prompt}])
+            return response.choices[0].message.content
+
+        sentences = _unique(8)
+        assert await translate_numbered(sentences, "French", complete) == [sentence.upper() for sentence in sentences]
+        # 8 fails, 4 + 4 fail, then four requests of 2 succeed
+        assert len(completions.prompts) == 7
+
+    asyncio.run(scenario())
+
+
+def test_openai_fallback_in_the_huggingface_service_splits_in_halves():
+    async def scenario() -> None:
+        completions = _Completions(max_lines=4)
+        service = TranslationService(SimpleNamespace(openai=SimpleNamespace(chat=SimpleNamespace(completions=completions))))
+        sentences = _unique(8)
+
+        translation = await service._translate_with_openai(" ".join(sentences), "French")
+        assert translation == " ".join(sentences).upper()
+        # Not one request per sentence
+        assert len(completions.prompts) == 3
+
+    asyncio.run(scenario())
+
+
+def test_empty_translations_are_not_remembered():
+    async def scenario() -> None:
+        memory = TranslationMemory()
+        calls = []
+
+        async def translate_batch(sentences: List[str]) -> List[str]:
+            calls.append(list(sentences))
+            return ["" if sentence == "Broken." else sentence.upper() for sentence in sentences]
+
+        assert await memory.translate("Fine. Broken.", "French", "test", translate_batch) == "FINE."
+        assert await memory.translate("Fine. Broken.", "French", "test", translate_batch) == "FINE."
+        assert calls == [["Fine.", "Broken."], ["Broken."]]
+
+    asyncio.run(scenario())
+
+
+class _Response:
+    def __init__(self, payload):
+        self.status = 200
+        self.payload = payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def json(self):
+        return self.payload
+
+
+def test_huggingface_reply_without_a_translation_is_an_error_not_a_placeholder():
+    async def scenario() -> None:
+        session = SimpleNamespace(post=lambda url, **kwargs: _Response([{"translation_text": "Un"}, {"error": "oops"}]))
+        service = TranslationService(SimpleNamespace(openai=None, http_session=session))
+        with pytest.raises(HTTPException) as error:
+            await service._request_huggingface("http://hf/model", {"inputs": ["One", "Two"]}, {}, 2, timeout=5)
+        assert error.value.status_code == 502
+
+    asyncio.run(scenario())
@@ -0,0 +1,120 @@
+import asyncio
+from typing import Dict, List
+import pytest
+from app.services.translation_router import TranslationRouter
+
+
+def _router(**kwargs) -> TranslationRouter:
+    kwargs.setdefault("explore_ratio", 0)
+    return TranslationRouter(**kwargs)
+
+
+def _warm(router: TranslationRouter, backend: str, latency: float, ok: bool = True, samples: int = 5) -> None:
+    for _ in range(samples):
+        router._stats(backend).record(latency, ok)
+
+
+class _Backend:
+    def __init__(self, name: str, delay: float = 0, error: Exception = None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return f"from {self.name}"
+
+
+def _candidates(*backends: _Backend) -> Dict[str, _Backend]:
+    return {backend.name: backend for backend in backends}
+
+
+def test_rank_prefers_fast_healthy_backends():
+    router = _router()
+    _warm(router, "slow", 2.0)
+    _warm(router, "fast", 0.5)
+    _warm(router, "broken", 0.1, ok=False)
+    assert router.rank(["slow", "broken", "fast"]) == ["fast", "slow", "broken"]
+    # Unmeasured backends keep their given order behind measured ones
+    assert router.rank(["new-b", "slow", "new-a"]) == ["slow", "new-b", "new-a"]
+
+
+def test_exploration_promotes_another_healthy_backend(monkeypatch):
+    router = _router(explore_ratio=1)
+    _warm(router, "fast", 0.5)
+    _warm(router, "slow", 2.0)
+    monkeypatch.setattr("app.services.translation_router.random.random", lambda: 0)
+    assert router.rank(["fast", "slow"]) == ["slow", "fast"]
+
+
+def test_failover_to_the_next_backend():
+    async def scenario() -> None:
+        router = _router()
+        primary, secondary = _Backend("primary", error=RuntimeError("down")), _Backend("secondary")
+        assert await router.route(_candidates(primary, secondary)) == ("from secondary", "secondary")
+        assert router.stats["primary"].error_rate == 1.0
+
+        both_down = _candidates(_Backend("a", error=RuntimeError("a down")), _Backend("b", error=ValueError("b down")))
+        with pytest.raises(ValueError):
+            await router.route(both_down)
+
+    asyncio.run(scenario())
+
+
+def test_hedging_is_off_by_default():
+    async def scenario() -> None:
+        router = _router(hedge_min_delay=0.01)
+        _warm(router, "primary", 0.01)
+        primary, secondary = _Backend("primary", delay=0.1), _Backend("secondary")
+        assert await router.route(_candidates(primary, secondary)) == ("from primary", "primary")
+        assert secondary.calls == 0
+
+    asyncio.run(scenario())
+
+
+def test_no_hedge_before_the_primary_has_enough_samples():
+    async def scenario() -> None:
+        router = _router(hedge_enabled=True, hedge_min_delay=0.01, min_samples=5)
+        _warm(router, "primary", 0.01, samples=4)
+        primary, secondary = _Backend("primary", delay=0.1), _Backend("secondary")
+        assert await router.route(_candidates(primary, secondary)) == ("from primary", "primary")
+        assert secondary.calls == 0
+
+    asyncio.run(scenario())
+
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled():
+    async def scenario() -> None:
+        router = _router(hedge_enabled=True, hedge_min_delay=0.01)
+        _warm(router, "primary", 0.01)
+        _warm(router, "secondary", 0.02)
+        primary, secondary = _Backend("primary", delay=5), _Backend("secondary", delay=0.01)
+
+        result = await asyncio.wait_for(router.route(_candidates(primary, secondary)), timeout=1)
+        assert result == ("from secondary", "secondary")
+        assert primary.cancelled
+        # A cancelled loser's latency counts, but not as an error
+        assert router.stats["primary"].error_rate == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_hedge_delay_follows_the_latency_percentile():
+    router = _router(hedge_enabled=True, hedge_min_delay=0.05)
+    latencies: List[float] = [0.1] * 19 + [1.0]
+    for latency in latencies:
+        router._stats("primary").record(latency, True)
+    # One slow call in twenty is above the 95th percentile
+    assert router.hedge_delay("primary") == 0.1
+    router._stats("primary").record(1.0, True)
+    assert router.hedge_delay("primary") == 1.0
+    assert _router(hedge_percentile=50, hedge_min_delay=0.5).hedge_delay("unknown") == 0.5